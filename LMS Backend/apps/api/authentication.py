@@ -0,0 +1,52 @@
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from apps.core.models import Student
+from apps.services import token_service
+
+
+class ClaimsTokenUser(TokenUser):
+    """
+    The request user of a token carrying claims (token_service.claims_for):
+    roles and student profile come from the token, nothing from the database.
+    """
+    @cached_property
+    def student_pk(self):
+        student_pk = self.token.get(token_service.STUDENT_CLAIM)
+        if student_pk is None: # No profile at login; it may have been added since
+            student_pk = Student.objects.filter(user_id=self.pk).values_list('pk', flat=True).first()
+        return student_pk
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Stateless JWT authentication. Tokens with claims authenticate as a
+    ClaimsTokenUser without any User or Student query; older tokens without
+    them load the user as before. Either way a token issued before the user's
+    tokens were revoked (token_service.revoke_tokens) is rejected; checking
+    that is one indexed query (see token_service.current_version).
+    """
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            return super().get_user(validated_token) # Rejects it
+
+        if validated_token.get(token_service.VERSION_CLAIM, 0) != token_service.current_version(user_id):
+            raise AuthenticationFailed("Token has been revoked.", code="token_revoked")
+        if token_service.STUDENT_CLAIM in validated_token:
+            return ClaimsTokenUser(validated_token)
+        return super().get_user(validated_token)
+
+
+def student_pk_of(user):
+    """
+    Primary key of the student profile of a request user, or None. Free for
+    token users; a real User costs a lookup of its profile.
+    """
+    if isinstance(user, ClaimsTokenUser):
+        return user.student_pk
+    student = getattr(user, 'student_profile', None)
+    return student.pk if student is not None else None
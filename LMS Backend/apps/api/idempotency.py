@@ -0,0 +1,64 @@
+import functools
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+from apps.services import idempotency_service
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+def idempotent(view_method):
+    """
+    Makes a POST handler safe to retry with an `Idempotency-Key` header.
+
+    The first response (anything below 500) is stored for the requesting user
+    (or, for anonymous requests, the client address) and key and replayed on retries with the same key and body, without
+    running the handler again. Requests without the header are unaffected.
+    Works on APIView/ViewSet methods taking (self, request, ...).
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+        key = key.strip()
+        if not key or len(key) > idempotency_service.MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"Idempotency-Key must be 1 to {idempotency_service.MAX_KEY_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if request.user.is_authenticated:
+            scope = f'user:{request.user.pk}'
+        else:
+            # Anonymous clients must not share keys: simple ones like '1' would collide
+            scope = idempotency_service.client_scope(BaseThrottle().get_ident(request))
+        fingerprint = idempotency_service.request_fingerprint(request.method, request.path, request.data)
+        outcome, record = idempotency_service.claim(scope, key, fingerprint)
+        if outcome == idempotency_service.REPLAY:
+            response = Response(record.response_body, status=record.status_code)
+            response[REPLAYED_HEADER] = 'true'
+            return response
+        if outcome == idempotency_service.MISMATCH:
+            return Response(
+                {"error": "This Idempotency-Key was already used for a different request."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if outcome == idempotency_service.IN_PROGRESS:
+            return Response(
+                {"error": "A request with this Idempotency-Key is still being processed; retry later."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            idempotency_service.abandon(record)
+            raise
+        if response.status_code >= 500:
+            idempotency_service.abandon(record)
+        else:
+            idempotency_service.complete(record, response.status_code, response.data)
+        return response
+    return wrapper
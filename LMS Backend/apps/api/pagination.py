@@ -0,0 +1,222 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset (seek) pagination with opaque cursors.
+
+    The ordering is taken from the queryset handed over by the view (e.g. 'title'
+    or '-borrow_date') and the primary key is appended as a tie-breaker, so every
+    page is fetched with `WHERE (ordering, pk) > (last seen values) LIMIT n`.
+    Unlike OFFSET pagination the cost of a page does not depend on its position,
+    and no COUNT(*) is issued unless the client asks for it.
+
+    Views may set `cursor_ordering` to a tuple of fields that is already unique
+    (no tie-breaker is appended then). Ordering fields must be non-nullable.
+    """
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    count_query_param = 'include_count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+        self.values, self.reverse = self.decode_cursor(request, queryset.model)
+
+        self.count = None
+        if self.include_count(request):
+            self.count = queryset.count()
+
+        # When paging backwards the ordering is flipped, the page is read in
+        # reverse and flipped back before being returned.
+        ordering = [(field, not desc) if self.reverse else (field, desc) for field, desc in self.ordering]
+        queryset = queryset.order_by(*[('-' if desc else '') + field for field, desc in ordering])
+        if self.values is not None:
+            queryset = queryset.filter(self._seek_filter(ordering, self.values))
+
+        results = list(queryset[:self.page_size + 1])
+        has_following = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = self.values is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = self.values is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        fields = [
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ]
+        if self.count is not None:
+            fields.append(('count', self.count))
+        fields.append(('results', data))
+        return Response(OrderedDict(fields))
+
+    def get_paginated_response_schema(self, schema):
+        properties = {
+            'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+            'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+            'count': {'type': 'integer'},
+            'results': schema,
+        }
+        return {'type': 'object', 'required': ['results'], 'properties': properties}
+
+    # --- Query parameters ---
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def include_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def get_ordering(self, queryset, view):
+        """
+        Returns the ordering as a list of (field, descending) pairs, including
+        the primary key tie-breaker.
+        """
+        fixed = getattr(view, 'cursor_ordering', None)
+        if fixed:
+            return [self._parse_field(field) for field in fixed]
+
+        ordering = [f for f in queryset.query.order_by if isinstance(f, str)]
+        if not ordering:
+            ordering = [f for f in (queryset.model._meta.ordering or []) if isinstance(f, str)]
+        ordering = [self._parse_field(field) for field in ordering]
+
+        pk_names = ('pk', queryset.model._meta.pk.name)
+        if not ordering or ordering[-1][0] not in pk_names:
+            # Break ties in the direction of the leading field so the database can
+            # walk a single composite (field, id) index in one direction.
+            descending = ordering[0][1] if ordering else False
+            ordering.append(('pk', descending))
+        return ordering
+
+    @staticmethod
+    def _parse_field(field):
+        return (field[1:], True) if field.startswith('-') else (field, False)
+
+    # --- Seek predicate ---
+
+    @staticmethod
+    def _seek_filter(ordering, values):
+        """
+        Builds `(a > x) OR (a = x AND b > y) OR ...` for the given ordering, plus
+        a redundant `a >= x` so the planner can use a range scan on the index.
+        """
+        condition = Q()
+        equal = Q()
+        for (field, desc), value in zip(ordering, values):
+            lookup = 'lt' if desc else 'gt'
+            condition |= equal & Q(**{f'{field}__{lookup}': value})
+            equal &= Q(**{field: value})
+
+        leading_field, leading_desc = ordering[0]
+        bound = Q(**{f"{leading_field}__{'lte' if leading_desc else 'gte'}": values[0]})
+        return bound & condition
+
+    # --- Cursors ---
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+            values = payload['v']
+            reverse = bool(payload.get('r', False))
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            values = [self._cursor_value(model, field, value) for (field, _), value in zip(self.ordering, values)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    @staticmethod
+    def _cursor_value(model, field, value):
+        """
+        Converts a cursor value with the ordering field's to_python(), so a
+        tampered cursor is refused instead of reaching the database.
+        """
+        if value is None or isinstance(value, (list, dict)):
+            raise TypeError(f'Unusable cursor value for {field}')
+        try:
+            *path, name = field.split('__')
+            for part in path:
+                model = model._meta.get_field(part).related_model
+            model_field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+        except (FieldDoesNotExist, AttributeError):
+            return value # An annotation: a plain JSON scalar is all it can be
+        return model_field.to_python(value)
+
+    def encode_cursor(self, row, reverse):
+        payload = {'v': [self._position_value(row, field) for field, _ in self.ordering]}
+        if reverse:
+            payload['r'] = 1
+        data = json.dumps(payload, default=str, separators=(',', ':')).encode('utf-8')
+        encoded = base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def _position_value(row, field):
+        """Reads an ordering value from a model instance or a `values()` dict."""
+        if isinstance(row, dict):
+            if field == 'pk' and 'pk' not in row:
+                return row.get('id')
+            return row[field]
+        value = row
+        for part in field.split('__'):
+            value = getattr(value, part)
+        return value
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Walked past the end: the previous page is the first one.
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+
+class HistoryPagination(LimitOffsetPagination):
+    """
+    ?limit=/?offset= pagination for combined (UNION) querysets, such as a
+    student's full history across the hot and archive tables, which cannot be
+    filtered for a keyset seek. Histories are per student, so offsets stay small.
+    """
+    default_limit = api_settings.PAGE_SIZE
+    max_limit = 500
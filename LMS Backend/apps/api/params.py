@@ -0,0 +1,39 @@
+from datetime import datetime, time
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError as DRFValidationError
+
+# Query parameter parsing shared by the views; errors are 400s naming the parameter
+
+
+def parse_moment_param(name, value):
+    """
+    Parses an ISO 8601 date or datetime query parameter into an aware datetime
+    (a date means midnight in the current time zone).
+    """
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise DRFValidationError({name: ["Use an ISO 8601 date or datetime, e.g. 2024-05-31 or 2024-05-31T12:00:00Z."]})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_day_param(request, name):
+    """Parses an optional YYYY-MM-DD query parameter."""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise DRFValidationError({name: ["Use a date in YYYY-MM-DD format."]})
+    return day
@@ -1,6 +1,14 @@
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 from django.contrib.auth.models import User
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 from apps.core.models import Student # Import Student model
+from apps.services import student_import_service, token_service
 
 class StudentRegistrationSerializer(serializers.ModelSerializer):
     """
@@ -46,4 +54,78 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         """
         # This logic should ideally be in the service layer.
         # We raise an error here to enforce using the service.
-        raise NotImplementedError("User creation should be handled by the AuthService.")
\ No newline at end of file
+        raise NotImplementedError("User creation should be handled by the AuthService.")
+
+class BulkRegistrationEntrySerializer(UserRegistrationSerializer):
+    """
+    One entry of a bulk registration: the rules of UserRegistrationSerializer,
+    except that 'password_confirm' is optional (it must still match when
+    given), passwords must pass AUTH_PASSWORD_VALIDATORS, and uniqueness is
+    left to student_import_service, which checks a whole batch with one query
+    per field instead of one per entry.
+    """
+    def get_fields(self):
+        fields = super().get_fields()
+        fields['password_confirm'].required = False
+        for field in (fields['username'], fields['student_profile'].fields['student_id']):
+            field.validators = [validator for validator in field.validators if not isinstance(validator, UniqueValidator)]
+        return fields
+
+    def validate(self, attrs):
+        attrs.setdefault('password_confirm', attrs['password'])
+        attrs = super().validate(attrs)
+        # Checked against the new user's attributes (UserAttributeSimilarityValidator)
+        user = User(**{name: attrs.get(name, '') for name in ('username', 'email', 'first_name', 'last_name')})
+        try:
+            validate_password(attrs['password'], user)
+        except DjangoValidationError as e:
+            raise serializers.ValidationError({"password": list(e.messages)})
+        return attrs
+
+class BulkRegistrationSerializer(serializers.Serializer):
+    """
+    Input for registering many students at once (staff only). Each entry has
+    the fields of UserRegistrationSerializer; entries are validated one by one
+    by student_import_service, which reports errors per entry.
+    """
+    students = serializers.ListField(
+        child=serializers.JSONField(), min_length=1, max_length=student_import_service.MAX_BULK_REGISTRATIONS
+    )
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    POST /api/token/: the token pair carries the user's roles, student profile
+    and token version (token_service.claims_for), for ClaimsJWTAuthentication.
+    """
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim, value in token_service.claims_for(user).items():
+            token[claim] = value
+        return token
+
+class ClaimsRefreshToken(RefreshToken):
+    """
+    A refresh token whose access tokens carry the user's current claims
+    (token_service.claims_for), not the ones of the login, and which issues
+    none once the user's tokens were revoked.
+    """
+    @property
+    def access_token(self):
+        access = super().access_token
+        user = User.objects.get(**{api_settings.USER_ID_FIELD: self[api_settings.USER_ID_CLAIM]})
+        claims = token_service.claims_for(user)
+        if self.get(token_service.VERSION_CLAIM, 0) != claims[token_service.VERSION_CLAIM]:
+            raise AuthenticationFailed("Token has been revoked.", code="token_revoked")
+        for claim, value in claims.items():
+            access[claim] = value
+        return access
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    POST /api/token/refresh/: simplejwt's refresh (active account check,
+    rotation) with ClaimsRefreshToken, so revoked refresh tokens are refused
+    and access tokens get the user's current claims.
+    """
+    token_class = ClaimsRefreshToken
@@ -1,11 +1,32 @@
 from rest_framework import serializers
-from apps.core.models import Author
+from apps.core.models import Author, Book
+from .mixins import DynamicFieldsMixin
 
-class AuthorSerializer(serializers.ModelSerializer):
+class AuthorBookSerializer(serializers.ModelSerializer):
+    """
+    Compact book representation embedded in an author (?include=books).
+    """
+    class Meta:
+        model = Book
+        fields = ['id', 'title', 'isbn', 'published_date', 'stock']
+
+class AuthorSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the Author model.
+    Supports ?fields= (e.g. to leave out the biography on list pages),
+    ?include=stats for catalog figures and ?include=books for the bibliography.
     """
+    # Annotated by author_service.with_catalog_stats()
+    book_count = serializers.IntegerField(read_only=True)
+    total_stock = serializers.IntegerField(read_only=True)
+    active_loans = serializers.IntegerField(read_only=True)
+    # Served from prefetch_related('books')
+    books = AuthorBookSerializer(many=True, read_only=True)
+
     class Meta:
         model = Author
-        fields = ['id', 'name', 'birth_date', 'biography']
-        # 'id' is included for referencing, usually read-only by default
\ No newline at end of file
+        fields = ['id', 'name', 'birth_date', 'biography', 'book_count', 'total_stock', 'active_loans', 'books']
+        # 'id' is included for referencing, usually read-only by default
+        includable = {'stats': ['book_count', 'total_stock', 'active_loans'], 'books': ['books']}
+        # Flat list representation read straight from QuerySet.values()
+        values_fields = {'id': 'id', 'name': 'name', 'birth_date': 'birth_date', 'biography': 'biography'}
@@ -1,14 +1,17 @@
 from rest_framework import serializers
-from apps.core.models import Book, Author
+from apps.core.models import Book, Author, StockMovement
+from apps.core.validators import is_valid_isbn, ISBN_ERROR_MESSAGE
+from apps.services import book_service, stock_service
 from .author_serializers import AuthorSerializer # Import AuthorSerializer for nested representation
+from .mixins import DynamicFieldsMixin
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
-    Serializer for the Book model. Includes nested Author details for reading,
-    and accepts author_id for writing/updating.
+    Serializer for the Book model. Renders the author as an ID for reading
+    (nested details with ?expand=author), and accepts author_id for writing/updating.
     """
-    # For read operations, show nested author details
-    author = AuthorSerializer(read_only=True)
+    # For read operations, show the author's ID (expandable to nested author details)
+    author = serializers.PrimaryKeyRelatedField(read_only=True)
     # For write operations (create/update), accept the author's ID
     author_id = serializers.PrimaryKeyRelatedField(
         queryset=Author.objects.all(), source='author', write_only=True, required=False, allow_null=True
@@ -18,14 +21,19 @@ class BookSerializer(serializers.ModelSerializer):
         model = Book
         fields = ['id', 'title', 'isbn', 'published_date', 'author', 'author_id', 'stock']
         read_only_fields = ['id'] # 'author' is read-only due to definition above
+        expandable = {'author': AuthorSerializer}
+        # Flat list representation read straight from QuerySet.values()
+        values_fields = {
+            'id': 'id', 'title': 'title', 'isbn': 'isbn', 'published_date': 'published_date',
+            'author': 'author_id', 'stock': 'stock',
+        }
 
     def validate_isbn(self, value):
         """
         Basic validation for ISBN length (can be enhanced).
         """
-        if len(value) != 13 or not value.isdigit():
-            # Note: Real ISBN validation is more complex (check digit)
-            raise serializers.ValidationError("ISBN must be a 13-digit number.")
+        if not is_valid_isbn(value):
+            raise serializers.ValidationError(ISBN_ERROR_MESSAGE)
         return value
 
     def validate_stock(self, value):
@@ -34,4 +42,31 @@ class BookSerializer(serializers.ModelSerializer):
         """
         if value < 0:
             raise serializers.ValidationError("Stock cannot be negative.")
-        return value
\ No newline at end of file
+        return value
+
+
+class BookAvailabilitySerializer(serializers.Serializer):
+    """
+    Input for the batch availability lookup: book IDs and/or ISBNs.
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+    isbns = serializers.ListField(child=serializers.CharField(max_length=13), required=False, default=list)
+
+    def validate(self, data):
+        total = len(data['ids']) + len(data['isbns'])
+        if not total:
+            raise serializers.ValidationError("Provide at least one book ID or ISBN.")
+        if total > book_service.MAX_AVAILABILITY_KEYS:
+            raise serializers.ValidationError(
+                f"At most {book_service.MAX_AVAILABILITY_KEYS} IDs and ISBNs can be looked up at once."
+            )
+        return data
+
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    """
+    Input for a manual stock ledger entry (acquisition, write-off or adjustment).
+    """
+    kind = serializers.ChoiceField(choices=stock_service.MANUAL_KINDS)
+    quantity = serializers.IntegerField(help_text="Copies added (positive) or removed (negative).")
+    note = serializers.CharField(max_length=StockMovement._meta.get_field('note').max_length, required=False, allow_blank=True, default='')
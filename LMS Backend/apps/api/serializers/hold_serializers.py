@@ -0,0 +1,32 @@
+from rest_framework import serializers
+from apps.core.models import Hold
+from .book_serializers import BookSerializer
+from .student_serializers import StudentSerializer
+from .mixins import DynamicFieldsMixin
+
+class HoldSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    Serializer for displaying holds. 'position' is the hold's place in the
+    book's queue while it is waiting (annotated by Hold.objects.with_position()).
+    """
+    book = serializers.PrimaryKeyRelatedField(read_only=True)
+    student = serializers.PrimaryKeyRelatedField(read_only=True)
+    position = serializers.IntegerField(read_only=True, allow_null=True)
+
+    class Meta:
+        model = Hold
+        fields = ['id', 'book', 'student', 'status', 'position', 'created_at', 'ready_at', 'expires_at', 'closed_at']
+        read_only_fields = fields
+        expandable = {'book': BookSerializer, 'student': StudentSerializer}
+        # Flat list representation read straight from QuerySet.values()
+        values_fields = {
+            'id': 'id', 'book': 'book_id', 'student': 'student_id', 'status': 'status', 'position': 'position',
+            'created_at': 'created_at', 'ready_at': 'ready_at', 'expires_at': 'expires_at', 'closed_at': 'closed_at',
+        }
+
+
+class PlaceHoldSerializer(serializers.Serializer):
+    """
+    Input for placing a hold. The student is inferred from the request user.
+    """
+    book_id = serializers.IntegerField(required=True, min_value=1, help_text="ID of the book to hold.")
@@ -0,0 +1,72 @@
+def parse_list_param(value):
+    """Parses a comma separated query parameter ('a,b.c, d') into a set of names."""
+    if not value:
+        return set()
+    names = set()
+    for item in value.split(','):
+        # Dotted paths ('book.author') expand every level on the way
+        names.update(part.strip() for part in item.split('.') if part.strip())
+    return names
+
+def requested_expansions(request):
+    """Returns the relation names listed in ?expand= (empty set without a request)."""
+    if request is None:
+        return set()
+    return parse_list_param(request.query_params.get('expand'))
+
+def requested_includes(request):
+    """Returns the optional field groups listed in ?include= (empty set without a request)."""
+    if request is None:
+        return set()
+    return parse_list_param(request.query_params.get('include'))
+
+def requested_fields(request):
+    """Returns the field names listed in ?fields= (empty set means all fields)."""
+    if request is None:
+        return set()
+    return {name.strip() for name in request.query_params.get('fields', '').split(',') if name.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Adds sparse fieldsets and opt-in relation expansion to a ModelSerializer.
+
+    - ?fields=id,title keeps only the listed top-level fields.
+    - Relations listed in Meta.expandable render as primary keys unless named in
+      ?expand= (e.g. ?expand=author or ?expand=book,student or ?expand=book.author).
+    - Field groups listed in Meta.includable (group name -> field names) are left
+      out unless the group is named in ?include= (e.g. ?include=stats).
+
+    Options are read from the request in the serializer context, or can be passed
+    explicitly as fields=/expand=/include= keyword arguments.
+    """
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        include = kwargs.pop('include', None)
+        super().__init__(*args, **kwargs)
+
+        request = self.context.get('request')
+        if fields is None:
+            fields = requested_fields(request)
+        if expand is None:
+            expand = requested_expansions(request)
+        if include is None:
+            include = requested_includes(request)
+
+        for group, names in getattr(self.Meta, 'includable', {}).items():
+            if group not in include:
+                for name in names:
+                    self.fields.pop(name, None)
+
+        for name, serializer_class in getattr(self.Meta, 'expandable', {}).items():
+            if name in expand and name in self.fields:
+                # Nested serializers keep their default fields but honour deeper expansions
+                options = {'fields': (), 'expand': expand, 'include': ()} if issubclass(serializer_class, DynamicFieldsMixin) else {}
+                self.fields[name] = serializer_class(read_only=True, context=self.context, **options)
+
+        if fields:
+            # Write-only inputs are kept so ?fields= never changes what a write accepts
+            for name in set(self.fields) - set(fields):
+                if not self.fields[name].write_only:
+                    self.fields.pop(name)
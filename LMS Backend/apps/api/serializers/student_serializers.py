@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from apps.core.models import Student
+from .mixins import DynamicFieldsMixin
 
 class SimpleUserSerializer(serializers.ModelSerializer):
     """
@@ -11,18 +12,26 @@ class SimpleUserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
-    Serializer for the Student profile model. Includes nested User details.
+    Serializer for the Student profile model. Renders the user as an ID
+    (nested User details with ?expand=user).
     """
-    user = SimpleUserSerializer(read_only=True) # Show related user details on read
+    user = serializers.PrimaryKeyRelatedField(read_only=True) # Show related user ID on read
     # For updates, we might need a separate serializer or handle user_id if needed,
     # but typically student profile updates don't change the linked user.
 
     class Meta:
         model = Student
-        fields = ['id', 'user', 'student_id', 'department', 'enrollment_date']
-        read_only_fields = ['id', 'user'] # User link shouldn't be changed via this serializer
+        fields = ['id', 'user', 'student_id', 'department', 'enrollment_date', 'active_loans', 'overdue_loans']
+        read_only_fields = ['id', 'user', 'active_loans', 'overdue_loans'] # Counters are maintained by transaction_service
+        expandable = {'user': SimpleUserSerializer}
+        # Flat list representation read straight from QuerySet.values()
+        values_fields = {
+            'id': 'id', 'user': 'user_id', 'student_id': 'student_id',
+            'department': 'department', 'enrollment_date': 'enrollment_date',
+            'active_loans': 'active_loans', 'overdue_loans': 'overdue_loans',
+        }
 
     def validate_student_id(self, value):
         """
@@ -1,15 +1,17 @@
 from rest_framework import serializers
-from apps.core.models import Transaction, Book, Student
+from apps.core.models import Transaction
 from .book_serializers import BookSerializer # For nested book details
 from .student_serializers import StudentSerializer # For nested student details
+from apps.services import transaction_service
+from .mixins import DynamicFieldsMixin
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for displaying Transaction details.
-    Includes nested Book and Student information.
+    Book and Student are rendered as IDs; nested information with ?expand=book,student.
     """
-    book = BookSerializer(read_only=True)
-    student = StudentSerializer(read_only=True)
+    book = serializers.PrimaryKeyRelatedField(read_only=True)
+    student = serializers.PrimaryKeyRelatedField(read_only=True)
     is_overdue = serializers.BooleanField(read_only=True) # Include the overdue status
 
     class Meta:
@@ -19,20 +21,42 @@ class TransactionSerializer(serializers.ModelSerializer):
             'return_date', 'status', 'is_overdue'
         ]
         read_only_fields = fields # This serializer is primarily for reading
+        expandable = {'book': BookSerializer, 'student': StudentSerializer}
+        # Flat list representation read straight from QuerySet.values();
+        # 'overdue' is annotated by Transaction.objects.with_overdue()
+        values_fields = {
+            'id': 'id', 'book': 'book_id', 'student': 'student_id', 'borrow_date': 'borrow_date',
+            'due_date': 'due_date', 'return_date': 'return_date', 'status': 'status', 'is_overdue': 'overdue',
+        }
 
 
 class BorrowBookSerializer(serializers.Serializer):
     """
     Serializer specifically for the 'borrow book' action.
     Only requires the book_id. The student is inferred from the request user.
+    Whether the book exists is checked by the borrow itself (no extra query here).
     """
-    book_id = serializers.IntegerField(required=True, help_text="ID of the book to borrow.")
+    book_id = serializers.IntegerField(required=True, min_value=1, help_text="ID of the book to borrow.")
 
-    def validate_book_id(self, value):
-        """Check if the book exists."""
-        if not Book.objects.filter(pk=value).exists():
-            raise serializers.ValidationError("Book with this ID does not exist.")
-        return value
+
+class BulkBorrowSerializer(serializers.Serializer):
+    """
+    Input for borrowing several books at once (circulation desk "cart").
+    """
+    book_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), min_length=1, max_length=transaction_service.MAX_BULK_ITEMS
+    )
+    mode = serializers.ChoiceField(choices=transaction_service.BULK_MODES, default=transaction_service.ALL_OR_NOTHING)
+
+
+class BulkReturnSerializer(serializers.Serializer):
+    """
+    Input for returning several loans at once.
+    """
+    transaction_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), min_length=1, max_length=transaction_service.MAX_BULK_ITEMS
+    )
+    mode = serializers.ChoiceField(choices=transaction_service.BULK_MODES, default=transaction_service.ALL_OR_NOTHING)
 
 # Note: Returning a book doesn't typically need input data other than the transaction ID
 # which is usually part of the URL, so a specific serializer might not be needed,
@@ -0,0 +1,92 @@
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """
+    Rate limit of one scope (rates in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+    e.g. {'token': '20/min'}), counted per user, or per client IP for anonymous
+    requests, in the Django cache.
+
+    Each window of the rate's duration has one counter, bumped with an atomic
+    cache.incr() (no read-modify-write, no lock). The count of the sliding
+    window ending now is estimated from the current counter plus the previous
+    one weighted by how much of it the sliding window still covers. The
+    counter is bumped before it is checked, so concurrent requests cannot all
+    slip under the limit; rejected attempts count too, so a client that keeps
+    hammering stays throttled.
+
+    DRF checks throttles before the handler runs, so a throttled request does
+    no password hashing and no database work.
+    """
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    @property
+    def THROTTLE_RATES(self):
+        # Read when the throttle is created, not at import, so settings changes apply
+        return api_settings.DEFAULT_THROTTLE_RATES
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window, self.elapsed = divmod(self.now, self.duration)
+        current_key, previous_key = f'{self.key}:{int(window)}', f'{self.key}:{int(window) - 1}'
+        # Kept for two windows: the next one still reads it as its previous window
+        self.cache.add(current_key, 0, 2 * self.duration)
+        try:
+            self.current = self.cache.incr(current_key)
+        except ValueError: # Expired between add() and incr()
+            self.cache.set(current_key, 1, 2 * self.duration)
+            self.current = 1
+        self.previous = self.cache.get(previous_key, 0)
+        if self.estimate(self.previous, self.current, self.elapsed) > self.num_requests:
+            return self.throttle_failure()
+        return self.throttle_success()
+
+    def estimate(self, previous, current, elapsed):
+        """Requests in the sliding window ending `elapsed` seconds into the current window."""
+        return previous * (1 - elapsed / self.duration) + current
+
+    def throttle_success(self):
+        return True
+
+    def wait(self):
+        """Seconds until one more request fits in the sliding window."""
+        allowed = self.num_requests - 1 # Counted before the next request is let through
+        if self.current <= allowed:
+            # Only the previous window's share is in the way (it is not empty, or this would not be throttled)
+            wait = self.duration * (1 - (allowed - self.current) / self.previous) - self.elapsed
+        else:
+            # Full on its own: wait for the next window, until this one's share has shrunk enough
+            wait = self.duration - self.elapsed + self.duration * (1 - allowed / self.current)
+        return max(0.0, wait)
+
+
+class TokenRateThrottle(SlidingWindowRateThrottle):
+    """Login attempts (POST /api/token/) per client IP; each one runs a password hash."""
+    scope = 'token'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class RegisterRateThrottle(SlidingWindowRateThrottle):
+    """Self-registrations (POST /api/register/) per client IP."""
+    scope = 'register'
+
+
+class BorrowRateThrottle(SlidingWindowRateThrottle):
+    """Borrow requests (single and bulk) per student."""
+    scope = 'borrow'
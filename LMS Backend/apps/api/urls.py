@@ -1,8 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views.auth_views import UserRegistrationView
+from .views.analytics_views import DailyCirculationView, DepartmentCirculationView, TopBooksView
+from .views.auth_views import BulkRegistrationView, UserRegistrationView
 from .views.author_views import AuthorViewSet
 from .views.book_views import BookViewSet
+from .views.cache_views import CacheStatsView
+from .views.hold_views import HoldViewSet
+from .views.outbox_views import OutboxStatsView
 from .views.student_views import StudentViewSet
 from .views.transaction_views import TransactionViewSet
 
@@ -12,11 +16,24 @@ router.register(r'authors', AuthorViewSet, basename='author')
 router.register(r'books', BookViewSet, basename='book')
 router.register(r'students', StudentViewSet, basename='student')
 router.register(r'transactions', TransactionViewSet, basename='transaction')
+router.register(r'holds', HoldViewSet, basename='hold')
 
 # The API URLs are now determined automatically by the router.
 urlpatterns = [
     # Authentication URLs
     path('register/', UserRegistrationView.as_view(), name='user_register'),
+    path('register/bulk/', BulkRegistrationView.as_view(), name='user_register_bulk'), # Staff only
+
+    # Response cache statistics (staff only)
+    path('cache/stats/', CacheStatsView.as_view(), name='cache_stats'),
+
+    # Outbox delivery lag per sink (staff only)
+    path('outbox/stats/', OutboxStatsView.as_view(), name='outbox_stats'),
+
+    # Circulation reports read from the daily rollups (staff only)
+    path('analytics/daily/', DailyCirculationView.as_view(), name='analytics_daily'),
+    path('analytics/books/', TopBooksView.as_view(), name='analytics_books'),
+    path('analytics/departments/', DepartmentCirculationView.as_view(), name='analytics_departments'),
 
     # Include router URLs
     path('', include(router.urls)),
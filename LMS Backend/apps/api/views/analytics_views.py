@@ -0,0 +1,65 @@
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from rest_framework import permissions
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.services import analytics_service
+from ..params import parse_day_param
+
+# Most borrowed books returned at most
+MAX_TOP_BOOKS = 100
+
+class AnalyticsView(ABC, APIView):
+    """
+    Base class of the staff-only circulation reports. They read only the daily
+    rollups (see analytics_service), never the transaction tables.
+    ?since= and ?until= (YYYY-MM-DD, both included) select the period; the
+    last 30 days by default.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get_period(self, request):
+        since, until = analytics_service.period(parse_day_param(request, 'since'), parse_day_param(request, 'until'))
+        if since > until:
+            raise DRFValidationError({'since': ["Must not be after 'until'."]})
+        if until - since >= timedelta(days=analytics_service.MAX_PERIOD_DAYS):
+            raise DRFValidationError({'since': [f"The period is limited to {analytics_service.MAX_PERIOD_DAYS} days."]})
+        return since, until
+
+    def get(self, request):
+        since, until = self.get_period(request)
+        return Response({'since': since, 'until': until, 'results': self.get_results(request, since, until)})
+
+    @abstractmethod
+    def get_results(self, request, since, until):
+        """The report rows of the period."""
+
+
+class DailyCirculationView(AnalyticsView):
+    """Borrows, returns and late returns of every day of the period."""
+
+    def get_results(self, request, since, until):
+        return analytics_service.daily_totals(since, until)
+
+
+class TopBooksView(AnalyticsView):
+    """The most borrowed books of the period (?limit=, default 10)."""
+
+    def get_results(self, request, since, until):
+        try:
+            limit = int(request.query_params.get('limit', analytics_service.TOP_BOOKS_LIMIT))
+        except ValueError:
+            raise DRFValidationError({'limit': ["Must be an integer."]})
+        rows = analytics_service.top_books(since, until, limit=max(1, min(limit, MAX_TOP_BOOKS)))
+        return [
+            {'book': row['book_id'], 'title': row['book__title'], **{name: row[name] for name in analytics_service.COUNTERS}}
+            for row in rows
+        ]
+
+
+class DepartmentCirculationView(AnalyticsView):
+    """Circulation per student department over the period ('' for students without one)."""
+
+    def get_results(self, request, since, until):
+        return analytics_service.department_totals(since, until)
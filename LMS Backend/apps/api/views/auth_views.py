@@ -1,10 +1,23 @@
 from rest_framework import generics, status
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
-from ..serializers.auth_serializers import UserRegistrationSerializer
+from rest_framework.views import APIView
+from rest_framework_simplejwt.views import TokenObtainPairView
+from ..idempotency import idempotent
+from ..throttling import RegisterRateThrottle, TokenRateThrottle
+from ..serializers.auth_serializers import BulkRegistrationSerializer, UserRegistrationSerializer
+from apps.services import student_import_service
 from apps.services.auth_service import register_user # Import the service function
 from django.contrib.auth.models import User
 
+class ThrottledTokenObtainPairView(TokenObtainPairView):
+    """
+    POST /api/token/ with a limit on attempts per client IP, since every
+    attempt runs a password hash (rate 'token' in DEFAULT_THROTTLE_RATES).
+    """
+    throttle_classes = [TokenRateThrottle]
+
+
 class UserRegistrationView(generics.CreateAPIView):
     """
     API endpoint for user registration.
@@ -13,11 +26,14 @@ class UserRegistrationView(generics.CreateAPIView):
     queryset = User.objects.all() # Required for CreateAPIView, though not directly used for creation here
     serializer_class = UserRegistrationSerializer
     permission_classes = [AllowAny] # Allow anyone to register
+    throttle_classes = [RegisterRateThrottle] # Checked before validation and password hashing
 
+    @idempotent
     def create(self, request, *args, **kwargs):
         """
         Handles the POST request for user registration.
         Uses the service layer function for actual user creation.
+        A retry with the same Idempotency-Key header replays the first response.
         """
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True) # Validate input data
@@ -39,4 +55,24 @@ class UserRegistrationView(generics.CreateAPIView):
             # Catch potential errors from the service layer (like validation errors)
             # The service layer raises serializers.ValidationError for specific cases
             # Other exceptions are caught here as a fallback
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class BulkRegistrationView(APIView):
+    """
+    Staff-only registration of many students at once (e.g. at semester start).
+    Expects {"students": [<registration>, ...]} with the fields of /api/register/
+    and answers with a report: rows, created, failed and per-entry errors
+    ('line' is the 1-based position in the list). Valid entries are registered
+    even when others fail. Larger files are better loaded with
+    `manage.py import_students`.
+    """
+    permission_classes = [IsAdminUser]
+
+    @idempotent
+    def post(self, request):
+        serializer = BulkRegistrationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # Hashed in this process: a pool per request would fork on every call (the command uses one)
+        report = student_import_service.import_students(enumerate(serializer.validated_data['students'], start=1), workers=0)
+        return Response(report, status=status.HTTP_200_OK)
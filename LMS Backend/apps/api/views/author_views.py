@@ -1,11 +1,15 @@
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly # Use default from settings
 from apps.core.models import Author
 from ..serializers.author_serializers import AuthorSerializer
-from apps.services import author_service # Import the service functions
+from ..serializers.book_serializers import BookSerializer
+from ..serializers.mixins import requested_expansions, requested_includes
+from apps.services import author_service, cache_service # Import the service functions
+from .mixins import CachedReadMixin, ConditionalGetMixin, FlatListMixin
 
-class AuthorViewSet(viewsets.ModelViewSet):
+class AuthorViewSet(ConditionalGetMixin, CachedReadMixin, FlatListMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows authors to be viewed or edited.
     Uses the AuthorService for business logic.
@@ -13,6 +17,19 @@ class AuthorViewSet(viewsets.ModelViewSet):
     queryset = Author.objects.all().order_by('name') # Base queryset
     serializer_class = AuthorSerializer
     permission_classes = [IsAuthenticatedOrReadOnly] # Default permission
+    # ?include=stats and /books/ depend on book data (stock, loans) as well
+    cache_scopes = (cache_service.AUTHOR_SCOPE, cache_service.BOOK_SCOPE)
+    last_modified_fields = ('updated_at',)
+
+    def get_queryset(self):
+        """Adds the catalog figures and prefetches books only when they are included."""
+        queryset = super().get_queryset()
+        include = requested_includes(self.request)
+        if 'stats' in include:
+            queryset = author_service.with_catalog_stats(queryset)
+        if 'books' in include:
+            queryset = queryset.prefetch_related('books') # One extra query for the whole page
+        return queryset
 
     # Override standard methods to use the service layer
 
@@ -35,6 +52,24 @@ class AuthorViewSet(viewsets.ModelViewSet):
         """Calls the service layer to delete an author."""
         author_service.delete_author(author_id=instance.pk)
 
+    # --- Custom Actions ---
+
+    @action(detail=True, methods=['get'])
+    def books(self, request, pk=None):
+        """
+        Paginated bibliography of an author, ordered by title.
+        Supports the same ?fields= and ?expand=author options as /api/books/.
+        """
+        return self.cached_response(request, self._list_books, pk=pk)
+
+    def _list_books(self, request, pk=None):
+        queryset = author_service.list_author_books(author_id=pk)
+        if 'author' in requested_expansions(request):
+            queryset = queryset.select_related('author')
+        page = self.paginate_queryset(queryset)
+        serializer = BookSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
     # Optional: Override list/retrieve if custom logic/serialization is needed
     # def list(self, request, *args, **kwargs):
     #     queryset = author_service.list_authors()
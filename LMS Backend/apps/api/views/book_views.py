@@ -1,17 +1,35 @@
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
 from apps.core.models import Book
-from ..serializers.book_serializers import BookSerializer
-from apps.services import book_service # Import the service functions
+from ..serializers.book_serializers import BookAvailabilitySerializer, BookSerializer, StockAdjustmentSerializer
+from ..serializers.mixins import requested_expansions
+from ..params import parse_moment_param
+from .export_views import export_response
+from .mixins import CachedReadMixin, ConditionalGetMixin, FlatListMixin
+from apps.services import book_service, cache_service, catalog_import_service, search_service, stock_service # Import the service functions
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(ConditionalGetMixin, CachedReadMixin, FlatListMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows books to be viewed or edited.
     Uses the BookService for business logic.
     """
-    queryset = Book.objects.select_related('author').all().order_by('title') # Optimize query
+    queryset = Book.objects.all().order_by('title')
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    # Expanded books embed their author, so both versions are part of the cache key
+    cache_scopes = (cache_service.BOOK_SCOPE, cache_service.AUTHOR_SCOPE)
+    last_modified_fields = ('updated_at', 'author__updated_at')
+
+    def get_queryset(self):
+        """Joins the author only when it is expanded in the response."""
+        queryset = super().get_queryset()
+        if 'author' in requested_expansions(self.request):
+            queryset = queryset.select_related('author') # Optimize query
+        return queryset
 
     # Override standard methods to use the service layer
 
@@ -46,4 +64,95 @@ class BookViewSet(viewsets.ModelViewSet):
             raise e
 
     # list/retrieve use the default queryset and serializer, which is fine for now.
-    # Override if specific service layer calls are needed (e.g., complex filtering).
\ No newline at end of file
+    # Override if specific service layer calls are needed (e.g., complex filtering).
+
+    # --- Custom Actions ---
+
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        """
+        Full-text catalog search over title, ISBN and author name, ranked by relevance.
+        Expects ?q=<text> and an optional ?limit= (default 20, max 100).
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "Query parameter 'q' is required."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            return Response({"error": "'limit' must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        books = search_service.search_books(query, limit=limit)
+        serializer = self.get_serializer(books, many=True)
+        return Response({"results": serializer.data})
+
+    @action(detail=False, methods=['post'], url_path='availability', permission_classes=[AllowAny])
+    def availability(self, request):
+        """
+        Stock of many books in one call (a read, so open like the catalog GETs).
+        Expects {"ids": [...], "isbns": [...]} with up to 5000 keys in total;
+        keys that match no book are listed in unknown_ids / unknown_isbns.
+        """
+        serializer = BookAvailabilitySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = book_service.get_availability(
+            book_ids=serializer.validated_data['ids'],
+            isbns=serializer.validated_data['isbns'],
+        )
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get', 'post'], url_path='stock', permission_classes=[IsAdminUser])
+    def stock(self, request, pk=None):
+        """
+        Staff-only stock ledger access for one book.
+        GET: the stock recomputed from the ledger, optionally ?as_of=<date or datetime>.
+        POST: records {'kind': 'acquisition'|'write_off'|'adjustment', 'quantity', 'note'}.
+        """
+        try:
+            book_id = int(pk)
+        except ValueError:
+            return Response({"error": "Book with this ID does not exist."}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            if request.method == 'GET':
+                as_of = request.query_params.get('as_of')
+                as_of = parse_moment_param('as_of', as_of) if as_of else None
+                return Response({'book': book_id, 'as_of': as_of, 'stock': stock_service.stock_as_of(book_id, as_of)})
+
+            serializer = StockAdjustmentSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            movement = stock_service.adjust_stock(book_id, **serializer.validated_data)
+        except Book.DoesNotExist:
+            return Response({"error": "Book with this ID does not exist."}, status=status.HTTP_404_NOT_FOUND)
+        except DRFValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'id': movement.pk, 'book': book_id, 'kind': movement.kind, 'quantity': movement.quantity,
+            'note': movement.note, 'created_at': movement.created_at,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAdminUser], parser_classes=[MultiPartParser])
+    def import_catalog(self, request):
+        """
+        Staff-only bulk catalog upload (upserts on ISBN).
+        Expects a multipart 'file' (CSV or JSONL) and an optional 'file_format' field;
+        otherwise the format is taken from the file extension.
+        Large catalogs are better loaded with `manage.py import_catalog`.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({"error": "A 'file' upload is required."}, status=status.HTTP_400_BAD_REQUEST)
+        file_format = request.data.get('file_format') or catalog_import_service.detect_format(upload.name)
+        if file_format not in catalog_import_service.SUPPORTED_FORMATS:
+            return Response({"error": "File format must be 'csv' or 'jsonl'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        upload.seek(0)
+        report = catalog_import_service.import_catalog(upload.file, file_format)
+        return Response(report, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='export', permission_classes=[IsAdminUser])
+    def export(self, request):
+        """
+        Staff-only streaming export of the catalog (books with author name).
+        Expects an optional ?file_format=csv|ndjson (default csv).
+        """
+        return export_response(request, 'books')
\ No newline at end of file
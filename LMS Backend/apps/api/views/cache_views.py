@@ -0,0 +1,14 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.services import cache_service
+
+class CacheStatsView(APIView):
+    """
+    Staff-only view of the response cache: hit/miss counters, hit ratio and
+    the current version of each cache scope.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_service.get_stats())
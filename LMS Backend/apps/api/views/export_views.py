@@ -0,0 +1,21 @@
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.response import Response
+from apps.services import export_service
+
+def export_response(request, dataset):
+    """
+    Builds a streaming CSV/NDJSON download for an export dataset.
+    Expects an optional ?file_format=csv|ndjson (default csv).
+    Rows are read and written lazily, so memory stays flat regardless of table size.
+    """
+    file_format = request.query_params.get('file_format', 'csv')
+    if file_format not in export_service.EXPORT_FORMATS:
+        return Response({"error": "file_format must be 'csv' or 'ndjson'."}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(
+        export_service.stream_export(dataset, file_format),
+        content_type=export_service.CONTENT_TYPES[file_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{file_format}"'
+    return response
@@ -0,0 +1,82 @@
+from rest_framework import viewsets, status, permissions
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from apps.core.models import Book, Hold
+from ..serializers.hold_serializers import HoldSerializer, PlaceHoldSerializer
+from ..serializers.mixins import requested_expansions
+from ..authentication import student_pk_of
+from ..idempotency import idempotent
+from .mixins import FlatListMixin
+from .transaction_views import IsAdminOrTransactionOwner
+from apps.services import hold_service
+
+class HoldViewSet(FlatListMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for holds (reservations) on books that are out of stock.
+    Students see and manage their own holds; admins see all holds.
+    POST /api/holds/ places a hold, POST /api/holds/{pk}/cancel/ cancels it.
+    """
+    serializer_class = HoldSerializer
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrTransactionOwner] # Same owner rule as transactions
+
+    def get_queryset(self):
+        """Own holds for students, all holds for admins; ?status= filters by status."""
+        user = self.request.user
+        if user.is_staff:
+            queryset = hold_service.list_holds()
+        elif student_pk_of(user) is not None:
+            queryset = hold_service.list_holds(student_pk_of(user))
+        else:
+            return Hold.objects.none()
+
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            if status_filter not in dict(Hold.STATUS_CHOICES):
+                raise DRFValidationError({'status': [f"Must be one of: {', '.join(dict(Hold.STATUS_CHOICES))}."]})
+            queryset = queryset.filter(status=status_filter)
+        return queryset.select_related(*self.get_related_fields())
+
+    def get_related_fields(self):
+        """Relations to join, following what ?expand= nests in the response."""
+        expand = requested_expansions(self.request)
+        related = []
+        if 'book' in expand:
+            related.append('book__author' if 'author' in expand else 'book')
+        if 'student' in expand:
+            related.append('student__user' if 'user' in expand else 'student')
+        return related
+
+    @idempotent
+    def create(self, request):
+        """
+        Places a hold for the requesting student.
+        Expects {'book_id': <id>}; only books that are out of stock can be held.
+        """
+        serializer = PlaceHoldSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        student_pk = student_pk_of(request.user)
+        if student_pk is None:
+            return Response({"error": "User does not have an associated student profile."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            hold = hold_service.place_hold(student_pk, serializer.validated_data['book_id'])
+        except Book.DoesNotExist:
+            return Response({"error": "Book with this ID does not exist."}, status=status.HTTP_404_NOT_FOUND)
+        except DRFValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(HoldSerializer(hold).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], url_path='cancel')
+    @idempotent
+    def cancel(self, request, pk=None):
+        """Cancels one of the requesting student's open holds."""
+        student_pk = student_pk_of(request.user)
+        if student_pk is None:
+            return Response({"error": "User does not have an associated student profile."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            hold = hold_service.cancel_hold(student_pk, int(pk))
+        except (Hold.DoesNotExist, ValueError):
+            return Response({"error": "Hold not found."}, status=status.HTTP_404_NOT_FOUND)
+        except DRFValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(HoldSerializer(hold).data, status=status.HTTP_200_OK)
@@ -0,0 +1,180 @@
+import calendar
+import hashlib
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+from apps.services import cache_service
+from ..serializers.mixins import requested_expansions, requested_fields, requested_includes
+
+
+class FlatListMixin:
+    """
+    Fast path for list endpoints.
+
+    Unless a relation is expanded or optional fields are included, rows are read with QuerySet.values() using the
+    serializer's Meta.values_fields (output name -> ORM lookup) and returned as plain
+    dicts, skipping model instantiation and per-field serializer work. The rendered
+    JSON is the same as the serializer's for the same fields.
+    """
+    def get_values_queryset(self):
+        """Queryset for the flat path; override to add annotations named in values_fields."""
+        return self.get_queryset()
+
+    def list(self, request, *args, **kwargs):
+        values_fields = getattr(self.get_serializer_class().Meta, 'values_fields', None)
+        if not values_fields or requested_expansions(request) or requested_includes(request):
+            return super().list(request, *args, **kwargs)
+
+        fields = requested_fields(request)
+        output = {name: lookup for name, lookup in values_fields.items() if not fields or name in fields}
+        queryset = self.filter_queryset(self.get_values_queryset())
+
+        # The paginator reads cursor positions from the rows, so ordering columns are selected too
+        model = queryset.model
+        ordering = getattr(self, 'cursor_ordering', None) or queryset.query.order_by or model._meta.ordering
+        columns = set(output.values()) | {model._meta.pk.attname}
+        columns.update(f.lstrip('-') for f in ordering if isinstance(f, str) and f.lstrip('-') != 'pk')
+        rows = queryset.values(*columns)
+
+        page = self.paginate_queryset(rows)
+        data = [{name: row[lookup] for name, lookup in output.items()} for row in (rows if page is None else page)]
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class ScopeVersionMixin:
+    """
+    Reads the versions of `cache_scopes` (see cache_service) once per request.
+    Services bump a scope whenever the data behind it changes.
+    """
+    cache_scopes = ()
+
+    def get_scope_versions(self):
+        if getattr(self, '_scope_versions', None) is None:
+            self._scope_versions = cache_service.get_versions(*self.cache_scopes)
+        return self._scope_versions
+
+
+class ConditionalGetMixin(ScopeVersionMixin):
+    """
+    Conditional GETs for list/retrieve.
+
+    - ETag: derived from the `cache_scopes` versions, the URL and the renderer, so it
+      is known before any database or serializer work. A matching If-None-Match is
+      answered with an empty 304.
+    - Last-Modified (detail only): the newest of `last_modified_fields` for the row,
+      read with a single values_list() query. If-Modified-Since is honoured when no
+      If-None-Match is sent.
+    Only use ETags for representations that do not depend on the requesting user.
+    """
+    last_modified_fields = ()
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag and self.etag_matches(request, etag):
+            return self.not_modified(etag)
+        response = super().list(request, *args, **kwargs)
+        if etag and response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag and self.etag_matches(request, etag):
+            return self.not_modified(etag)
+
+        last_modified = self.get_last_modified(kwargs)
+        if last_modified is not None and 'HTTP_IF_NONE_MATCH' not in request.META:
+            since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+            if since is not None and last_modified <= since:
+                return self.not_modified(etag, last_modified)
+
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            if etag:
+                response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def get_etag(self, request):
+        if not self.cache_scopes:
+            return None
+        versions = self.get_scope_versions()
+        renderer = getattr(request, 'accepted_media_type', '')
+        source = '|'.join([
+            ','.join(f'{scope}={versions[scope]}' for scope in sorted(versions)),
+            request.build_absolute_uri(),
+            renderer,
+        ])
+        return '"%s"' % hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def etag_matches(request, etag):
+        header = request.META.get('HTTP_IF_NONE_MATCH')
+        if not header:
+            return False
+        if header.strip() == '*':
+            return True
+        # If-None-Match uses the weak comparison
+        candidates = [tag.strip() for tag in header.split(',')]
+        return etag in [tag[2:] if tag.startswith('W/') else tag for tag in candidates]
+
+    def get_last_modified(self, kwargs):
+        """Returns the row's last change as a UTC timestamp (seconds), or None."""
+        if not self.last_modified_fields:
+            return None
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg not in kwargs:
+            return None
+        try:
+            row = (
+                self.get_queryset().model._default_manager
+                .filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+                .values_list(*self.last_modified_fields)
+                .first()
+            )
+        except (TypeError, ValueError): # Malformed pk; let retrieve() answer with a 404
+            return None
+        timestamps = [value for value in (row or ()) if value is not None]
+        if not timestamps:
+            return None
+        return calendar.timegm(max(timestamps).utctimetuple())
+
+    @staticmethod
+    def not_modified(etag=None, last_modified=None):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        if etag:
+            response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class CachedReadMixin(ScopeVersionMixin):
+    """
+    Caches list/retrieve response data keyed by the full URL and the versions of
+    `cache_scopes`, so cached entries are never served stale.
+    Only use it for representations that do not depend on the requesting user.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if not cache_service.is_enabled():
+            return handler(request, *args, **kwargs)
+
+        key = cache_service.response_key(self.basename, self.get_scope_versions(), request.build_absolute_uri())
+        data = cache_service.get_response(key)
+        if data is not None:
+            return Response(data)
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache_service.set_response(key, response.data)
+        return response
@@ -0,0 +1,14 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.services import outbox_service
+
+class OutboxStatsView(APIView):
+    """
+    Staff-only view of outbox delivery: per-sink cursor position, pending
+    events, lag, retry state and delivery totals.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response({'sinks': outbox_service.lag_report()})
@@ -2,7 +2,10 @@ from rest_framework import viewsets, permissions
 from rest_framework.exceptions import PermissionDenied
 from apps.core.models import Student
 from ..serializers.student_serializers import StudentSerializer
-from apps.services import student_service # Import the service functions
+from apps.services import search_service, student_service # Import the service functions
+from ..serializers.mixins import requested_expansions
+from ..params import parse_day_param
+from .mixins import ConditionalGetMixin, FlatListMixin
 
 # --- Custom Permissions ---
 class IsAdminOrOwnerOrReadOnly(permissions.BasePermission):
@@ -17,22 +20,49 @@ class IsAdminOrOwnerOrReadOnly(permissions.BasePermission):
             return request.user and request.user.is_authenticated
 
         # Write permissions are only allowed to the owner of the profile or admin users.
-        return obj.user == request.user or request.user.is_staff
+        return obj.user_id == request.user.pk or request.user.is_staff
 
 
 # --- ViewSet ---
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(ConditionalGetMixin, FlatListMixin, viewsets.ModelViewSet):
     """
     API endpoint for viewing and editing Student profiles.
     Creation is handled via user registration endpoint.
     Deletion might be restricted or handled differently (e.g., deactivation).
     """
-    queryset = Student.objects.select_related('user').all().order_by('user__username')
+    queryset = Student.objects.all().order_by('user__username')
     serializer_class = StudentSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrOwnerOrReadOnly] # Must be logged in, then check admin/owner
 
     # Disable POST (creation) via this endpoint - use registration
     http_method_names = ['get', 'put', 'patch', 'delete', 'head', 'options']
+    # Last-Modified on detail responses (no ETag: student data is not version tracked)
+    last_modified_fields = ('updated_at',)
+
+    def get_queryset(self):
+        """Loads the user details only when they are expanded in the response."""
+        queryset = super().get_queryset()
+        if 'user' in requested_expansions(self.request):
+            queryset = queryset.select_related('user')
+        return queryset
+
+    def filter_queryset(self, queryset):
+        """
+        Optional directory filters, each backed by an index:
+        ?search= (prefixes of student ID, username, first or last name, see search_service.search_students),
+        ?department= (student_dept_enrolled_idx) and ?enrolled_after=YYYY-MM-DD
+        (student_enrolled_idx, or student_dept_enrolled_idx together with ?department=).
+        """
+        queryset = super().filter_queryset(queryset)
+        params = self.request.query_params
+        if params.get('search', '').strip():
+            queryset = search_service.search_students(queryset, params['search'])
+        if params.get('department'):
+            queryset = queryset.filter(department=params['department'])
+        enrolled_after = parse_day_param(self.request, 'enrolled_after')
+        if enrolled_after:
+            queryset = queryset.filter(enrollment_date__gt=enrolled_after)
+        return queryset
 
     def perform_update(self, serializer):
         """Calls the service layer to update a student profile."""
@@ -48,7 +78,7 @@ class StudentViewSet(viewsets.ModelViewSet):
         """
         # Permission check (IsAdminOrOwnerOrReadOnly) ensures only owner or admin can delete
         # Consider adding a confirmation step or soft delete/deactivation instead.
-        if not (instance.user == self.request.user or self.request.user.is_staff):
+        if not (instance.user_id == self.request.user.pk or self.request.user.is_staff):
              raise PermissionDenied("You do not have permission to delete this profile.")
 
         student_service.delete_student(student_pk=instance.pk)
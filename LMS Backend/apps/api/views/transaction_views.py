@@ -1,9 +1,20 @@
+from django.utils import timezone
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError as DRFValidationError # Alias to avoid clash
-from apps.core.models import Transaction, Student
-from ..serializers.transaction_serializers import TransactionSerializer, BorrowBookSerializer
+from apps.core.models import Book, Transaction
+from ..serializers.transaction_serializers import (
+    TransactionSerializer, BorrowBookSerializer, BulkBorrowSerializer, BulkReturnSerializer,
+)
+from ..serializers.mixins import requested_expansions
+from .export_views import export_response
+from ..authentication import student_pk_of
+from ..idempotency import idempotent
+from ..pagination import HistoryPagination
+from ..params import parse_moment_param
+from ..throttling import BorrowRateThrottle
+from .mixins import FlatListMixin
 from apps.services import transaction_service # Import the service functions
 
 # --- Custom Permissions ---
@@ -15,14 +26,13 @@ class IsAdminOrTransactionOwner(permissions.BasePermission):
     """
     def has_object_permission(self, request, view, obj):
         # Allow access if user is admin or the transaction belongs to the user's student profile
-        is_owner = False
-        if request.user.is_authenticated and hasattr(request.user, 'student_profile'):
-            is_owner = obj.student == request.user.student_profile
-
-        return request.user.is_staff or is_owner
+        if request.user.is_staff:
+            return True
+        student_pk = student_pk_of(request.user) if request.user.is_authenticated else None
+        return student_pk is not None and obj.student_id == student_pk
 
 # --- ViewSet ---
-class TransactionViewSet(viewsets.ReadOnlyModelViewSet): # Primarily read-only, actions handle changes
+class TransactionViewSet(FlatListMixin, viewsets.ReadOnlyModelViewSet): # Primarily read-only, actions handle changes
     """
     API endpoint for viewing borrowing transactions.
     Provides custom actions for borrowing and returning books.
@@ -34,29 +44,57 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet): # Primarily read-only,
         """
         Filter transactions based on the user.
         Admins see all transactions, students see only their own.
+        The overdue flag is computed in SQL (Transaction.objects.with_overdue()).
         """
         user = self.request.user
+        related = self.get_related_fields()
         if user.is_staff:
-            return Transaction.objects.select_related('book', 'student__user').all().order_by('-borrow_date')
-        elif hasattr(user, 'student_profile'):
-            # Ensure student profile exists before filtering
-            student_profile = getattr(user, 'student_profile', None)
-            if student_profile:
-                 return Transaction.objects.filter(student=student_profile).select_related('book', 'student__user').order_by('-borrow_date')
-            else:
-                 # Should not happen if user is authenticated student, but handle defensively
-                 return Transaction.objects.none()
+            return Transaction.objects.with_overdue().select_related(*related).order_by('-borrow_date')
+        student_pk = student_pk_of(user)
+        if student_pk is not None:
+            return Transaction.objects.with_overdue().filter(student_id=student_pk).select_related(*related).order_by('-borrow_date')
         else:
             # Non-admin, non-student users see nothing
             return Transaction.objects.none()
 
+    def filter_queryset(self, queryset):
+        """
+        Optional filters, each backed by an index:
+        ?status=Borrowed|Returned and ?due_before= (txn_status_due_idx),
+        ?borrowed_after= (txn_borrow_date_id_idx, or txn_student_borrow_idx for students).
+        """
+        queryset = super().filter_queryset(queryset)
+        params = self.request.query_params
+        status_filter = params.get('status')
+        if status_filter:
+            if status_filter not in dict(Transaction.STATUS_CHOICES):
+                raise DRFValidationError({'status': [f"Must be one of: {', '.join(dict(Transaction.STATUS_CHOICES))}."]})
+            queryset = queryset.filter(status=status_filter)
+        if params.get('due_before'):
+            queryset = queryset.filter(due_date__lt=parse_moment_param('due_before', params['due_before']))
+        if params.get('borrowed_after'):
+            queryset = queryset.filter(borrow_date__gt=parse_moment_param('borrowed_after', params['borrowed_after']))
+        return queryset
+
+    def get_related_fields(self):
+        """Relations to join, following what ?expand= nests in the response."""
+        expand = requested_expansions(self.request)
+        related = []
+        if 'book' in expand:
+            related.append('book__author' if 'author' in expand else 'book')
+        if 'student' in expand:
+            related.append('student__user' if 'user' in expand else 'student')
+        return related
+
     # --- Custom Actions ---
 
-    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated], url_path='borrow')
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated], throttle_classes=[BorrowRateThrottle], url_path='borrow')
+    @idempotent
     def borrow_book_action(self, request):
         """
         Custom action for a student to borrow a book.
         Expects {'book_id': <id>} in the request data.
+        Retries with the same Idempotency-Key header replay the first response.
         """
         serializer = BorrowBookSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -64,15 +102,15 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet): # Primarily read-only,
 
         try:
             # Ensure the user has a student profile
-            if not hasattr(request.user, 'student_profile'):
+            student_pk = student_pk_of(request.user)
+            if student_pk is None:
                 return Response({"error": "User does not have an associated student profile."}, status=status.HTTP_400_BAD_REQUEST)
 
-            transaction = transaction_service.borrow_book(user=request.user, book_id=book_id)
+            transaction = transaction_service.borrow_book(student_id=student_pk, book_id=book_id)
             response_serializer = TransactionSerializer(transaction) # Serialize the created transaction
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
-        except (Student.DoesNotExist, Book.DoesNotExist) as e:
-             # Should be caught by serializer/permission checks, but handle defensively
-             return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except Book.DoesNotExist:
+             return Response({"error": "Book with this ID does not exist."}, status=status.HTTP_404_NOT_FOUND)
         except DRFValidationError as e: # Catch validation errors from the service
             return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
@@ -81,6 +119,7 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet): # Primarily read-only,
 
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated], url_path='return')
+    @idempotent
     def return_book_action(self, request, pk=None):
         """
         Custom action for a student to return a book associated with a specific transaction.
@@ -89,10 +128,11 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet): # Primarily read-only,
         transaction_id = pk
         try:
             # Ensure the user has a student profile
-            if not hasattr(request.user, 'student_profile'):
+            student_pk = student_pk_of(request.user)
+            if student_pk is None:
                 return Response({"error": "User does not have an associated student profile."}, status=status.HTTP_400_BAD_REQUEST)
 
-            transaction = transaction_service.return_book(user=request.user, transaction_id=transaction_id)
+            transaction = transaction_service.return_book(student_id=student_pk, transaction_id=transaction_id)
             response_serializer = TransactionSerializer(transaction) # Serialize the updated transaction
             return Response(response_serializer.data, status=status.HTTP_200_OK)
         except Transaction.DoesNotExist:
@@ -101,4 +141,106 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet): # Primarily read-only,
             return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             # Log error
-            return Response({"error": f"An unexpected error occurred: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({"error": f"An unexpected error occurred: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated], throttle_classes=[BorrowRateThrottle], url_path='borrow-many')
+    @idempotent
+    def borrow_many_action(self, request):
+        """
+        Borrows several books in one request and one database transaction.
+        Expects {'book_ids': [...], 'mode': 'all_or_nothing' | 'best_effort'}.
+        Every book gets its own result; in all_or_nothing mode a single failure
+        borrows nothing (400), in best_effort mode partial success answers 207.
+        """
+        serializer = BulkBorrowSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        student_pk = student_pk_of(request.user)
+        if student_pk is None:
+            return Response({"error": "User does not have an associated student profile."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = transaction_service.borrow_books(
+            student_id=student_pk,
+            book_ids=serializer.validated_data['book_ids'],
+            mode=serializer.validated_data['mode'],
+        )
+        return self.bulk_response(results, 'borrowed', status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated], url_path='return-many')
+    @idempotent
+    def return_many_action(self, request):
+        """
+        Returns several loans in one request and one database transaction.
+        Expects {'transaction_ids': [...], 'mode': 'all_or_nothing' | 'best_effort'}.
+        """
+        serializer = BulkReturnSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        student_pk = student_pk_of(request.user)
+        if student_pk is None:
+            return Response({"error": "User does not have an associated student profile."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = transaction_service.return_books(
+            student_id=student_pk,
+            transaction_ids=serializer.validated_data['transaction_ids'],
+            mode=serializer.validated_data['mode'],
+        )
+        return self.bulk_response(results, 'returned', status.HTTP_200_OK)
+
+    @staticmethod
+    def bulk_response(results, done_status, success_code):
+        """Serializes per-item results; the status code tells full, partial or no success."""
+        for result in results:
+            if 'transaction' in result:
+                result['transaction'] = TransactionSerializer(result['transaction']).data
+        succeeded = sum(1 for result in results if result['status'] == done_status)
+        if succeeded == len(results):
+            code = success_code
+        elif succeeded:
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = status.HTTP_400_BAD_REQUEST
+        return Response({"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}, status=code)
+
+    @action(detail=False, methods=['get'], url_path='history')
+    def history(self, request):
+        """
+        Full borrowing history of a student, including archived transactions
+        (each row has an 'archived' flag). Students get their own history;
+        staff pass ?student=<student pk>. Paginated with ?limit=/?offset=.
+        """
+        if request.user.is_staff and 'student' in request.query_params:
+            try:
+                student_id = int(request.query_params['student'])
+            except ValueError:
+                return Response({"error": "'student' must be a student ID (primary key)."}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            student_id = student_pk_of(request.user)
+        if student_id is None:
+            return Response({"error": "User does not have an associated student profile."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = transaction_service.list_transactions_for_student(student_id, full_history=True)
+        paginator = HistoryPagination()
+        page = paginator.paginate_queryset(rows, request, view=self)
+        output = TransactionSerializer.Meta.values_fields
+        data = [dict({name: row[lookup] for name, lookup in output.items()}, archived=row['archived']) for row in page]
+        return paginator.get_paginated_response(data)
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser], url_path='overdue')
+    def overdue(self, request):
+        """
+        Staff-only overdue report, one entry per student (paginated by student).
+        Each entry has the student, the number of overdue loans, the oldest due
+        date and the overdue loans themselves. Three queries per page.
+        """
+        now = timezone.now()
+        self.cursor_ordering = ('student_id',) # One row per student, so the key is unique
+        page = self.paginate_queryset(transaction_service.overdue_students(now))
+        return self.get_paginated_response(transaction_service.build_overdue_report(page, now))
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser], url_path='export')
+    def export(self, request):
+        """
+        Staff-only streaming export of all transactions, archived ones included
+        (archived column), with book and student details.
+        Expects an optional ?file_format=csv|ndjson (default csv).
+        """
+        return export_response(request, 'transactions')
\ No newline at end of file
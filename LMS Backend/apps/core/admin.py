@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Author, Book, Student, Transaction
+from .models import ArchivedTransaction, Author, Book, Hold, OutboxCursor, OutboxEvent, StockMovement, StockSnapshot, Student, Transaction
 
 # Basic registration for now, can be customized later
 
@@ -29,6 +29,72 @@ class TransactionAdmin(admin.ModelAdmin):
     raw_id_fields = ('student', 'book') # Better UI for selection
     readonly_fields = ('borrow_date',) # Usually set automatically
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_overdue() # Computed in SQL for the whole page
+
     def is_overdue(self, obj):
         return obj.is_overdue()
     is_overdue.boolean = True # Display as a checkmark icon
+    is_overdue.admin_order_field = 'overdue'
+
+@admin.register(ArchivedTransaction)
+class ArchivedTransactionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'student', 'book', 'borrow_date', 'return_date', 'archived_at')
+    search_fields = ('student__user__username', 'book__title', 'book__isbn')
+    raw_id_fields = ('student', 'book')
+
+    def has_add_permission(self, request):
+        return False # Rows only arrive through archive_transactions
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(Hold)
+class HoldAdmin(admin.ModelAdmin):
+    list_display = ('student', 'book', 'status', 'created_at', 'ready_at', 'expires_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('student__user__username', 'book__title', 'book__isbn')
+    raw_id_fields = ('student', 'book')
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'topic', 'created_at')
+    list_filter = ('topic',)
+
+    def has_add_permission(self, request):
+        return False # Events are written by the services
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(OutboxCursor)
+class OutboxCursorAdmin(admin.ModelAdmin):
+    list_display = ('sink', 'position', 'delivered', 'last_delivered_at', 'failures', 'next_attempt_at', 'lease_owner')
+    readonly_fields = ('position', 'delivered', 'last_delivered_at', 'last_lag_seconds', 'last_error')
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('id', 'book', 'kind', 'quantity', 'loan_id', 'note', 'created_at')
+    list_filter = ('kind',)
+    search_fields = ('book__title', 'book__isbn')
+    raw_id_fields = ('book',)
+
+    def has_add_permission(self, request):
+        return False # Written together with the stock change (see stock_service)
+
+    def has_change_permission(self, request, obj=None):
+        return False # The ledger is append-only; correct it with an adjustment
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('book', 'stock', 'movement_id', 'taken_at')
+    raw_id_fields = ('book',)
+
+    def has_add_permission(self, request):
+        return False # Taken by `manage.py snapshot_stock`
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core' # Corrected path
+
+    def ready(self):
+        from . import signals # noqa: F401 (connects the token revocation receivers)
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.services import archive_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves returned transactions older than --older-than into the archive table, "
+        "in batches of one database transaction each. Safe to interrupt and re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', default='365d',
+            help="Minimum time since return, e.g. 365d, 52w or 48h (default 365d).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=archive_service.ARCHIVE_BATCH_SIZE,
+            help="Transactions moved per database transaction.",
+        )
+        parser.add_argument('--max-batches', type=int, help="Stop after this many batches.")
+
+    def handle(self, *args, **options):
+        try:
+            older_than = archive_service.parse_age(options['older_than'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        verbosity = options['verbosity']
+        def progress(moved):
+            if verbosity > 1:
+                self.stderr.write(f"{moved} transactions archived...")
+
+        moved = archive_service.archive_returned_transactions(
+            older_than,
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            progress=progress,
+        )
+        self.stderr.write(self.style.SUCCESS(f"Archived {moved} transactions."))
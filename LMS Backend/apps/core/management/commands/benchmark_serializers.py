@@ -0,0 +1,103 @@
+import time
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from apps.core.models import Author, Book, Student, Transaction
+from apps.api.serializers.transaction_serializers import TransactionSerializer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures list serialization throughput for a page of transactions: nested "
+        "ModelSerializers vs. ID-only ModelSerializer vs. the flat values() path. "
+        "Benchmark data is created inside a transaction and rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help="Rows per page.")
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per variant (best run is reported).")
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        if rows < 1 or repeat < 1:
+            raise CommandError("--rows and --repeat must be at least 1.")
+
+        results = []
+        try:
+            with transaction.atomic():
+                self.seed(rows)
+                queryset = Transaction.objects.order_by('-borrow_date', '-pk')[:rows]
+                variants = [
+                    ('nested ModelSerializer (?expand=book.author,student.user)', lambda: self.nested(queryset)),
+                    ('ID-only ModelSerializer (default)', lambda: self.ids_only(queryset)),
+                    ('flat values() path (default list)', lambda: self.flat(rows)),
+                ]
+                for name, run in variants:
+                    best = min(self.timed(run) for _ in range(repeat))
+                    results.append((name, best))
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        baseline = results[0][1]
+        self.stdout.write(f"{rows} rows per page, best of {repeat}:")
+        for name, seconds in results:
+            self.stdout.write(
+                f"  {name:<58} {seconds * 1000:8.1f} ms  {rows / seconds:10.0f} rows/s  x{baseline / seconds:.1f}"
+            )
+
+    @staticmethod
+    def timed(run):
+        start = time.perf_counter()
+        run()
+        return time.perf_counter() - start
+
+    @staticmethod
+    def nested(queryset):
+        expand = {'book', 'author', 'student', 'user'}
+        queryset = queryset.select_related('book__author', 'student__user')
+        return JSONRenderer().render(TransactionSerializer(queryset, many=True, expand=expand).data)
+
+    @staticmethod
+    def ids_only(queryset):
+        return JSONRenderer().render(TransactionSerializer(queryset, many=True, expand=set()).data)
+
+    @staticmethod
+    def flat(rows):
+        # Same work as FlatListMixin.list() for TransactionViewSet
+        output = TransactionSerializer.Meta.values_fields
+        queryset = Transaction.objects.with_overdue().order_by('-borrow_date', '-pk')
+        page = queryset.values(*set(output.values()))[:rows]
+        data = [{name: row[lookup] for name, lookup in output.items()} for row in page]
+        return JSONRenderer().render(data)
+
+    @staticmethod
+    def seed(rows):
+        now = timezone.now()
+        authors = Author.objects.bulk_create(
+            [Author(name=f'Bench author {i}', biography='Lorem ipsum dolor sit amet. ' * 40) for i in range(200)]
+        )
+        books = Book.objects.bulk_create([
+            Book(title=f'Bench book {i}', isbn=f'{9990000000000 + i}', author=authors[i % len(authors)], stock=5)
+            for i in range(2000)
+        ])
+        users = User.objects.bulk_create(
+            [User(username=f'bench-user-{i}', email=f'bench{i}@example.com', password='!') for i in range(500)]
+        )
+        students = Student.objects.bulk_create(
+            [Student(user=user, student_id=f'BENCH-{i}', department='Benchmarks') for i, user in enumerate(users)]
+        )
+        Transaction.objects.bulk_create([
+            Transaction(
+                book=books[i % len(books)], student=students[i % len(students)],
+                borrow_date=now - timedelta(minutes=i), due_date=now + timedelta(days=14 - i % 30),
+            )
+            for i in range(rows)
+        ])
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.services import hold_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Expires ready holds that were not borrowed before their pick-up deadline and "
+        "passes their copies on to the next hold (or back on the shelf), in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=hold_service.HOLD_EXPIRY_BATCH_SIZE,
+            help="Holds expired per database transaction.",
+        )
+        parser.add_argument('--max-batches', type=int, help="Stop after this many batches.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        verbosity = options['verbosity']
+        def progress(expired):
+            if verbosity > 1:
+                self.stderr.write(f"{expired} holds expired...")
+
+        expired = hold_service.expire_holds(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+            progress=progress,
+        )
+        self.stderr.write(self.style.SUCCESS(f"Expired {expired} holds."))
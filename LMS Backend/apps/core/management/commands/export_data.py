@@ -0,0 +1,33 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from apps.services import export_service
+
+
+class Command(BaseCommand):
+    help = "Streams books or transactions to a CSV or NDJSON file (or stdout)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(export_service.EXPORT_DATASETS))
+        parser.add_argument('--format', dest='file_format', choices=export_service.EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', '-o', help="Destination file. Defaults to stdout.")
+        parser.add_argument(
+            '--chunk-size', type=int, default=export_service.EXPORT_CHUNK_SIZE,
+            help="Rows fetched per database round trip.",
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        chunks = export_service.stream_export(options['dataset'], options['file_format'], chunk_size=options['chunk_size'])
+
+        if not options['output']:
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+            return
+        try:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        except OSError as e:
+            raise CommandError(f"Cannot write '{options['output']}': {e}")
+        self.stderr.write(self.style.SUCCESS(f"Exported {options['dataset']} to {options['output']}."))
@@ -0,0 +1,41 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from apps.services import catalog_import_service
+
+
+class Command(BaseCommand):
+    help = "Bulk imports books (and their authors) from a CSV or JSONL file, upserting on ISBN."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV (with header row) or JSONL file to import.")
+        parser.add_argument(
+            '--format', dest='file_format', choices=catalog_import_service.SUPPORTED_FORMATS,
+            help="Input format. Defaults to the file extension.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=catalog_import_service.IMPORT_BATCH_SIZE,
+            help="Books written per database transaction.",
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['file_format'] or catalog_import_service.detect_format(path)
+        if file_format is None:
+            raise CommandError("Cannot detect the file format; pass --format csv|jsonl.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        try:
+            with open(path, 'rb') as stream:
+                report = catalog_import_service.import_catalog(stream, file_format, batch_size=options['batch_size'])
+        except OSError as e:
+            raise CommandError(f"Cannot read '{path}': {e}")
+
+        for error in report['errors']:
+            self.stderr.write(json.dumps(error))
+        if report['failed'] > len(report['errors']):
+            self.stderr.write(f"... {report['failed'] - len(report['errors'])} more errors not shown.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {report['rows']} rows: {report['created']} created, {report['updated']} updated, "
+            f"{report['failed']} failed, {report['authors_created']} new authors."
+        ))
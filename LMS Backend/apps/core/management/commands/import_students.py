@@ -0,0 +1,52 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from apps.services import catalog_import_service, student_import_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Registers students (user accounts with a student profile) from a CSV or JSONL file. "
+        "Columns/keys: username, email, password, first_name, last_name, student_id, department, "
+        "enrollment_date. Passwords are hashed in parallel; duplicates are reported per row."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV (with header row) or JSONL file to import.")
+        parser.add_argument(
+            '--format', dest='file_format', choices=catalog_import_service.SUPPORTED_FORMATS,
+            help="Input format. Defaults to the file extension.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=student_import_service.STUDENT_IMPORT_BATCH_SIZE,
+            help="Students written per database transaction.",
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Password hashing processes (default: one per CPU; 0 hashes in this process).",
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['file_format'] or catalog_import_service.detect_format(path)
+        if file_format is None:
+            raise CommandError("Cannot detect the file format; pass --format csv|jsonl.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        if options['workers'] is not None and options['workers'] < 0:
+            raise CommandError("--workers cannot be negative.")
+
+        try:
+            with open(path, 'rb') as stream:
+                report = student_import_service.import_file(
+                    stream, file_format, batch_size=options['batch_size'], workers=options['workers'],
+                )
+        except OSError as e:
+            raise CommandError(f"Cannot read '{path}': {e}")
+
+        for error in report['errors']:
+            self.stderr.write(json.dumps(error))
+        if report['failed'] > len(report['errors']):
+            self.stderr.write(f"... {report['failed'] - len(report['errors'])} more errors not shown.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {report['rows']} rows: {report['created']} students registered, {report['failed']} failed."
+        ))
@@ -0,0 +1,54 @@
+import json
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from apps.services import transaction_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Nightly overdue run: walks all overdue loans in chunks and writes one NDJSON "
+        "notice per loan (student, contact, book, days overdue) to a file or stdout."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help="Destination file. Defaults to stdout.")
+        parser.add_argument(
+            '--chunk-size', type=int, default=transaction_service.OVERDUE_CHUNK_SIZE,
+            help="Loans read per database query.",
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        # One reference time for the whole run, so chunks agree on what is overdue
+        now = timezone.now()
+        try:
+            output = open(options['output'], 'w', encoding='utf-8') if options['output'] else sys.stdout
+        except OSError as e:
+            raise CommandError(f"Cannot write '{options['output']}': {e}")
+
+        loans = 0
+        students = set()
+        try:
+            for chunk in transaction_service.iter_overdue_loans(options['chunk_size'], now=now):
+                for row in chunk:
+                    notice = {
+                        'transaction_id': row['id'],
+                        'student_pk': row['student_id'],
+                        'student_id': row['student__student_id'],
+                        'username': row['student__user__username'],
+                        'email': row['student__user__email'],
+                        'book_id': row['book_id'],
+                        'book_title': row['book__title'],
+                        'due_date': row['due_date'],
+                        'days_overdue': (now - row['due_date']).days,
+                    }
+                    output.write(json.dumps(notice, cls=DjangoJSONEncoder) + '\n')
+                    students.add(row['student_id'])
+                loans += len(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(self.style.SUCCESS(f"{loans} overdue loans for {len(students)} students."))
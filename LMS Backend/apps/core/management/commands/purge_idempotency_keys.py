@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.services import idempotency_service
+
+
+class Command(BaseCommand):
+    help = "Deletes expired Idempotency-Key records in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=idempotency_service.IDEMPOTENCY_PURGE_BATCH_SIZE,
+            help="Records deleted per database transaction.",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        verbosity = options['verbosity']
+        def progress(deleted):
+            if verbosity > 1:
+                self.stderr.write(f"{deleted} records deleted...")
+
+        deleted = idempotency_service.purge_expired(batch_size=options['batch_size'], progress=progress)
+        self.stderr.write(self.style.SUCCESS(f"Purged {deleted} expired idempotency records."))
@@ -0,0 +1,33 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from apps.services import analytics_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the daily circulation rollups (per book, per department and library-wide) "
+        "of every day before --until (default today) from the transaction history, in batches. "
+        "Later days are kept up to date by the 'analytics' outbox sink (manage.py run_outbox)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--until', type=date.fromisoformat, default=None,
+            help="First day (YYYY-MM-DD) left to the outbox sink; defaults to today.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=analytics_service.ANALYTICS_BATCH_SIZE,
+            help="History rows read per database transaction.",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        verbosity = options['verbosity']
+        def progress(read):
+            if verbosity > 1:
+                self.stderr.write(f"{read} transactions read...")
+
+        read = analytics_service.rebuild_rollups(until=options['until'], batch_size=options['batch_size'], progress=progress)
+        self.stderr.write(self.style.SUCCESS(f"Rebuilt the circulation rollups from {read} transactions."))
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.services import search_service
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text catalog search index (core_book_fts)."
+
+    def handle(self, *args, **options):
+        count = search_service.rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} books."))
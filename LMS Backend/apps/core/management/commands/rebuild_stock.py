@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.services import stock_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes every book's stock from the stock ledger (latest snapshot plus later "
+        "movements) and lists books whose Book.stock differs. --apply resets them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--apply', action='store_true', help="Overwrite drifted stock with the ledger value.")
+        parser.add_argument(
+            '--batch-size', type=int, default=stock_service.STOCK_BATCH_SIZE,
+            help="Books checked per query.",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        verbosity = options['verbosity']
+        def progress(checked):
+            if verbosity > 1:
+                self.stderr.write(f"{checked} books checked...")
+
+        drifted = stock_service.rebuild_stock(apply=options['apply'], batch_size=options['batch_size'], progress=progress)
+        for row in drifted:
+            self.stdout.write(f"Book {row['book_id']}: stock {row['stock']}, ledger {row['ledger_stock']}")
+        action = "Reset" if options['apply'] else "Found"
+        self.stderr.write(self.style.SUCCESS(f"{action} {len(drifted)} books with drifted stock."))
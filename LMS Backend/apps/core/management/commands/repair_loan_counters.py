@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.services import student_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes every student's active_loans and overdue_loans counters from the "
+        "transactions. Run nightly to refresh overdue counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=student_service.COUNTER_REPAIR_BATCH_SIZE,
+            help="Students updated per statement.",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        updated = student_service.repair_loan_counters(batch_size=options['batch_size'])
+        self.stderr.write(self.style.SUCCESS(f"Recomputed loan counters for {updated} students."))
@@ -0,0 +1,63 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from apps.services import archive_service, outbox_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Delivers pending circulation events from the outbox to the sinks in "
+        "settings.LMS_OUTBOX_SINKS, in batches, with retries and backoff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sink', action='append', dest='sinks', help="Only this sink (repeatable).")
+        parser.add_argument(
+            '--batch-size', type=int, default=outbox_service.OUTBOX_BATCH_SIZE,
+            help="Events handed to a sink at once.",
+        )
+        parser.add_argument('--max-batches', type=int, help="Stop each sink after this many batches.")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new events.")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds between polls with --loop.")
+        parser.add_argument('--stats', action='store_true', help="Print per-sink lag metrics as JSON and exit.")
+        parser.add_argument('--purge-older-than', help="Afterwards, delete delivered events older than e.g. 7d.")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(outbox_service.lag_report(), cls=DjangoJSONEncoder, indent=2))
+            return
+
+        sinks = options['sinks']
+        unknown = set(sinks or ()) - set(outbox_service.configured_sinks())
+        if unknown:
+            raise CommandError(f"Unknown sink(s): {', '.join(sorted(unknown))}.")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        purge_after = None
+        if options['purge_older_than']:
+            try:
+                purge_after = archive_service.parse_age(options['purge_older_than'])
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        owner = outbox_service.default_owner()
+        while True:
+            delivered = outbox_service.dispatch(
+                sinks, batch_size=options['batch_size'], max_batches=options['max_batches'], owner=owner,
+            )
+            for sink, count in delivered.items():
+                if count or options['verbosity'] > 1:
+                    self.stderr.write(f"{sink}: {count} events delivered.")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        for row in outbox_service.lag_report():
+            if row['failures']:
+                self.stderr.write(self.style.WARNING(
+                    f"{row['sink']}: {row['pending']} events pending after {row['failures']} failed deliveries "
+                    f"({row['last_error']})."
+                ))
+        if purge_after is not None:
+            self.stderr.write(f"Purged {outbox_service.purge_delivered(purge_after)} delivered events.")
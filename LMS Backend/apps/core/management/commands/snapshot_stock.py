@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.services import stock_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Takes a stock snapshot of every book with ledger movements since its last "
+        "snapshot, so stock reads and rebuilds only add up newer movements."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=stock_service.STOCK_BATCH_SIZE,
+            help="Books snapshotted per query.",
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        taken = stock_service.take_snapshots(batch_size=options['batch_size'])
+        self.stderr.write(self.style.SUCCESS(f"Took {taken} stock snapshots."))
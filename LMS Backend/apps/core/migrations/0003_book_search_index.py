@@ -0,0 +1,82 @@
+from django.db import migrations
+
+# Full-text index over the catalog. The FTS5 table is kept in sync by triggers, so
+# every write path (services, admin, bulk imports) updates it in the same statement.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE core_book_fts USING fts5(
+        title, isbn, author_name,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER core_book_fts_ai AFTER INSERT ON core_book BEGIN
+        INSERT INTO core_book_fts (rowid, title, isbn, author_name)
+        VALUES (new.id, new.title, new.isbn, (SELECT name FROM core_author WHERE id = new.author_id));
+    END
+    """,
+    """
+    CREATE TRIGGER core_book_fts_au AFTER UPDATE OF title, isbn, author_id ON core_book
+    WHEN old.title IS NOT new.title OR old.isbn IS NOT new.isbn OR old.author_id IS NOT new.author_id
+    BEGIN
+        UPDATE core_book_fts
+        SET title = new.title,
+            isbn = new.isbn,
+            author_name = (SELECT name FROM core_author WHERE id = new.author_id)
+        WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_book_fts_ad AFTER DELETE ON core_book BEGIN
+        DELETE FROM core_book_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_author_fts_au AFTER UPDATE OF name ON core_author
+    WHEN old.name IS NOT new.name
+    BEGIN
+        UPDATE core_book_fts SET author_name = new.name
+        WHERE rowid IN (SELECT id FROM core_book WHERE author_id = new.id);
+    END
+    """,
+    """
+    INSERT INTO core_book_fts (rowid, title, isbn, author_name)
+    SELECT b.id, b.title, b.isbn, a.name
+    FROM core_book b LEFT JOIN core_author a ON a.id = b.author_id
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS core_author_fts_au",
+    "DROP TRIGGER IF EXISTS core_book_fts_ad",
+    "DROP TRIGGER IF EXISTS core_book_fts_au",
+    "DROP TRIGGER IF EXISTS core_book_fts_ai",
+    "DROP TABLE IF EXISTS core_book_fts",
+]
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite specific; other backends fall back to LIKE scans in search_service.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,67 @@
+from importlib import import_module
+import django.utils.timezone
+from django.db import migrations, models
+
+# Adding these columns makes SQLite rebuild core_author/core_book, which fails while
+# the full-text index triggers (migration 0003) reference the tables being swapped.
+# The triggers are dropped for the rebuild and recreated afterwards.
+search_index = import_module('apps.core.migrations.0003_book_search_index')
+CREATE_TRIGGERS = [sql for sql in search_index.CREATE_SQL if 'CREATE TRIGGER' in sql]
+DROP_TRIGGERS = [sql for sql in search_index.DROP_SQL if 'DROP TRIGGER' in sql]
+
+
+def drop_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in DROP_TRIGGERS:
+            schema_editor.execute(sql)
+
+
+def create_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in CREATE_TRIGGERS:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_book_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_triggers, create_search_triggers),
+        migrations.AddField(
+            model_name='author',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
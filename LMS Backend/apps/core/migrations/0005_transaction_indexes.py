@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-17 04:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_change_tracking_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['student', '-borrow_date', '-id'], name='txn_student_borrow_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['status', 'due_date'], name='txn_status_due_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'Borrowed')), fields=('student', 'book'), name='txn_one_active_loan'),
+        ),
+    ]
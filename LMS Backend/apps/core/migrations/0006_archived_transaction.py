@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-17 04:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(help_text='ID of the original transaction', primary_key=True, serialize=False)),
+                ('borrow_date', models.DateTimeField()),
+                ('due_date', models.DateTimeField()),
+                ('return_date', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('Borrowed', 'Borrowed'), ('Returned', 'Returned')], default='Returned', max_length=10)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_transactions', to='core.book')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to='core.student')),
+            ],
+            options={
+                'verbose_name': 'Archived transaction',
+                'verbose_name_plural': 'Archived transactions',
+                'ordering': ['-borrow_date'],
+                'indexes': [models.Index(fields=['student', '-borrow_date', '-id'], name='archtxn_student_borrow_idx')],
+            },
+        ),
+    ]
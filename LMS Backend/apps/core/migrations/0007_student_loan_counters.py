@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-17 04:49
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def populate_loan_counters(apps, schema_editor):
+    """Seeds the counters from the existing loans."""
+    Student = apps.get_model('core', 'Student')
+    Transaction = apps.get_model('core', 'Transaction')
+    now = timezone.now()
+
+    def count(**filters):
+        rows = (
+            Transaction.objects.filter(student=OuterRef('pk'), status='Borrowed', **filters)
+            .order_by().values('student').annotate(total=Count('pk')).values('total')
+        )
+        return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+    Student.objects.update(active_loans=count(), overdue_loans=count(due_date__lt=now), overdue_checked_at=now)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_archived_transaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='active_loans',
+            field=models.PositiveIntegerField(default=0, help_text='Books currently borrowed'),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='overdue_checked_at',
+            field=models.DateTimeField(blank=True, help_text='When overdue_loans was last recomputed', null=True),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='overdue_loans',
+            field=models.PositiveIntegerField(default=0, help_text='Borrowed books past due, as of overdue_checked_at'),
+        ),
+        migrations.RunPython(populate_loan_counters, migrations.RunPython.noop),
+    ]
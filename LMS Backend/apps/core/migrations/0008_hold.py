@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-17 04:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_student_loan_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('Waiting', 'Waiting'), ('Ready', 'Ready'), ('Fulfilled', 'Fulfilled'), ('Cancelled', 'Cancelled'), ('Expired', 'Expired')], default='Waiting', max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Queue order')),
+                ('ready_at', models.DateTimeField(blank=True, help_text='When a copy was set aside', null=True)),
+                ('expires_at', models.DateTimeField(blank=True, help_text='Pick-up deadline of a ready hold', null=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='core.book')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='core.student')),
+            ],
+            options={
+                'verbose_name': 'Hold',
+                'verbose_name_plural': 'Holds',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'Waiting')), fields=['book', 'created_at', 'id'], name='hold_queue_idx'), models.Index(condition=models.Q(('status', 'Ready')), fields=['expires_at', 'id'], name='hold_ready_expiry_idx'), models.Index(fields=['student', '-created_at', '-id'], name='hold_student_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['Waiting', 'Ready'])), fields=('student', 'book'), name='hold_one_open_per_book')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-17 04:55
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_hold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sink', models.CharField(max_length=50, unique=True)),
+                ('position', models.BigIntegerField(default=0, help_text='ID of the last event delivered')),
+                ('lease_owner', models.CharField(blank=True, default='', max_length=100)),
+                ('lease_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('delivered', models.PositiveBigIntegerField(default=0, help_text='Events delivered so far')),
+                ('last_delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('last_lag_seconds', models.FloatField(blank=True, help_text='Age of the newest event of the last batch when delivered', null=True)),
+            ],
+            options={
+                'verbose_name': 'Outbox cursor',
+                'verbose_name_plural': 'Outbox cursors',
+                'ordering': ['sink'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(help_text="e.g. 'loan.borrowed'", max_length=50)),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Outbox event',
+                'verbose_name_plural': 'Outbox events',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2 on 2026-10-17 04:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def take_opening_snapshots(apps, schema_editor):
+    """The current stock of every book is its opening balance (movement 0)."""
+    Book = apps.get_model('core', 'Book')
+    StockSnapshot = apps.get_model('core', 'StockSnapshot')
+    now = timezone.now()
+    last_pk = 0
+    while True:
+        rows = list(Book.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'stock')[:2000])
+        if not rows:
+            return
+        StockSnapshot.objects.bulk_create(
+            [StockSnapshot(book_id=pk, stock=stock, movement_id=0, taken_at=now) for pk, stock in rows]
+        )
+        last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_outbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('acquisition', 'Acquisition'), ('borrow', 'Borrow'), ('return', 'Return'), ('hold', 'Set aside for a hold'), ('hold_release', 'Released from a hold'), ('write_off', 'Write-off'), ('adjustment', 'Manual adjustment')], max_length=20)),
+                ('quantity', models.IntegerField(help_text='Change of the shelf stock (negative when copies leave it)')),
+                ('loan_id', models.BigIntegerField(blank=True, help_text='Borrowing transaction, for borrows and returns', null=True)),
+                ('note', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='core.book')),
+            ],
+            options={
+                'verbose_name': 'Stock movement',
+                'verbose_name_plural': 'Stock movements',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['book', 'id'], name='stockmv_book_id_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock', models.IntegerField()),
+                ('movement_id', models.BigIntegerField(default=0, help_text='ID of the last movement included')),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='core.book')),
+            ],
+            options={
+                'verbose_name': 'Stock snapshot',
+                'verbose_name_plural': 'Stock snapshots',
+                'ordering': ['-taken_at'],
+                'indexes': [models.Index(fields=['book', 'movement_id'], name='stocksnap_book_mv_idx'), models.Index(fields=['book', 'taken_at'], name='stocksnap_book_taken_idx')],
+            },
+        ),
+        migrations.RunPython(take_opening_snapshots, migrations.RunPython.noop),
+    ]
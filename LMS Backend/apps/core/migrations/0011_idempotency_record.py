@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-17 05:04
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(help_text="Whose key it is, e.g. 'user:12' or 'anonymous'", max_length=50)),
+                ('key', models.CharField(max_length=255)),
+                ('request_hash', models.CharField(help_text='Fingerprint of the method, path and body', max_length=64)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('response_body', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Idempotency record',
+                'verbose_name_plural': 'Idempotency records',
+                'indexes': [models.Index(fields=['expires_at', 'id'], name='idem_expires_idx')],
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key'), name='idem_scope_key_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2 on 2026-10-17 05:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_idempotency_record'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('history_until', models.DateField(blank=True, help_text='Days before this were rebuilt from history', null=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Rollup state',
+                'verbose_name_plural': 'Rollup states',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCirculation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('borrows', models.PositiveIntegerField(default=0)),
+                ('returns', models.PositiveIntegerField(default=0)),
+                ('late_returns', models.PositiveIntegerField(default=0, help_text='Returns after the due date')),
+            ],
+            options={
+                'verbose_name': 'Daily circulation',
+                'verbose_name_plural': 'Daily circulation',
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('day',), name='rollup_day_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyDepartmentCirculation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('borrows', models.PositiveIntegerField(default=0)),
+                ('returns', models.PositiveIntegerField(default=0)),
+                ('late_returns', models.PositiveIntegerField(default=0, help_text='Returns after the due date')),
+                ('department', models.CharField(blank=True, default='', max_length=100)),
+            ],
+            options={
+                'verbose_name': 'Daily department circulation',
+                'verbose_name_plural': 'Daily department circulation',
+                'ordering': ['day', 'department'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'department'), name='rollup_dept_day_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyBookCirculation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('borrows', models.PositiveIntegerField(default=0)),
+                ('returns', models.PositiveIntegerField(default=0)),
+                ('late_returns', models.PositiveIntegerField(default=0, help_text='Returns after the due date')),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_circulation', to='core.book')),
+            ],
+            options={
+                'verbose_name': 'Daily book circulation',
+                'verbose_name_plural': 'Daily book circulation',
+                'ordering': ['day', 'book'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'book'), name='rollup_book_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-17 05:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_circulation_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TokenRevocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.BigIntegerField(unique=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('revoked_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Token revocation',
+                'verbose_name_plural': 'Token revocations',
+            },
+        ),
+    ]
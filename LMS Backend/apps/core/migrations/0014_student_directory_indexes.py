@@ -0,0 +1,40 @@
+# Generated by Django 5.2 on 2026-10-17 05:27
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+# auth_user belongs to django.contrib.auth, so its indexes for the student directory
+# search (prefixes of LOWER(username / first_name / last_name)) are created here.
+USER_INDEXES = {
+    'core_user_username_lower_idx': 'username',
+    'core_user_first_name_lower_idx': 'first_name',
+    'core_user_last_name_lower_idx': 'last_name',
+}
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_token_revocation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(django.db.models.functions.text.Lower('student_id'), name='student_sid_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['department', 'enrollment_date'], name='student_dept_enrolled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['enrollment_date'], name='student_enrolled_idx'),
+        ),
+        migrations.RunSQL(
+            [f"CREATE INDEX {name} ON auth_user (LOWER({column}))" for name, column in USER_INDEXES.items()],
+            [f"DROP INDEX {name}" for name in USER_INDEXES],
+        ),
+    ]
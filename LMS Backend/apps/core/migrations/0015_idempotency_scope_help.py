@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 05:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_student_directory_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='idempotencyrecord',
+            name='request_hash',
+            field=models.CharField(help_text='HMAC of the method, path and body', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='idempotencyrecord',
+            name='scope',
+            field=models.CharField(help_text="Whose key it is: 'user:12', or 'client:<address hash>' for anonymous requests", max_length=50),
+        ),
+    ]
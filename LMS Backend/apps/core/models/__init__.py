@@ -5,6 +5,13 @@ from .author import Author
 from .book import Book
 from .student import Student
 from .transaction import Transaction
+from .archived_transaction import ArchivedTransaction
+from .hold import Hold
+from .outbox import OutboxCursor, OutboxEvent
+from .stock import StockMovement, StockSnapshot
+from .idempotency import IdempotencyRecord
+from .analytics import DailyBookCirculation, DailyCirculation, DailyDepartmentCirculation, RollupState
+from .token_revocation import TokenRevocation
 
 # Define __all__ for explicit public interface (optional but good practice)
-__all__ = ['Author', 'Book', 'Student', 'Transaction']
\ No newline at end of file
+__all__ = ['Author', 'Book', 'Student', 'Transaction', 'ArchivedTransaction', 'Hold', 'OutboxEvent', 'OutboxCursor', 'StockMovement', 'StockSnapshot', 'IdempotencyRecord', 'DailyCirculation', 'DailyBookCirculation', 'DailyDepartmentCirculation', 'RollupState', 'TokenRevocation']
\ No newline at end of file
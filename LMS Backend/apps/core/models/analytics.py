@@ -0,0 +1,84 @@
+from django.db import models
+from django.utils import timezone
+from .book import Book
+
+class DailyRollup(models.Model):
+    """
+    Circulation counts of one day (in the library's time zone). Rollups are
+    maintained by analytics_service from the outbox events and rebuilt from
+    the transaction history by `manage.py rebuild_analytics`.
+    """
+    day = models.DateField()
+    borrows = models.PositiveIntegerField(default=0)
+    returns = models.PositiveIntegerField(default=0)
+    late_returns = models.PositiveIntegerField(default=0, help_text='Returns after the due date')
+
+    class Meta:
+        abstract = True
+
+
+class DailyCirculation(DailyRollup):
+    """Library-wide circulation of a day."""
+
+    def __str__(self):
+        return f"{self.day}: {self.borrows} borrowed, {self.returns} returned"
+
+    class Meta:
+        verbose_name = "Daily circulation"
+        verbose_name_plural = "Daily circulation"
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['day'], name='rollup_day_uniq'),
+        ]
+
+
+class DailyBookCirculation(DailyRollup):
+    """Circulation of one book on a day."""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='daily_circulation')
+
+    def __str__(self):
+        return f"Book {self.book_id} on {self.day}: {self.borrows} borrowed"
+
+    class Meta:
+        verbose_name = "Daily book circulation"
+        verbose_name_plural = "Daily book circulation"
+        ordering = ['day', 'book']
+        constraints = [
+            # Also the index behind date range reads (most borrowed books)
+            models.UniqueConstraint(fields=['day', 'book'], name='rollup_book_day_uniq'),
+        ]
+
+
+class DailyDepartmentCirculation(DailyRollup):
+    """Circulation of the students of one department on a day ('' for no department)."""
+    department = models.CharField(max_length=100, blank=True, default='')
+
+    def __str__(self):
+        return f"{self.department or 'No department'} on {self.day}: {self.borrows} borrowed"
+
+    class Meta:
+        verbose_name = "Daily department circulation"
+        verbose_name_plural = "Daily department circulation"
+        ordering = ['day', 'department']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'department'], name='rollup_dept_day_uniq'),
+        ]
+
+
+class RollupState(models.Model):
+    """
+    Progress of the rollups: the last outbox event applied (so redelivered
+    events are not counted twice) and the first day not covered by the last
+    rebuild from history (events of earlier days are already counted there).
+    """
+    name = models.CharField(max_length=50, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    history_until = models.DateField(null=True, blank=True, help_text='Days before this were rebuilt from history')
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} at event {self.last_event_id}"
+
+    class Meta:
+        verbose_name = "Rollup state"
+        verbose_name_plural = "Rollup states"
@@ -0,0 +1,29 @@
+from django.db import models
+from .book import Book
+from .student import Student
+from .transaction import Transaction
+
+class ArchivedTransaction(models.Model):
+    """
+    A returned transaction moved out of the hot Transaction table by
+    `manage.py archive_transactions`. Keeps the original transaction ID.
+    """
+    id = models.BigIntegerField(primary_key=True, help_text='ID of the original transaction')
+    book = models.ForeignKey(Book, on_delete=models.PROTECT, related_name='archived_transactions')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='archived_transactions')
+    borrow_date = models.DateTimeField()
+    due_date = models.DateTimeField()
+    return_date = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=Transaction.STATUS_CHOICES, default='Returned')
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived transaction {self.pk}"
+
+    class Meta:
+        verbose_name = "Archived transaction"
+        verbose_name_plural = "Archived transactions"
+        ordering = ['-borrow_date']
+        indexes = [
+            models.Index(fields=['student', '-borrow_date', '-id'], name='archtxn_student_borrow_idx'), # Full student history
+        ]
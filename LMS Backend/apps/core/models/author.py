@@ -7,6 +7,9 @@ class Author(models.Model):
     name = models.CharField(max_length=255)
     birth_date = models.DateField(null=True, blank=True)
     biography = models.TextField(null=True, blank=True)
+    # Change tracking (Last-Modified headers)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -14,4 +17,7 @@ class Author(models.Model):
     class Meta:
         verbose_name = "Author"
         verbose_name_plural = "Authors"
-        ordering = ['name'] # Optional: Order authors alphabetically by default
\ No newline at end of file
+        ordering = ['name'] # Optional: Order authors alphabetically by default
+        indexes = [
+            models.Index(fields=['name', 'id'], name='author_name_id_idx'), # Keyset pagination
+        ]
\ No newline at end of file
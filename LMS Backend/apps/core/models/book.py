@@ -10,6 +10,9 @@ class Book(models.Model):
     published_date = models.DateField(null=True, blank=True)
     author = models.ForeignKey(Author, on_delete=models.SET_NULL, null=True, blank=True, related_name='books')
     stock = models.PositiveIntegerField(default=0, help_text='Number of available copies')
+    # Change tracking (Last-Modified headers); set explicitly by queryset.update() callers
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.title} ({self.isbn})"
@@ -17,4 +20,7 @@ class Book(models.Model):
     class Meta:
         verbose_name = "Book"
         verbose_name_plural = "Books"
-        ordering = ['title'] # Optional: Order books alphabetically by title
\ No newline at end of file
+        ordering = ['title'] # Optional: Order books alphabetically by title
+        indexes = [
+            models.Index(fields=['title', 'id'], name='book_title_id_idx'), # Keyset pagination
+        ]
\ No newline at end of file
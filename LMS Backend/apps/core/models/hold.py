@@ -0,0 +1,83 @@
+from django.db import models
+from django.utils import timezone
+from .book import Book
+from .student import Student
+
+class HoldQuerySet(models.QuerySet):
+    def with_position(self):
+        """
+        Annotates each hold with its 1-based 'position' in the book's queue
+        (NULL unless it is waiting), counted over the hold_queue_idx index.
+        """
+        ahead = (
+            Hold.objects.filter(book=models.OuterRef('book'), status=Hold.WAITING)
+            .filter(
+                models.Q(created_at__lt=models.OuterRef('created_at'))
+                | models.Q(created_at=models.OuterRef('created_at'), id__lte=models.OuterRef('id'))
+            )
+            .order_by().values('book').annotate(total=models.Count('pk')).values('total')
+        )
+        return self.annotate(position=models.Case(
+            models.When(status=Hold.WAITING, then=models.Subquery(ahead, output_field=models.IntegerField())),
+            default=None,
+            output_field=models.IntegerField(),
+        ))
+
+
+class Hold(models.Model):
+    """
+    A student's place in the FIFO queue for a book that is out of stock.
+
+    Returned copies are handed to the oldest waiting hold of the book instead of
+    going back on the shelf; the hold is then 'Ready' (the copy is set aside for
+    the student) until it is borrowed, cancelled or expires.
+    """
+    WAITING = 'Waiting'
+    READY = 'Ready'
+    FULFILLED = 'Fulfilled'
+    CANCELLED = 'Cancelled'
+    EXPIRED = 'Expired'
+    STATUS_CHOICES = [
+        (WAITING, 'Waiting'),
+        (READY, 'Ready'),
+        (FULFILLED, 'Fulfilled'),
+        (CANCELLED, 'Cancelled'),
+        (EXPIRED, 'Expired'),
+    ]
+    OPEN_STATUSES = (WAITING, READY)
+
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='holds')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='holds')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=WAITING)
+    created_at = models.DateTimeField(default=timezone.now, help_text='Queue order')
+    ready_at = models.DateTimeField(null=True, blank=True, help_text='When a copy was set aside')
+    expires_at = models.DateTimeField(null=True, blank=True, help_text='Pick-up deadline of a ready hold')
+    closed_at = models.DateTimeField(null=True, blank=True)
+
+    objects = HoldQuerySet.as_manager()
+
+    def __str__(self):
+        return f"Hold {self.pk} on book {self.book_id} ({self.status})"
+
+    class Meta:
+        verbose_name = "Hold"
+        verbose_name_plural = "Holds"
+        ordering = ['-created_at']
+        indexes = [
+            # Head of a book's queue; only waiting holds are indexed
+            models.Index(
+                fields=['book', 'created_at', 'id'], condition=models.Q(status='Waiting'), name='hold_queue_idx',
+            ),
+            # Ready holds past their pick-up deadline (expire_holds)
+            models.Index(fields=['expires_at', 'id'], condition=models.Q(status='Ready'), name='hold_ready_expiry_idx'),
+            models.Index(fields=['student', '-created_at', '-id'], name='hold_student_idx'), # A student's holds, newest first
+        ]
+        constraints = [
+            # At most one open hold per student and book; also the index behind
+            # the (student, book, status='Ready') lookup when borrowing
+            models.UniqueConstraint(
+                fields=['student', 'book'],
+                condition=models.Q(status__in=['Waiting', 'Ready']),
+                name='hold_one_open_per_book',
+            ),
+        ]
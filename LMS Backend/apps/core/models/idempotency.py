@@ -0,0 +1,30 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+class IdempotencyRecord(models.Model):
+    """
+    The stored outcome of a POST sent with an Idempotency-Key header, replayed
+    when the client retries with the same key. status_code is NULL while the
+    first request is still being processed.
+    """
+    scope = models.CharField(max_length=50, help_text="Whose key it is: 'user:12', or 'client:<address hash>' for anonymous requests")
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64, help_text='HMAC of the method, path and body')
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
+
+    class Meta:
+        verbose_name = "Idempotency record"
+        verbose_name_plural = "Idempotency records"
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='idem_scope_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at', 'id'], name='idem_expires_idx'), # Purging expired keys
+        ]
@@ -0,0 +1,48 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+class OutboxEvent(models.Model):
+    """
+    A circulation event (e.g. a borrow or return) written in the same database
+    transaction as the change it describes, and delivered to downstream sinks
+    afterwards by `manage.py run_outbox`. Events are delivered in ID order.
+    """
+    topic = models.CharField(max_length=50, help_text="e.g. 'loan.borrowed'")
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.topic} #{self.pk}"
+
+    class Meta:
+        verbose_name = "Outbox event"
+        verbose_name_plural = "Outbox events"
+        ordering = ['id']
+
+
+class OutboxCursor(models.Model):
+    """
+    Delivery state of one sink: the last event it has received, the lease held
+    by the dispatcher currently serving it, its retry backoff and lag metrics.
+    """
+    sink = models.CharField(max_length=50, unique=True)
+    position = models.BigIntegerField(default=0, help_text='ID of the last event delivered')
+    lease_owner = models.CharField(max_length=100, blank=True, default='')
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    # Retries: consecutive failed deliveries and when the next one may start
+    failures = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    # Metrics
+    delivered = models.PositiveBigIntegerField(default=0, help_text='Events delivered so far')
+    last_delivered_at = models.DateTimeField(null=True, blank=True)
+    last_lag_seconds = models.FloatField(null=True, blank=True, help_text='Age of the newest event of the last batch when delivered')
+
+    def __str__(self):
+        return f"{self.sink} at event {self.position}"
+
+    class Meta:
+        verbose_name = "Outbox cursor"
+        verbose_name_plural = "Outbox cursors"
+        ordering = ['sink']
@@ -0,0 +1,68 @@
+from django.db import models
+from django.utils import timezone
+from .book import Book
+
+class StockMovement(models.Model):
+    """
+    One entry of the append-only stock ledger: a signed change of a book's
+    shelf stock. Book.stock is the running total of these entries (see
+    stock_service); rows are only ever inserted.
+    """
+    ACQUISITION = 'acquisition'
+    BORROW = 'borrow'
+    RETURN = 'return'
+    HOLD = 'hold'
+    HOLD_RELEASE = 'hold_release'
+    WRITE_OFF = 'write_off'
+    ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = [
+        (ACQUISITION, 'Acquisition'),
+        (BORROW, 'Borrow'),
+        (RETURN, 'Return'),
+        (HOLD, 'Set aside for a hold'),
+        (HOLD_RELEASE, 'Released from a hold'),
+        (WRITE_OFF, 'Write-off'),
+        (ADJUSTMENT, 'Manual adjustment'),
+    ]
+
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='stock_movements')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    quantity = models.IntegerField(help_text='Change of the shelf stock (negative when copies leave it)')
+    loan_id = models.BigIntegerField(null=True, blank=True, help_text='Borrowing transaction, for borrows and returns')
+    note = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.kind} {self.quantity:+d} for book {self.book_id}"
+
+    class Meta:
+        verbose_name = "Stock movement"
+        verbose_name_plural = "Stock movements"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['book', 'id'], name='stockmv_book_id_idx'), # Movements of a book since a snapshot
+        ]
+
+
+class StockSnapshot(models.Model):
+    """
+    A book's stock after all ledger entries up to movement_id, so stock can be
+    recomputed from the latest snapshot instead of the whole ledger. The
+    opening snapshots (movement_id 0) hold the stock from before the ledger.
+    """
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='stock_snapshots')
+    stock = models.IntegerField()
+    movement_id = models.BigIntegerField(default=0, help_text='ID of the last movement included')
+    taken_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Book {self.book_id}: {self.stock} at movement {self.movement_id}"
+
+    class Meta:
+        verbose_name = "Stock snapshot"
+        verbose_name_plural = "Stock snapshots"
+        ordering = ['-taken_at']
+        indexes = [
+            models.Index(fields=['book', 'movement_id'], name='stocksnap_book_mv_idx'), # Latest snapshot of a book
+            models.Index(fields=['book', 'taken_at'], name='stocksnap_book_taken_idx'), # Latest snapshot before a date
+        ]
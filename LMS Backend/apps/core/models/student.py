@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User # Import the standard User model
 
 class Student(models.Model):
@@ -9,10 +10,24 @@ class Student(models.Model):
     student_id = models.CharField(max_length=20, unique=True, help_text='Unique ID for the student')
     department = models.CharField(max_length=100, null=True, blank=True)
     enrollment_date = models.DateField(null=True, blank=True)
+    # Loan counters maintained by transaction_service (repaired by `manage.py repair_loan_counters`)
+    active_loans = models.PositiveIntegerField(default=0, help_text='Books currently borrowed')
+    overdue_loans = models.PositiveIntegerField(default=0, help_text='Borrowed books past due, as of overdue_checked_at')
+    overdue_checked_at = models.DateTimeField(null=True, blank=True, help_text='When overdue_loans was last recomputed')
+    # Change tracking (Last-Modified headers)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.user.username # Display the associated username
 
     class Meta:
         verbose_name = "Student"
-        verbose_name_plural = "Students"
\ No newline at end of file
+        verbose_name_plural = "Students"
+        indexes = [
+            # Directory search and filters (see search_service.search_students and StudentViewSet);
+            # auth_user gets LOWER() indexes on username and names in migration 0014
+            models.Index(Lower('student_id'), name='student_sid_lower_idx'),
+            models.Index(fields=['department', 'enrollment_date'], name='student_dept_enrolled_idx'),
+            models.Index(fields=['enrollment_date'], name='student_enrolled_idx'),
+        ]
\ No newline at end of file
@@ -0,0 +1,20 @@
+from django.db import models
+from django.utils import timezone
+
+class TokenRevocation(models.Model):
+    """
+    The current token version of a user. Access and refresh tokens carry the
+    version they were issued at; bumping it (on a role, password or status
+    change, see token_service.revoke_tokens) rejects every token issued before.
+    Keyed by the plain user ID so the row outlives a deleted user.
+    """
+    user_id = models.BigIntegerField(unique=True)
+    version = models.PositiveIntegerField(default=0)
+    revoked_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"User {self.user_id} at token version {self.version}"
+
+    class Meta:
+        verbose_name = "Token revocation"
+        verbose_name_plural = "Token revocations"
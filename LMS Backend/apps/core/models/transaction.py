@@ -3,6 +3,26 @@ from django.utils import timezone
 from .book import Book
 from .student import Student
 
+class TransactionQuerySet(models.QuerySet):
+    """
+    Overdue status computed in SQL, so loans can be filtered, counted and
+    listed as overdue without loading and checking rows one at a time.
+    """
+    @staticmethod
+    def overdue_condition(now=None) -> models.Q:
+        return models.Q(status='Borrowed', due_date__lt=now or timezone.now())
+
+    def with_overdue(self, now=None):
+        """Annotates each loan with a boolean 'overdue' (read by Transaction.is_overdue())."""
+        return self.annotate(
+            overdue=models.ExpressionWrapper(self.overdue_condition(now), output_field=models.BooleanField())
+        )
+
+    def overdue(self, now=None):
+        """Loans that are borrowed and past their due date (served by txn_status_due_idx)."""
+        return self.filter(self.overdue_condition(now))
+
+
 class Transaction(models.Model):
     """
     Represents a book borrowing/return transaction.
@@ -19,14 +39,35 @@ class Transaction(models.Model):
     return_date = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Borrowed')
 
+    objects = TransactionQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.student.user.username} borrowed {self.book.title} on {self.borrow_date.strftime('%Y-%m-%d')}"
 
     def is_overdue(self):
-        """Checks if the book is overdue and not yet returned."""
+        """
+        Checks if the book is overdue and not yet returned.
+        Uses the 'overdue' annotation of Transaction.objects.with_overdue() when present.
+        """
+        if hasattr(self, 'overdue'):
+            return self.overdue
         return self.status == 'Borrowed' and timezone.now() > self.due_date
 
     class Meta:
         verbose_name = "Transaction"
         verbose_name_plural = "Transactions"
-        ordering = ['-borrow_date'] # Show most recent transactions first
\ No newline at end of file
+        ordering = ['-borrow_date'] # Show most recent transactions first
+        indexes = [
+            models.Index(fields=['borrow_date', 'id'], name='txn_borrow_date_id_idx'), # Keyset pagination
+            models.Index(fields=['student', '-borrow_date', '-id'], name='txn_student_borrow_idx'), # A student's loans, newest first (keyset order)
+            models.Index(fields=['status', 'due_date'], name='txn_status_due_idx'), # Overdue checks
+        ]
+        constraints = [
+            # At most one open loan per student and book; also the index behind
+            # the (student, book, status='Borrowed') lookup
+            models.UniqueConstraint(
+                fields=['student', 'book'],
+                condition=models.Q(status='Borrowed'),
+                name='txn_one_active_loan',
+            ),
+        ]
\ No newline at end of file
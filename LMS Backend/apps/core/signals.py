@@ -0,0 +1,45 @@
+"""
+Keeps issued JWTs honest: the roles and student profile they carry as claims
+(see token_service.claims_for) are revoked whenever the database changes them.
+Connected in CoreConfig.ready().
+
+Only model saves and deletes send these signals (QuerySet.delete() included);
+QuerySet.update() does not, so bulk updates of TOKEN_FIELDS must call
+token_service.revoke_tokens() themselves.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import Student
+
+# User fields whose change invalidates the user's tokens
+TOKEN_FIELDS = ('is_staff', 'is_superuser', 'is_active', 'password')
+
+def _revoke(user_id) -> None:
+    from apps.services import token_service
+    token_service.revoke_tokens(user_id)
+
+@receiver(pre_save, sender=User, dispatch_uid='core_user_token_fields')
+def remember_token_fields(sender, instance, update_fields=None, **kwargs):
+    """Reads the stored token fields of a user about to be updated (one query, skipped when none is saved)."""
+    instance._stored_token_fields = None
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(TOKEN_FIELDS):
+        return
+    instance._stored_token_fields = User.objects.filter(pk=instance.pk).values_list(*TOKEN_FIELDS).first()
+
+@receiver(post_save, sender=User, dispatch_uid='core_user_revoke_on_change')
+def revoke_on_user_change(sender, instance, created, **kwargs):
+    stored = getattr(instance, '_stored_token_fields', None)
+    if not created and stored is not None and stored != tuple(getattr(instance, name) for name in TOKEN_FIELDS):
+        _revoke(instance.pk)
+
+@receiver(post_delete, sender=User, dispatch_uid='core_user_revoke_on_delete')
+def revoke_on_user_delete(sender, instance, **kwargs):
+    _revoke(instance.pk)
+
+@receiver(post_delete, sender=Student, dispatch_uid='core_student_revoke_on_delete')
+def revoke_on_student_delete(sender, instance, **kwargs):
+    """Tokens name the student profile; a profile created later gets a new primary key."""
+    _revoke(instance.user_id)
@@ -1,3 +1,73 @@
+from datetime import timedelta
+from unittest import skipUnless
+from django.contrib.auth.models import User
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
+from django.utils import timezone
+from apps.core.models import Book, Hold, StockMovement, StockSnapshot, Student, Transaction
 
-# Create your tests here.
+
+@skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite')
+class TransactionQueryPlanTests(TestCase):
+    """
+    EXPLAIN QUERY PLAN regression tests for the hot Transaction queries: each one
+    must be answered from its index without sorting in a temporary B-tree.
+    """
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(f'USING INDEX {index_name}', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_open_loan_lookup(self):
+        # Duplicate-borrow checks in transaction_service
+        queryset = Transaction.objects.filter(student_id=1, book_id=1, status='Borrowed').order_by()
+        self.assertUsesIndex(queryset, 'txn_one_active_loan')
+
+    def test_student_history_in_keyset_order(self):
+        # TransactionViewSet.get_queryset() for students, paginated newest first
+        queryset = Transaction.objects.filter(student_id=1).order_by('-borrow_date', '-pk')
+        self.assertUsesIndex(queryset, 'txn_student_borrow_idx')
+
+    def test_overdue_loans(self):
+        # ?status=Borrowed&due_before=... and overdue checks
+        queryset = Transaction.objects.filter(status='Borrowed', due_date__lt=timezone.now()).order_by()
+        self.assertUsesIndex(queryset, 'txn_status_due_idx')
+
+    def test_recent_loans(self):
+        # ?borrowed_after=... on the staff list, paginated newest first
+        queryset = Transaction.objects.filter(borrow_date__gt=timezone.now()).order_by('-borrow_date', '-pk')
+        self.assertUsesIndex(queryset, 'txn_borrow_date_id_idx')
+
+    def test_head_of_hold_queue(self):
+        # hold_service.release_copies() when a copy comes back
+        queryset = Hold.objects.filter(book_id=1, status=Hold.WAITING).order_by('created_at', 'id')[:1]
+        self.assertUsesIndex(queryset, 'hold_queue_idx')
+
+    def test_expired_holds(self):
+        # hold_service.expire_holds()
+        queryset = Hold.objects.filter(status=Hold.READY, expires_at__lt=timezone.now()).order_by('expires_at', 'id')
+        self.assertUsesIndex(queryset, 'hold_ready_expiry_idx')
+
+    def test_stock_movements_since_snapshot(self):
+        # stock_service.stock_as_of(): latest snapshot, then the movements after it
+        self.assertUsesIndex(StockSnapshot.objects.filter(book_id=1).order_by('-movement_id', '-pk')[:1], 'stocksnap_book_mv_idx')
+        self.assertUsesIndex(StockMovement.objects.filter(book_id=1, pk__gt=100).order_by(), 'stockmv_book_id_idx')
+
+
+class TransactionConstraintTests(TestCase):
+    """
+    Tests for the one-open-loan-per-book constraint.
+    """
+    def test_one_open_loan_per_student_and_book(self):
+        student = Student.objects.create(user=User.objects.create_user(username='s1'), student_id='S-1')
+        book = Book.objects.create(title='Only once', isbn='9787000000000', stock=3)
+        due = timezone.now() + timedelta(days=14)
+        first = Transaction.objects.create(student=student, book=book, due_date=due)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Transaction.objects.create(student=student, book=book, due_date=due)
+
+        # Returned loans do not count
+        first.status = 'Returned'
+        first.save()
+        Transaction.objects.create(student=student, book=book, due_date=due)
+        self.assertEqual(Transaction.objects.filter(student=student, book=book).count(), 2)
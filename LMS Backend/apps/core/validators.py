@@ -0,0 +1,11 @@
+# Validation rules shared by the API serializers and the bulk import pipeline.
+
+ISBN_LENGTH = 13
+ISBN_ERROR_MESSAGE = "ISBN must be a 13-digit number."
+
+def is_valid_isbn(value) -> bool:
+    """
+    Basic validation for ISBN length (can be enhanced).
+    Note: Real ISBN validation is more complex (check digit)
+    """
+    return isinstance(value, str) and len(value) == ISBN_LENGTH and value.isdigit()
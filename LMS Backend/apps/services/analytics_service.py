@@ -0,0 +1,226 @@
+from datetime import date, datetime, time, timedelta
+from django.db import DatabaseError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from apps.core.models import (
+    ArchivedTransaction, Book, DailyBookCirculation, DailyCirculation, DailyDepartmentCirculation, RollupState, Student,
+    Transaction,
+)
+from apps.services.outbox_service import LOAN_BORROWED, LOAN_RETURNED
+from apps.services.outbox_sinks import Sink, SinkError
+from typing import Callable, Dict, List, Optional, Tuple
+
+# History rows read per database transaction by rebuild_rollups
+ANALYTICS_BATCH_SIZE = 1000
+
+# Default period of the analytics endpoints, and the longest one allowed
+DEFAULT_PERIOD_DAYS = 30
+MAX_PERIOD_DAYS = 366
+
+# Books listed by top_books unless a limit is given
+TOP_BOOKS_LIMIT = 10
+
+ROLLUP_STATE = 'circulation'
+COUNTERS = ('borrows', 'returns', 'late_returns')
+
+# (day, book_id, department) -> [borrows, returns, late_returns]
+Counts = Dict[Tuple[date, int, str], List[int]]
+
+def _moment(value) -> datetime:
+    """Outbox payloads carry datetimes as ISO 8601 strings."""
+    return parse_datetime(value) if isinstance(value, str) else value
+
+def _local_day(moment) -> date:
+    return timezone.localdate(_moment(moment))
+
+def _count(counts: Counts, key: Tuple[date, int, str], borrows: int = 0, returns: int = 0, late_returns: int = 0) -> None:
+    totals = counts.setdefault(key, [0, 0, 0])
+    totals[0] += borrows
+    totals[1] += returns
+    totals[2] += late_returns
+
+def _add(model, key_fields: Tuple[str, ...], counts: Dict[tuple, List[int]]) -> None:
+    """
+    Adds counts to the rollup rows of model (key tuple -> counters): the rows
+    are read with one query and written back with one INSERT ... ON CONFLICT
+    DO UPDATE. Call it inside a database transaction.
+    """
+    if not counts:
+        return
+    lookups = {f'{field}__in': {key[i] for key in counts} for i, field in enumerate(key_fields)}
+    rows = model.objects.select_for_update().filter(**lookups).values_list(*key_fields, *COUNTERS)
+    for row in rows:
+        key = tuple(row[:len(key_fields)])
+        if key in counts:
+            counts[key] = [current + added for current, added in zip(row[len(key_fields):], counts[key])]
+    model.objects.bulk_create(
+        [model(**dict(zip(key_fields, key)), **dict(zip(COUNTERS, totals))) for key, totals in counts.items()],
+        update_conflicts=True, unique_fields=[field.removesuffix('_id') for field in key_fields], update_fields=COUNTERS,
+    )
+
+def _apply(counts: Counts) -> None:
+    """Adds per (day, book, department) counts to the three rollup tables."""
+    per_book, per_department, per_day = {}, {}, {}
+    for (day, book_id, department), totals in counts.items():
+        for rollup, key in ((per_book, (day, book_id)), (per_department, (day, department)), (per_day, (day,))):
+            rollup[key] = [current + added for current, added in zip(rollup.get(key, (0, 0, 0)), totals)]
+    _add(DailyBookCirculation, ('day', 'book_id'), per_book)
+    _add(DailyDepartmentCirculation, ('day', 'department'), per_department)
+    _add(DailyCirculation, ('day',), per_day)
+
+def _state() -> RollupState:
+    state, _ = RollupState.objects.select_for_update().get_or_create(name=ROLLUP_STATE)
+    return state
+
+def _event_counts(events: List[dict], history_until: Optional[date]) -> Tuple[Counts, int]:
+    """Counts borrow and return events, looking up books and departments with one query each."""
+    book_ids = set(Book.objects.filter(pk__in={event['payload']['book_id'] for event in events}).values_list('pk', flat=True))
+    departments = dict(
+        Student.objects.filter(pk__in={event['payload']['student_id'] for event in events}).values_list('pk', 'department')
+    )
+    counts = {}
+    counted = 0
+    for event in events:
+        payload = event['payload']
+        if payload['book_id'] not in book_ids: # Deleted since; nothing to attribute the loan to
+            continue
+        returned = event['topic'] == LOAN_RETURNED
+        moment = _moment(payload['return_date'] if returned else payload['borrow_date'])
+        day = _local_day(moment)
+        if history_until and day < history_until:
+            continue
+        key = (day, payload['book_id'], departments.get(payload['student_id']) or '')
+        if returned:
+            _count(counts, key, returns=1, late_returns=int(moment > _moment(payload['due_date'])))
+        else:
+            _count(counts, key, borrows=1)
+        counted += 1
+    return counts, counted
+
+@transaction.atomic
+def apply_events(events: List[dict]) -> int:
+    """
+    Adds a batch of outbox messages ({'id', 'topic', 'payload', ...}, in ID
+    order) to the rollups in one database transaction: two lookups (books and
+    student departments) plus a read and an upsert per rollup table, however
+    big the batch. Events already applied (redeliveries) and events of days
+    rebuilt from history are skipped.
+
+    Returns:
+        int: Number of events counted.
+    """
+    if not events:
+        return 0
+    state = _state()
+    fresh = [
+        event for event in events
+        if event['id'] > state.last_event_id and event['topic'] in (LOAN_BORROWED, LOAN_RETURNED)
+    ]
+    counted = 0
+    if fresh:
+        counts, counted = _event_counts(fresh, state.history_until)
+        _apply(counts)
+
+    state.last_event_id = max(state.last_event_id, events[-1]['id'])
+    state.updated_at = timezone.now()
+    state.save(update_fields=['last_event_id', 'updated_at'])
+    return counted
+
+class RollupSink(Sink):
+    """
+    Outbox sink that maintains the circulation rollups (configure it in
+    settings.LMS_OUTBOX_SINKS). It keeps its own position in RollupState,
+    written in the same transaction as the counts, so at-least-once delivery
+    never counts a loan twice.
+    """
+    def send(self, events: List[dict]) -> None:
+        try:
+            apply_events(events)
+        except DatabaseError as e:
+            raise SinkError(f"Cannot update the rollups: {e}")
+
+
+def rebuild_rollups(
+    until: Optional[date] = None, batch_size: int = ANALYTICS_BATCH_SIZE, progress: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Recomputes the rollups of every day before until (today by default) from
+    the transaction history, hot and archived, reading batch_size rows per
+    database transaction in primary key order. Days from until on are left to
+    RollupSink, which from now on skips events of earlier days. Do not run it
+    together with `manage.py archive_transactions`: a loan moved to the archive
+    mid-rebuild would be counted twice.
+
+    Returns:
+        int: Number of history rows read.
+    """
+    until = until or timezone.localdate()
+    end = timezone.make_aware(datetime.combine(until, time.min))
+    with transaction.atomic():
+        state = _state()
+        state.history_until = until
+        state.updated_at = timezone.now()
+        state.save(update_fields=['history_until', 'updated_at'])
+        for model in (DailyBookCirculation, DailyDepartmentCirculation, DailyCirculation):
+            model.objects.filter(day__lt=until).delete()
+
+    read = 0
+    for model in (Transaction, ArchivedTransaction):
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    model.objects.filter(pk__gt=last_pk, borrow_date__lt=end).order_by('pk').values_list(
+                        'pk', 'book_id', 'student__department', 'borrow_date', 'due_date', 'return_date',
+                    )[:batch_size]
+                )
+                counts = {}
+                for _, book_id, department, borrow_date, due_date, return_date in rows:
+                    _count(counts, (_local_day(borrow_date), book_id, department or ''), borrows=1)
+                    if return_date is not None and return_date < end:
+                        key = (_local_day(return_date), book_id, department or '')
+                        _count(counts, key, returns=1, late_returns=int(return_date > due_date))
+                _apply(counts)
+            read += len(rows)
+            if progress and rows:
+                progress(read)
+            if len(rows) < batch_size:
+                break
+            last_pk = rows[-1][0]
+    return read
+
+def period(since: Optional[date] = None, until: Optional[date] = None) -> Tuple[date, date]:
+    """The (since, until) days of a report, both included; the last DEFAULT_PERIOD_DAYS by default."""
+    until = until or timezone.localdate()
+    since = since or until - timedelta(days=DEFAULT_PERIOD_DAYS - 1)
+    return since, until
+
+def daily_totals(since: date, until: date) -> List[dict]:
+    """Library-wide counts for every day of the period (zeros on quiet days)."""
+    rows = {
+        row['day']: row
+        for row in DailyCirculation.objects.filter(day__range=(since, until)).values('day', *COUNTERS)
+    }
+    return [
+        rows.get(since + timedelta(days=offset)) or {'day': since + timedelta(days=offset), **dict.fromkeys(COUNTERS, 0)}
+        for offset in range((until - since).days + 1)
+    ]
+
+def top_books(since: date, until: date, limit: int = TOP_BOOKS_LIMIT) -> List[dict]:
+    """The most borrowed books of the period, with their borrows, returns and late returns."""
+    return list(
+        DailyBookCirculation.objects.filter(day__range=(since, until))
+        .values('book_id', 'book__title')
+        .annotate(**{counter: Sum(counter) for counter in COUNTERS})
+        .order_by('-borrows', 'book_id')[:limit]
+    )
+
+def department_totals(since: date, until: date) -> List[dict]:
+    """Counts of the period per student department ('' for no department), busiest first."""
+    return list(
+        DailyDepartmentCirculation.objects.filter(day__range=(since, until))
+        .values('department')
+        .annotate(**{counter: Sum(counter) for counter in COUNTERS})
+        .order_by('-borrows', 'department')
+    )
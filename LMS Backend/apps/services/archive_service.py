@@ -0,0 +1,69 @@
+import re
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from apps.core.models import ArchivedTransaction, Transaction
+from typing import Callable, Optional
+
+# Returned transactions moved per database transaction
+ARCHIVE_BATCH_SIZE = 1000
+
+# Columns copied from Transaction to ArchivedTransaction (the ID is kept)
+ARCHIVED_FIELDS = ['id', 'book_id', 'student_id', 'borrow_date', 'due_date', 'return_date', 'status']
+
+AGE_UNITS = {'d': 'days', 'w': 'weeks', 'h': 'hours'}
+
+def parse_age(value: str) -> timedelta:
+    """
+    Parses an age such as '365d', '52w' or '12h' into a timedelta.
+    Raises ValueError for anything else.
+    """
+    match = re.fullmatch(r'\s*(\d+)\s*([dwh])\s*', value or '')
+    if not match:
+        raise ValueError(f"Invalid age '{value}'. Use a number followed by d, w or h (e.g. 365d).")
+    return timedelta(**{AGE_UNITS[match.group(2)]: int(match.group(1))})
+
+def archive_returned_transactions(
+    older_than: timedelta,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+) -> int:
+    """
+    Moves transactions returned more than `older_than` ago into the archive.
+
+    Each batch copies up to batch_size rows (keeping their IDs) and deletes them
+    from the hot table in one database transaction, so an interrupted run leaves
+    every row in exactly one of the two tables and simply resumes where it
+    stopped when run again. Open loans are never moved.
+
+    Args:
+        older_than (timedelta): Minimum time since the book was returned.
+        batch_size (int): Rows moved per database transaction.
+        max_batches (Optional[int]): Stop after this many batches (None: run to completion).
+        progress (Optional[Callable[[int], None]]): Called with the total moved after each batch.
+
+    Returns:
+        int: Number of transactions archived.
+    """
+    cutoff = timezone.now() - older_than
+    candidates = Transaction.objects.filter(status='Returned', return_date__lt=cutoff).order_by('pk')
+    moved = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            rows = list(candidates.values(*ARCHIVED_FIELDS)[:batch_size])
+            if not rows:
+                break
+            # ignore_conflicts keeps re-runs safe if a row was archived by hand
+            ArchivedTransaction.objects.bulk_create(
+                [ArchivedTransaction(**row) for row in rows], ignore_conflicts=True
+            )
+            Transaction.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        moved += len(rows)
+        batches += 1
+        if progress:
+            progress(moved)
+        if len(rows) < batch_size:
+            break
+    return moved
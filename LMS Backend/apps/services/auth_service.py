@@ -1,12 +1,15 @@
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.db import transaction, IntegrityError
 from apps.core.models import Student
 from rest_framework import serializers # For validation errors
 
-@transaction.atomic # Ensure User and Student are created together or not at all
 def register_user(validated_data):
     """
     Creates a new User and their associated Student profile.
+    The password is hashed before the database transaction starts, so the
+    slow hashing does not hold it open. For many students at once, use
+    student_import_service.import_students().
 
     Args:
         validated_data (dict): Data validated by UserRegistrationSerializer.
@@ -19,25 +22,26 @@ def register_user(validated_data):
         Exception: For other potential errors during creation.
     """
     student_profile_data = validated_data.pop('student_profile')
-    password = validated_data.pop('password') # Handled by create_user
+    password_hash = make_password(validated_data.pop('password'))
 
     try:
-        # Create the User instance (handles password hashing)
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data.get('email'), # Use .get() for optional fields
-            password=password,
-            first_name=validated_data.get('first_name', ''),
-            last_name=validated_data.get('last_name', '')
-        )
-
-        # Create the linked Student profile
-        Student.objects.create(
-            user=user,
-            student_id=student_profile_data['student_id'],
-            department=student_profile_data.get('department'),
-            enrollment_date=student_profile_data.get('enrollment_date')
-        )
+        with transaction.atomic(): # Ensure User and Student are created together or not at all
+            # Normalized the way create_user() does it
+            user = User.objects.create(
+                username=User.normalize_username(validated_data['username']),
+                email=User.objects.normalize_email(validated_data.get('email')), # Use .get() for optional fields
+                password=password_hash,
+                first_name=validated_data.get('first_name', ''),
+                last_name=validated_data.get('last_name', '')
+            )
+
+            # Create the linked Student profile
+            Student.objects.create(
+                user=user,
+                student_id=student_profile_data['student_id'],
+                department=student_profile_data.get('department'),
+                enrollment_date=student_profile_data.get('enrollment_date')
+            )
 
         return user
 
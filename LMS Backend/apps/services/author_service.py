@@ -1,11 +1,47 @@
+from django.db.models import Count, IntegerField, OuterRef, QuerySet, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
-from apps.core.models import Author
+from apps.core.models import Author, Book, Transaction
+from apps.services import cache_service
 from typing import List, Optional
 
 def list_authors() -> List[Author]:
     """Returns a list of all authors."""
     return Author.objects.all()
 
+def _per_author(queryset: QuerySet, author_lookup: str, aggregate) -> Coalesce:
+    """Correlated subquery computing one aggregate per author (0 when there are no rows)."""
+    rows = (
+        queryset.filter(**{author_lookup: OuterRef('pk')})
+        .order_by()
+        .values(author_lookup)
+        .annotate(total=aggregate)
+        .values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+def with_catalog_stats(queryset: QuerySet) -> QuerySet:
+    """
+    Annotates authors with book_count, total_stock and active_loans.
+
+    Each figure is a correlated subquery rather than a JOIN + GROUP BY, so counts
+    are not multiplied by joining books and transactions together and the author
+    rows themselves are still read in a single query.
+    """
+    return queryset.annotate(
+        book_count=_per_author(Book.objects.all(), 'author', Count('pk')),
+        total_stock=_per_author(Book.objects.all(), 'author', Sum('stock')),
+        active_loans=_per_author(Transaction.objects.filter(status='Borrowed'), 'book__author', Count('pk')),
+    )
+
+def list_author_books(author_id: int) -> QuerySet:
+    """
+    Returns the books of an author ordered by title.
+    Raises Http404 if the author does not exist.
+    """
+    author = get_author_by_id(author_id)
+    return Book.objects.filter(author=author).order_by('title')
+
 def get_author_by_id(author_id: int) -> Author:
     """
     Retrieves a single author by their ID.
@@ -32,6 +68,7 @@ def create_author(name: str, birth_date: Optional[str] = None, biography: Option
         birth_date=birth_date,
         biography=biography
     )
+    cache_service.bump_version(cache_service.AUTHOR_SCOPE)
     return author
 
 def update_author(author_id: int, name: str, birth_date: Optional[str] = None, biography: Optional[str] = None) -> Author:
@@ -52,6 +89,7 @@ def update_author(author_id: int, name: str, birth_date: Optional[str] = None, b
     author.birth_date = birth_date
     author.biography = biography
     author.save()
+    cache_service.bump_version(cache_service.AUTHOR_SCOPE) # Also invalidates books embedding this author
     return author
 
 def delete_author(author_id: int) -> None:
@@ -61,4 +99,6 @@ def delete_author(author_id: int) -> None:
     author = get_author_by_id(author_id)
     # Consider implications: What happens to books by this author?
     # Current Book model uses on_delete=models.SET_NULL for author FK.
-    author.delete()
\ No newline at end of file
+    author.delete()
+    # Books of a deleted author have their author set to NULL
+    cache_service.bump_version(cache_service.AUTHOR_SCOPE, cache_service.BOOK_SCOPE)
\ No newline at end of file
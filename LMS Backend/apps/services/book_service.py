@@ -1,6 +1,14 @@
+from django.db import transaction
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
-from apps.core.models import Book, Author
-from typing import List, Optional
+from django.utils import timezone
+from apps.core.models import Book, Author, StockMovement
+from apps.services import cache_service, hold_service, stock_service
+from typing import Iterable, List, Optional
+
+# Upper bound on ids + ISBNs per availability lookup (kept well below SQLite's
+# limit on bound parameters in one statement)
+MAX_AVAILABILITY_KEYS = 5000
 
 def list_books() -> List[Book]:
     """Returns a list of all books."""
@@ -15,9 +23,10 @@ def get_book_by_id(book_id: int) -> Book:
     # Use select_related to optimize fetching the related author
     return get_object_or_404(Book.objects.select_related('author'), pk=book_id)
 
+@transaction.atomic
 def create_book(title: str, isbn: str, stock: int, author_id: Optional[int] = None, published_date: Optional[str] = None) -> Book:
     """
-    Creates a new book.
+    Creates a new book. The initial stock is recorded as an acquisition in the stock ledger.
 
     Args:
         title (str): The title of the book.
@@ -45,12 +54,18 @@ def create_book(title: str, isbn: str, stock: int, author_id: Optional[int] = No
         author=author,
         stock=stock
     )
+    stock_service.record([StockMovement(book=book, kind=StockMovement.ACQUISITION, quantity=stock, note='New book')])
+    cache_service.bump_version(cache_service.BOOK_SCOPE)
     return book
 
+@transaction.atomic
 def update_book(book_id: int, title: str, isbn: str, stock: int, author_id: Optional[int] = None, published_date: Optional[str] = None) -> Book:
     """
     Updates an existing book.
-
+    A changed stock is recorded as a manual adjustment in the stock ledger; the
+    row is locked while it is read, so a concurrent borrow cannot slip in between.
+    Added copies go to waiting holds first, so the stored stock can end up lower
+    than requested.
     Args:
         book_id (int): The ID of the book to update.
         title (str): The updated title.
@@ -66,7 +81,7 @@ def update_book(book_id: int, title: str, isbn: str, stock: int, author_id: Opti
         Author.DoesNotExist: If the author_id is provided but invalid.
         IntegrityError: If the updated ISBN conflicts with another book.
     """
-    book = get_book_by_id(book_id) # Fetches the book
+    book = get_object_or_404(Book.objects.select_for_update().select_related('author'), pk=book_id) # Fetches the book
     author = None
     if author_id:
         author = get_object_or_404(Author, pk=author_id)
@@ -75,8 +90,16 @@ def update_book(book_id: int, title: str, isbn: str, stock: int, author_id: Opti
     book.isbn = isbn
     book.published_date = published_date
     book.author = author
-    book.stock = stock
-    book.save()
+    adjustment = StockMovement(book=book, kind=StockMovement.ADJUSTMENT, quantity=stock - book.stock, note='Book edited')
+    if adjustment.quantity > 0:
+        # Added copies serve waiting holds first; release_copies shelves the rest
+        book.save()
+        book.stock += adjustment.quantity - hold_service.release_copies([adjustment], timezone.now())
+    else:
+        stock_service.record([adjustment])
+        book.stock = stock
+        book.save()
+    cache_service.bump_version(cache_service.BOOK_SCOPE)
     return book
 
 def delete_book(book_id: int) -> None:
@@ -87,4 +110,35 @@ def delete_book(book_id: int) -> None:
     # Consider implications: What if the book is currently borrowed?
     # The Transaction model uses on_delete=models.PROTECT for the book FK,
     # so deleting a borrowed book will raise ProtectedError. This is intended.
-    book.delete()
\ No newline at end of file
+    book.delete()
+    cache_service.bump_version(cache_service.BOOK_SCOPE)
+
+def get_availability(book_ids: Iterable[int] = (), isbns: Iterable[str] = ()) -> dict:
+    """
+    Looks up the stock of many books at once, by ID and/or ISBN.
+
+    Runs a single SELECT ... WHERE id IN (...) OR isbn IN (...) with values_list(),
+    so no model instances or authors are loaded.
+
+    Returns:
+        dict: 'results' ({id, isbn, stock} per matched book, by ID), plus the
+        requested 'unknown_ids' and 'unknown_isbns' that matched no book.
+    """
+    book_ids = list(dict.fromkeys(book_ids))
+    isbns = list(dict.fromkeys(isbns))
+    if not book_ids and not isbns:
+        return {'results': [], 'unknown_ids': [], 'unknown_isbns': []}
+
+    rows = (
+        Book.objects.filter(Q(pk__in=book_ids) | Q(isbn__in=isbns))
+        .order_by('pk')
+        .values_list('id', 'isbn', 'stock')
+    )
+    results = [{'id': pk, 'isbn': isbn, 'stock': stock} for pk, isbn, stock in rows]
+    found_ids = {row['id'] for row in results}
+    found_isbns = {row['isbn'] for row in results}
+    return {
+        'results': results,
+        'unknown_ids': [pk for pk in book_ids if pk not in found_ids],
+        'unknown_isbns': [isbn for isbn in isbns if isbn not in found_isbns],
+    }
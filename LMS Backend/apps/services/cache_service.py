@@ -0,0 +1,101 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from typing import Dict
+
+# Version scopes. Every write that changes how a book or author is represented
+# bumps its scope, which makes all cached responses built from it unreachable.
+BOOK_SCOPE = 'book'
+AUTHOR_SCOPE = 'author'
+
+KEY_PREFIX = 'lms'
+STATS_KEYS = {'hits': f'{KEY_PREFIX}:stats:hits', 'misses': f'{KEY_PREFIX}:stats:misses'}
+
+def _cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+def is_enabled() -> bool:
+    return getattr(settings, 'RESPONSE_CACHE_ENABLED', True)
+
+def _version_key(scope: str) -> str:
+    return f'{KEY_PREFIX}:version:{scope}'
+
+def _initial_version() -> int:
+    # Counters start from the clock, so a counter lost with a cache flush or
+    # eviction never comes back with a value that was already handed out.
+    return int(time.time() * 1000)
+
+def get_versions(*scopes: str) -> Dict[str, int]:
+    """
+    Returns the current version of each scope (one cache round trip when warm).
+    """
+    cache = _cache()
+    keys = {_version_key(scope): scope for scope in scopes}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, scope in keys.items():
+        if key not in found:
+            cache.add(key, _initial_version(), timeout=None)
+            found[key] = cache.get(key)
+        versions[scope] = found[key]
+    return versions
+
+def bump_version(*scopes: str) -> None:
+    """
+    Invalidates every cached response depending on the given scopes.
+    Inside a transaction the bump happens on commit, so a response rebuilt
+    before the commit can never be stored under the new version.
+    """
+    def bump():
+        cache = _cache()
+        for scope in scopes:
+            key = _version_key(scope)
+            try:
+                cache.incr(key)
+            except ValueError: # Missing or evicted counter
+                cache.set(key, _initial_version(), timeout=None)
+    transaction.on_commit(bump)
+
+def response_key(namespace: str, versions: Dict[str, int], url: str) -> str:
+    """Builds the cache key of a response from its URL (with query string) and scope versions."""
+    version_part = ','.join(f'{scope}={versions[scope]}' for scope in sorted(versions))
+    digest = hashlib.sha1(f'{version_part}|{url}'.encode('utf-8')).hexdigest()
+    return f'{KEY_PREFIX}:response:{namespace}:{digest}'
+
+def get_response(key: str):
+    """Returns cached response data, or None, and records a hit or a miss."""
+    cache = _cache()
+    data = cache.get(key)
+    _count('hits' if data is not None else 'misses')
+    return data
+
+def set_response(key: str, data) -> None:
+    _cache().set(key, data, timeout=getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+
+def _count(name: str) -> None:
+    cache = _cache()
+    key = STATS_KEYS[name]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+def get_stats() -> dict:
+    """Returns hit/miss counters and the current scope versions."""
+    values = _cache().get_many(list(STATS_KEYS.values()))
+    hits = values.get(STATS_KEYS['hits'], 0)
+    misses = values.get(STATS_KEYS['misses'], 0)
+    lookups = hits + misses
+    return {
+        'enabled': is_enabled(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 4) if lookups else None,
+        'versions': get_versions(BOOK_SCOPE, AUTHOR_SCOPE),
+    }
+
+def reset_stats() -> None:
+    _cache().delete_many(list(STATS_KEYS.values()))
@@ -0,0 +1,250 @@
+import csv
+import io
+import json
+from datetime import date
+from django.db import transaction, DatabaseError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from apps.core.models import Author, Book, StockMovement
+from apps.core.validators import is_valid_isbn, ISBN_ERROR_MESSAGE
+from apps.services import cache_service, hold_service, stock_service
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Rows written per bulk INSERT ... ON CONFLICT (each batch is its own DB transaction)
+IMPORT_BATCH_SIZE = 2000
+# Only the first errors are kept in the report; 'failed' still counts every bad row
+MAX_REPORTED_ERRORS = 1000
+
+SUPPORTED_FORMATS = ('csv', 'jsonl')
+
+# Record yielded by iter_records() in place of the rest of a file that is not UTF-8
+UNDECODABLE = object()
+UNDECODABLE_MESSAGE = 'The file is not valid UTF-8 from this line on; the rest of it was not imported.'
+
+TITLE_MAX_LENGTH = Book._meta.get_field('title').max_length
+AUTHOR_NAME_MAX_LENGTH = Author._meta.get_field('name').max_length
+
+def detect_format(filename: str) -> Optional[str]:
+    """Guesses the import format from a file name."""
+    lowered = (filename or '').lower()
+    if lowered.endswith('.csv'):
+        return 'csv'
+    if lowered.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return None
+
+def _text_stream(stream):
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+def iter_records(stream, file_format: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Lazily parses a CSV (with header row) or JSONL stream.
+    Yields (line number, record) pairs; undecodable JSON lines yield a None record.
+    Text that is not UTF-8 ends the stream with an UNDECODABLE record (its line
+    is the first one not read, as the text is decoded a chunk at a time).
+    """
+    text = _text_stream(stream)
+    line_number = 0
+    try:
+        if file_format == 'csv':
+            reader = csv.DictReader(text)
+            for record in reader:
+                line_number = reader.line_num
+                yield line_number, record
+        elif file_format == 'jsonl':
+            for line_number, line in enumerate(text, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError:
+                    yield line_number, None
+        else:
+            raise ValueError(f"Unsupported import format '{file_format}'.")
+    except UnicodeDecodeError:
+        yield line_number + 1, UNDECODABLE
+
+def clean_record(record: Any) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    Validates one input record with the same rules as BookSerializer.
+
+    Returns:
+        Tuple[Optional[dict], Optional[dict]]: (cleaned values, None) for a valid record,
+        or (None, field errors) for an invalid one.
+    """
+    if record is UNDECODABLE:
+        return None, {'non_field_errors': [UNDECODABLE_MESSAGE]}
+    if not isinstance(record, dict):
+        return None, {'non_field_errors': ['Expected an object with book fields.']}
+
+    errors = {}
+    title = str(record.get('title') or '').strip()
+    if not title:
+        errors['title'] = ['This field is required.']
+    elif len(title) > TITLE_MAX_LENGTH:
+        errors['title'] = [f'Ensure this field has no more than {TITLE_MAX_LENGTH} characters.']
+
+    isbn = str(record.get('isbn') or '').strip()
+    if not is_valid_isbn(isbn):
+        errors['isbn'] = [ISBN_ERROR_MESSAGE]
+
+    stock = record.get('stock')
+    if stock in (None, ''):
+        stock = 0
+    else:
+        try:
+            if isinstance(stock, bool):
+                raise ValueError
+            stock = int(stock)
+        except (TypeError, ValueError):
+            errors['stock'] = ['A valid integer is required.']
+        else:
+            if stock < 0:
+                errors['stock'] = ['Stock cannot be negative.']
+
+    published_date = record.get('published_date') or None
+    if published_date is not None and not isinstance(published_date, date):
+        try:
+            published_date = parse_date(str(published_date).strip())
+        except ValueError:
+            published_date = None
+        if published_date is None:
+            errors['published_date'] = ['Date has wrong format. Use YYYY-MM-DD.']
+
+    author_name = str(record.get('author') or record.get('author_name') or '').strip() or None
+    if author_name and len(author_name) > AUTHOR_NAME_MAX_LENGTH:
+        errors['author'] = [f'Ensure this field has no more than {AUTHOR_NAME_MAX_LENGTH} characters.']
+
+    if errors:
+        return None, errors
+    return {
+        'title': title,
+        'isbn': isbn,
+        'stock': stock,
+        'published_date': published_date,
+        'author': author_name,
+    }, None
+
+def import_catalog(stream, file_format: str, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """
+    Streams books from a CSV or JSONL file into the catalog.
+
+    Rows are validated one at a time and written in batches with a single
+    INSERT ... ON CONFLICT (isbn) DO UPDATE per batch, so an existing ISBN is
+    updated in place. Authors are matched by name through an in-memory map
+    (one entry per distinct author) and missing ones are bulk created.
+    Memory use is bounded by the batch size and the number of distinct authors.
+
+    Args:
+        stream: Binary or text file-like object.
+        file_format (str): 'csv' or 'jsonl'.
+        batch_size (int): Number of books written per database transaction.
+
+    Returns:
+        dict: Report with row counts and per-row errors (line number, ISBN, field errors).
+    """
+    report = {
+        'rows': 0,
+        'created': 0,
+        'updated': 0,
+        'failed': 0,
+        'authors_created': 0,
+        'errors': [],
+    }
+    author_ids: Dict[str, int] = {}
+    batch: Dict[str, Tuple[int, dict]] = {}
+
+    for line_number, record in iter_records(stream, file_format):
+        report['rows'] += 1
+        cleaned, errors = clean_record(record)
+        if errors:
+            isbn = record.get('isbn') if isinstance(record, dict) else None
+            _add_error(report, line_number, isbn, errors)
+            continue
+        if cleaned['isbn'] in batch:
+            # The same ISBN twice in one batch would make the upsert touch a row twice;
+            # flush first so the later row wins, as it would with single requests.
+            _write_batch(batch, author_ids, report)
+        batch[cleaned['isbn']] = (line_number, cleaned)
+        if len(batch) >= batch_size:
+            _write_batch(batch, author_ids, report)
+
+    if batch:
+        _write_batch(batch, author_ids, report)
+    return report
+
+def _add_error(report: dict, line_number: int, isbn: Optional[str], errors: dict) -> None:
+    report['failed'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({'line': line_number, 'isbn': isbn, 'errors': errors})
+
+def _write_batch(batch: Dict[str, Tuple[int, dict]], author_ids: Dict[str, int], report: dict) -> None:
+    rows = list(batch.values())
+    batch.clear()
+    created_authors: List[str] = []
+    try:
+        with transaction.atomic():
+            _resolve_authors({row['author'] for _, row in rows if row['author']}, author_ids, created_authors)
+            isbns = [row['isbn'] for _, row in rows]
+            # Locked until the batch commits, so no borrow or adjustment changes the stock
+            # between this read and the upsert (and the ADJUSTMENT movements below)
+            existing = dict(
+                Book.objects.select_for_update().filter(isbn__in=isbns).order_by('pk').values_list('isbn', 'stock')
+            )
+            # Copies added to existing books go to their waiting holds first (release_copies
+            # below), so their stock is written unchanged here
+            books = Book.objects.bulk_create(
+                [
+                    Book(
+                        title=row['title'],
+                        isbn=row['isbn'],
+                        published_date=row['published_date'],
+                        author_id=author_ids.get(row['author']) if row['author'] else None,
+                        stock=min(row['stock'], existing[row['isbn']]) if row['isbn'] in existing else row['stock'],
+                    )
+                    for _, row in rows
+                ],
+                update_conflicts=True,
+                unique_fields=['isbn'],
+                update_fields=['title', 'published_date', 'author', 'stock', 'updated_at'],
+            )
+            # New books are acquisitions; changed stock of existing ones is an adjustment
+            movements, added = [], []
+            for book, (_, row) in zip(books, rows):
+                if book.isbn not in existing:
+                    movements.append(StockMovement(book_id=book.pk, kind=StockMovement.ACQUISITION, quantity=book.stock, note='Catalog import'))
+                    continue
+                adjustment = StockMovement(
+                    book_id=book.pk, kind=StockMovement.ADJUSTMENT, quantity=row['stock'] - existing[book.isbn], note='Catalog import',
+                )
+                (added if adjustment.quantity > 0 else movements).append(adjustment)
+            stock_service.record(movements)
+            hold_service.release_copies(added, timezone.now())
+            cache_service.bump_version(cache_service.BOOK_SCOPE, cache_service.AUTHOR_SCOPE)
+    except DatabaseError as e:
+        # The batch was rolled back, including any authors created for it.
+        for name in created_authors:
+            author_ids.pop(name, None)
+        for line_number, row in rows:
+            _add_error(report, line_number, row['isbn'], {'non_field_errors': [f'Database error: {e}']})
+        return
+
+    report['created'] += len(rows) - len(existing)
+    report['updated'] += len(existing)
+    report['authors_created'] += len(created_authors)
+
+def _resolve_authors(names: set, author_ids: Dict[str, int], created: List[str]) -> None:
+    """Fills author_ids for the given names, creating missing authors in bulk."""
+    missing = [name for name in names if name not in author_ids]
+    if not missing:
+        return
+    # Author names are not unique; reuse the oldest author with a matching name.
+    for name, pk in Author.objects.filter(name__in=missing).order_by('-pk').values_list('name', 'pk'):
+        author_ids[name] = pk
+    new_authors = [Author(name=name) for name in missing if name not in author_ids]
+    for author in Author.objects.bulk_create(new_authors):
+        author_ids[author.name] = author.pk
+        created.append(author.name)
@@ -0,0 +1,121 @@
+import csv
+import json
+from datetime import date
+from django.db.models import Value
+from apps.core.models import ArchivedTransaction, Book, Transaction
+from typing import Iterable, Iterator, List, Tuple
+
+# Rows fetched per database round trip by QuerySet.iterator()
+EXPORT_CHUNK_SIZE = 2000
+# Rows joined into one chunk of the response body
+EXPORT_BUFFER_ROWS = 500
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+# (column name, ORM lookup) pairs; rows are read with values_list() so no
+# model instances or serializers are involved.
+BOOK_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('title', 'title'),
+    ('isbn', 'isbn'),
+    ('published_date', 'published_date'),
+    ('stock', 'stock'),
+    ('author_id', 'author_id'),
+    ('author_name', 'author__name'),
+]
+
+TRANSACTION_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('status', 'status'),
+    ('borrow_date', 'borrow_date'),
+    ('due_date', 'due_date'),
+    ('return_date', 'return_date'),
+    ('book_id', 'book_id'),
+    ('book_title', 'book__title'),
+    ('book_isbn', 'book__isbn'),
+    ('student_pk', 'student_id'),
+    ('student_id', 'student__student_id'),
+    ('username', 'student__user__username'),
+    ('archived', 'archived'),
+]
+
+# Dataset -> (sources, columns). A source is a model plus the constant columns it
+# adds; several sources are read as one UNION ALL (archived rows keep their IDs).
+EXPORT_DATASETS = {
+    'books': ([(Book, {})], BOOK_EXPORT_COLUMNS),
+    'transactions': (
+        [(Transaction, {'archived': Value(False)}), (ArchivedTransaction, {'archived': Value(True)})],
+        TRANSACTION_EXPORT_COLUMNS,
+    ),
+}
+
+def iter_rows(dataset: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> Tuple[List[str], Iterator[tuple]]:
+    """
+    Returns the header and a lazy row iterator for an export dataset.
+    Rows are streamed from the database in primary key order, chunk_size at a
+    time; the transactions dataset includes archived transactions.
+    """
+    sources, columns = EXPORT_DATASETS[dataset]
+    header = [name for name, _ in columns]
+    querysets = [
+        model.objects.annotate(**constants).order_by().values_list(*[lookup for _, lookup in columns])
+        for model, constants in sources
+    ]
+    queryset = querysets[0].union(*querysets[1:], all=True) if len(querysets) > 1 else querysets[0]
+    return header, queryset.order_by('id').iterator(chunk_size=chunk_size)
+
+def stream_export(dataset: str, file_format: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Yields the export as text chunks, suitable for StreamingHttpResponse or a file.
+
+    Args:
+        dataset (str): 'books' or 'transactions'.
+        file_format (str): 'csv' or 'ndjson'.
+        chunk_size (int): Rows fetched per database round trip.
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"Unknown export dataset '{dataset}'.")
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{file_format}'.")
+
+    header, rows = iter_rows(dataset, chunk_size)
+    if file_format == 'csv':
+        lines = _csv_lines(header, rows)
+    else:
+        lines = _ndjson_lines(header, rows)
+    return _buffered(lines)
+
+class _Echo:
+    """File-like object whose write() returns the value, so csv.writer produces strings."""
+    def write(self, value):
+        return value
+
+def _csv_lines(header: List[str], rows: Iterable[tuple]) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(['' if value is None else _plain(value) for value in row])
+
+def _ndjson_lines(header: List[str], rows: Iterable[tuple]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(dict(zip(header, (_plain(value) for value in row))), separators=(',', ':')) + '\n'
+
+def _plain(value):
+    if isinstance(value, date): # Also covers datetime
+        return value.isoformat()
+    return value
+
+def _buffered(lines: Iterable[str]) -> Iterator[str]:
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= EXPORT_BUFFER_ROWS:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
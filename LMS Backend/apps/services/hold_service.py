@@ -0,0 +1,220 @@
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import F, QuerySet
+from django.utils import timezone
+from datetime import timedelta
+from apps.core.models import Book, Hold, StockMovement, Transaction
+from apps.services import cache_service, stock_service
+from rest_framework.exceptions import ValidationError
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Sequence
+
+DEFAULT_HOLD_PICKUP_DAYS = 3
+
+# Expired holds released per database transaction by expire_holds
+HOLD_EXPIRY_BATCH_SIZE = 500
+
+def pickup_period() -> timedelta:
+    """How long a copy set aside for a hold waits to be borrowed (settings.LMS_HOLD_PICKUP_DAYS)."""
+    return timedelta(days=getattr(settings, 'LMS_HOLD_PICKUP_DAYS', DEFAULT_HOLD_PICKUP_DAYS))
+
+def list_holds(student_id: Optional[int] = None) -> QuerySet:
+    """Holds with their queue position, newest first; all holds when student_id is None."""
+    queryset = Hold.objects.with_position()
+    if student_id is not None:
+        queryset = queryset.filter(student_id=student_id)
+    return queryset.order_by('-created_at', '-pk')
+
+@transaction.atomic
+def place_hold(student_id: int, book_id: int) -> Hold:
+    """
+    Puts a student at the end of the queue for a book that is out of stock.
+
+    Args:
+        student_id (int): The primary key of the student's profile.
+        book_id (int): The ID of the book.
+
+    Returns:
+        Hold: The new hold, annotated with its queue position.
+
+    Raises:
+        Book.DoesNotExist: If the book_id is invalid.
+        ValidationError: If the book is available, already borrowed by the student or already on hold.
+    """
+    title, stock = Book.objects.values_list('title', 'stock').get(pk=book_id)
+    if stock > 0:
+        raise ValidationError(f"'{title}' is available; borrow it instead of placing a hold.")
+    if Transaction.objects.filter(student_id=student_id, book_id=book_id, status='Borrowed').exists():
+        raise ValidationError(f"You have already borrowed '{title}'.")
+    try:
+        with transaction.atomic():
+            hold = Hold.objects.create(student_id=student_id, book_id=book_id)
+    except IntegrityError: # hold_one_open_per_book
+        raise ValidationError(f"You already have a hold on '{title}'.")
+    return Hold.objects.with_position().get(pk=hold.pk)
+
+@transaction.atomic
+def cancel_hold(student_id: int, hold_id: int) -> Hold:
+    """
+    Cancels an open hold. If a copy was already set aside for it, the copy goes
+    to the next hold in the queue (or back on the shelf).
+
+    Raises:
+        Hold.DoesNotExist: If the hold_id is invalid.
+        ValidationError: If the hold doesn't belong to the student or is no longer open.
+    """
+    hold = Hold.objects.get(pk=hold_id)
+    if hold.student_id != student_id:
+        raise ValidationError("This hold does not belong to you.")
+
+    now = timezone.now()
+    # The status is re-checked by each conditional UPDATE: a waiting hold may
+    # have been handed a copy since it was read.
+    statuses = sorted(Hold.OPEN_STATUSES, key=lambda status: status != hold.status)
+    for status in statuses:
+        if Hold.objects.filter(pk=hold_id, status=status).update(status=Hold.CANCELLED, closed_at=now):
+            break
+    else:
+        raise ValidationError("This hold is no longer open.")
+    if status == Hold.READY:
+        release_copies([_released(hold.pk, hold.book_id, now)], now)
+    hold.status = Hold.CANCELLED
+    hold.closed_at = now
+    return hold
+
+def _released(hold_id: int, book_id: int, now) -> StockMovement:
+    return StockMovement(book_id=book_id, kind=StockMovement.HOLD_RELEASE, quantity=1, note=f'Hold {hold_id}', created_at=now)
+
+def release_copies(movements: List[StockMovement], now) -> int:
+    """
+    Puts copies back into circulation: each copy goes to the oldest waiting hold
+    of its book, and only copies nobody is waiting for go back in stock.
+
+    `movements` are the ledger entries of the copies coming in (returns, hold
+    releases, acquisitions and other stock increases). They are written
+    together with a 'hold' entry per book for the copies set aside, in one INSERT.
+
+    One query finds which books have a queue (hold_queue_idx); books without one
+    are restocked with one UPDATE per distinct copy count, as before holds
+    existed. Each queued book costs one more UPDATE that takes the head of its
+    queue through the same index. Must run inside the caller's transaction.
+
+    Returns:
+        int: Number of copies set aside for holds.
+    """
+    if not movements:
+        return 0
+    copies_per_book = Counter()
+    for movement in movements:
+        copies_per_book[movement.book_id] += movement.quantity
+    movements = list(movements)
+    queued = set(
+        Hold.objects.filter(book_id__in=list(copies_per_book), status=Hold.WAITING)
+        .order_by().values_list('book_id', flat=True).distinct()
+    )
+    to_shelf = dict(copies_per_book)
+    allocated = 0
+    expires_at = now + pickup_period()
+    for book_id in queued:
+        head = (
+            Hold.objects.filter(book_id=book_id, status=Hold.WAITING)
+            .order_by('created_at', 'id').values('pk')[:copies_per_book[book_id]]
+        )
+        ready = Hold.objects.filter(pk__in=head, status=Hold.WAITING).update(
+            status=Hold.READY, ready_at=now, expires_at=expires_at,
+        )
+        to_shelf[book_id] -= ready
+        allocated += ready
+        if ready:
+            movements.append(StockMovement(book_id=book_id, kind=StockMovement.HOLD, quantity=-ready, created_at=now))
+
+    books_by_count = defaultdict(list)
+    for book_id, count in to_shelf.items():
+        if count:
+            books_by_count[count].append(book_id)
+    for count, book_ids in books_by_count.items():
+        Book.objects.filter(pk__in=book_ids).update(stock=F('stock') + count, updated_at=now)
+    if books_by_count:
+        cache_service.bump_version(cache_service.BOOK_SCOPE) # Stock is part of the book representation
+    stock_service.record(movements)
+    return allocated
+
+class _Missed(Exception):
+    """Undoes a grouped conditional UPDATE that matched fewer rows than expected."""
+
+def claim_ready_holds(student_id: int, book_ids: Sequence[int], now) -> set:
+    """
+    Marks the student's ready holds on book_ids as fulfilled (the copies set
+    aside for them are being borrowed) and returns the book IDs claimed.
+    """
+    book_ids = list(book_ids)
+    if not book_ids:
+        return set()
+    ready = Hold.objects.filter(student_id=student_id, status=Hold.READY)
+    if len(book_ids) == 1: # One UPDATE, no savepoint (the common case of a single borrow)
+        return set(book_ids) if ready.filter(book_id=book_ids[0]).update(status=Hold.FULFILLED, closed_at=now) else set()
+    try:
+        with transaction.atomic():
+            claimed = ready.filter(book_id__in=book_ids).update(status=Hold.FULFILLED, closed_at=now)
+            if claimed != len(book_ids):
+                raise _Missed
+        return set(book_ids)
+    except _Missed:
+        return {
+            book_id for book_id in book_ids
+            if ready.filter(book_id=book_id).update(status=Hold.FULFILLED, closed_at=now)
+        }
+
+def ready_hold_books(student_id: int, book_ids: Sequence[int]) -> set:
+    """IDs of the given books for which a copy is set aside for the student."""
+    return set(
+        Hold.objects.filter(student_id=student_id, book_id__in=list(book_ids), status=Hold.READY)
+        .values_list('book_id', flat=True)
+    )
+
+def expire_holds(
+    batch_size: int = HOLD_EXPIRY_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+    progress: Optional[Callable[[int], None]] = None,
+    now=None,
+) -> int:
+    """
+    Expires ready holds whose pick-up deadline has passed and releases their
+    copies (to the next hold in the queue, or back on the shelf).
+
+    Each batch is one database transaction, read through hold_ready_expiry_idx,
+    so an interrupted run can simply be started again. Holds handed a copy
+    during the run get a fresh deadline and are not expired by it.
+
+    Returns:
+        int: Number of holds expired.
+    """
+    now = now or timezone.now()
+    candidates = Hold.objects.filter(status=Hold.READY, expires_at__lt=now).order_by('expires_at', 'id')
+    expired_total = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            rows = list(candidates.values_list('pk', 'book_id')[:batch_size])
+            if not rows:
+                break
+            expired = set(_expire(dict(rows), now))
+            release_copies([_released(pk, book_id, now) for pk, book_id in rows if pk in expired], now)
+        expired_total += len(expired)
+        batches += 1
+        if progress:
+            progress(expired_total)
+        if len(rows) < batch_size:
+            break
+    return expired_total
+
+def _expire(books_by_hold: Dict[int, int], now) -> List[int]:
+    """Expires the given ready holds; holds claimed or cancelled meanwhile are skipped."""
+    ready = Hold.objects.filter(status=Hold.READY)
+    try:
+        with transaction.atomic():
+            if ready.filter(pk__in=list(books_by_hold)).update(status=Hold.EXPIRED, closed_at=now) != len(books_by_hold):
+                raise _Missed
+        return list(books_by_hold)
+    except _Missed:
+        return [pk for pk in books_by_hold if ready.filter(pk=pk).update(status=Hold.EXPIRED, closed_at=now)]
@@ -0,0 +1,116 @@
+import hashlib
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+from apps.core.models import IdempotencyRecord
+from typing import Callable, Optional, Tuple
+
+DEFAULT_IDEMPOTENCY_TTL_HOURS = 24
+
+# A claim still unanswered after this long belongs to a request that died; it may be taken over
+IDEMPOTENCY_LOCK_SECONDS = 60
+
+# Expired records deleted per database transaction by purge_expired
+IDEMPOTENCY_PURGE_BATCH_SIZE = 1000
+
+# Key salt of request fingerprints (an HMAC with SECRET_KEY)
+FINGERPRINT_SALT = 'apps.services.idempotency_service.request_fingerprint'
+
+MAX_KEY_LENGTH = IdempotencyRecord._meta.get_field('key').max_length
+
+# Outcomes of claim()
+CLAIMED = 'claimed'
+REPLAY = 'replay'
+IN_PROGRESS = 'in_progress'
+MISMATCH = 'mismatch'
+
+def ttl() -> timedelta:
+    """How long a stored response is replayed (settings.LMS_IDEMPOTENCY_TTL_HOURS)."""
+    return timedelta(hours=getattr(settings, 'LMS_IDEMPOTENCY_TTL_HOURS', DEFAULT_IDEMPOTENCY_TTL_HOURS))
+
+def request_fingerprint(method: str, path: str, data) -> str:
+    """
+    HMAC-SHA256 (keyed with SECRET_KEY) of the method, path and (canonical JSON)
+    body of a request. Bodies can hold passwords (registration), so a plain hash
+    stored for a day could be brute-forced offline.
+    """
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return salted_hmac(FINGERPRINT_SALT, f'{method} {path}\n{body}', algorithm='sha256').hexdigest()
+
+def client_scope(ident: str) -> str:
+    """Scope of an anonymous client's keys, from its address (hashed to fit the scope column)."""
+    return 'client:' + hashlib.sha256(ident.encode('utf-8')).hexdigest()[:32]
+
+def claim(scope: str, key: str, fingerprint: str) -> Tuple[str, Optional[IdempotencyRecord]]:
+    """
+    Looks up a key and, if it is new, claims it for the current request.
+
+    One indexed read on (scope, key) answers a retry; a new key costs one more
+    INSERT, which the unique constraint turns into a lock against a concurrent
+    request with the same key.
+
+    Returns:
+        (outcome, record): CLAIMED (run the request, then call complete() or
+        abandon()), REPLAY (record holds the stored response), IN_PROGRESS (the
+        first request has not finished) or MISMATCH (the key was used for a
+        different request).
+    """
+    now = timezone.now()
+    record = IdempotencyRecord.objects.filter(scope=scope, key=key).first()
+    if record is not None:
+        stale = record.status_code is None and record.created_at < now - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+        if record.expires_at > now and not stale:
+            if record.request_hash != fingerprint:
+                return MISMATCH, record
+            if record.status_code is None:
+                return IN_PROGRESS, record
+            return REPLAY, record
+        # Expired, or left behind by a request that died: start over
+        IdempotencyRecord.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+
+    try:
+        with transaction.atomic():
+            record = IdempotencyRecord.objects.create(
+                scope=scope, key=key, request_hash=fingerprint, created_at=now, expires_at=now + ttl(),
+            )
+    except IntegrityError: # A concurrent request claimed the key first
+        record = IdempotencyRecord.objects.filter(scope=scope, key=key).first()
+        if record is not None and record.request_hash != fingerprint:
+            return MISMATCH, record
+        return IN_PROGRESS, record
+    return CLAIMED, record
+
+def complete(record: IdempotencyRecord, status_code: int, body) -> None:
+    """Stores the response of a claimed request for replay."""
+    IdempotencyRecord.objects.filter(pk=record.pk).update(status_code=status_code, response_body=body)
+
+def abandon(record: IdempotencyRecord) -> None:
+    """Releases a claim whose request failed unexpectedly, so a retry runs it again."""
+    IdempotencyRecord.objects.filter(pk=record.pk, status_code__isnull=True).delete()
+
+def purge_expired(
+    batch_size: int = IDEMPOTENCY_PURGE_BATCH_SIZE, progress: Optional[Callable[[int], None]] = None
+) -> int:
+    """
+    Deletes expired records in batches of batch_size (one short transaction
+    each, read through idem_expires_idx). Returns the number deleted.
+    """
+    now = timezone.now()
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            pks = list(
+                IdempotencyRecord.objects.filter(expires_at__lte=now)
+                .order_by('expires_at', 'id').values_list('pk', flat=True)[:batch_size]
+            )
+            if pks:
+                IdempotencyRecord.objects.filter(pk__in=pks).delete()
+        deleted += len(pks)
+        if progress and pks:
+            progress(deleted)
+        if len(pks) < batch_size:
+            return deleted
@@ -0,0 +1,215 @@
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from apps.core.models import OutboxCursor, OutboxEvent
+from apps.services.outbox_sinks import Sink, SinkError
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Circulation event topics
+LOAN_BORROWED = 'loan.borrowed'
+LOAN_RETURNED = 'loan.returned'
+
+# Events handed to a sink per send()
+OUTBOX_BATCH_SIZE = 100
+
+# Deliveries of one batch attempted in a row before the sink is backed off
+OUTBOX_RETRIES = 3
+# Backoff: RETRY_DELAY * 2**n seconds, capped at MAX_BACKOFF
+OUTBOX_RETRY_DELAY = 0.5
+OUTBOX_MAX_BACKOFF = 300
+
+# A dispatcher's claim on a sink lapses after this long without renewal
+OUTBOX_LEASE_SECONDS = 60
+
+def record(topic: str, payloads: Iterable[dict]) -> None:
+    """
+    Writes one outbox event per payload with a single INSERT. Call it inside
+    the database transaction of the change, so events exist if and only if
+    the change was committed.
+    """
+    now = timezone.now()
+    OutboxEvent.objects.bulk_create([OutboxEvent(topic=topic, payload=payload, created_at=now) for payload in payloads])
+
+def configured_sinks() -> Dict[str, dict]:
+    """
+    settings.LMS_OUTBOX_SINKS: sink name -> {'BACKEND': dotted path of a Sink
+    class, 'OPTIONS': keyword arguments for it}.
+    """
+    return getattr(settings, 'LMS_OUTBOX_SINKS', {})
+
+def load_sink(name: str) -> Sink:
+    config = configured_sinks()[name]
+    return import_string(config['BACKEND'])(name, **config.get('OPTIONS', {}))
+
+def settle_delay() -> timedelta:
+    """
+    Events younger than this are left for the next poll. Event IDs are handed
+    out before commit, so a slow transaction can commit an event with a lower
+    ID than one already delivered; waiting lets it catch up instead of being
+    skipped by the cursor (settings.LMS_OUTBOX_SETTLE_SECONDS).
+    """
+    return timedelta(seconds=getattr(settings, 'LMS_OUTBOX_SETTLE_SECONDS', 2))
+
+def backoff(failures: int) -> float:
+    """Seconds to wait after the given number of consecutive failures."""
+    return min(OUTBOX_RETRY_DELAY * 2 ** max(failures - 1, 0), OUTBOX_MAX_BACKOFF)
+
+def default_owner() -> str:
+    """Lease owner name of this dispatcher process."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def _claim(sink: str, owner: str, now) -> Optional[OutboxCursor]:
+    """
+    Takes (or renews) the lease on a sink's cursor with one conditional UPDATE,
+    so two dispatchers never deliver to the same sink at the same time. Returns
+    None while another dispatcher holds the lease or the sink is backing off.
+    """
+    OutboxCursor.objects.get_or_create(sink=sink)
+    claimed = (
+        OutboxCursor.objects.filter(sink=sink)
+        .filter(Q(lease_owner='') | Q(lease_owner=owner) | Q(lease_expires_at__lt=now))
+        .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+        .update(lease_owner=owner, lease_expires_at=now + timedelta(seconds=OUTBOX_LEASE_SECONDS))
+    )
+    return OutboxCursor.objects.get(sink=sink) if claimed else None
+
+def _release(sink: str, owner: str) -> None:
+    OutboxCursor.objects.filter(sink=sink, lease_owner=owner).update(lease_owner='', lease_expires_at=None)
+
+def _as_message(event: OutboxEvent) -> dict:
+    return {'id': event.pk, 'topic': event.topic, 'created_at': event.created_at, 'payload': event.payload}
+
+def dispatch(
+    sink_names: Optional[List[str]] = None,
+    batch_size: int = OUTBOX_BATCH_SIZE,
+    max_batches: Optional[int] = None,
+    owner: Optional[str] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> Dict[str, int]:
+    """
+    Delivers pending events to each sink until it is caught up.
+
+    For every sink the dispatcher leases its cursor, reads the next batch_size
+    events after the cursor position (one query on the primary key), sends them
+    outside of any database transaction and then advances the cursor. A failed
+    send is retried OUTBOX_RETRIES times with exponential backoff; after that
+    the failure is recorded on the cursor and the sink is skipped until its
+    next_attempt_at, so one broken sink does not hold up the others.
+
+    Returns:
+        Dict[str, int]: Events delivered per sink.
+    """
+    owner = owner or default_owner()
+    sink_names = list(configured_sinks()) if sink_names is None else sink_names
+    delivered = {}
+    for name in sink_names:
+        sink = load_sink(name)
+        try:
+            delivered[name] = _dispatch_to(sink, batch_size, max_batches, owner, sleep)
+        finally:
+            sink.close()
+            _release(name, owner)
+    return delivered
+
+def _dispatch_to(sink: Sink, batch_size: int, max_batches: Optional[int], owner: str, sleep) -> int:
+    delivered = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        now = timezone.now()
+        cursor = _claim(sink.name, owner, now)
+        if cursor is None:
+            break
+        events = list(
+            OutboxEvent.objects.filter(pk__gt=cursor.position, created_at__lte=now - settle_delay())
+            .order_by('pk')[:batch_size]
+        )
+        if not events:
+            break
+
+        error = _send_with_retries(sink, [_as_message(event) for event in events], sleep)
+        now = timezone.now()
+        if error is not None:
+            failures = cursor.failures + 1
+            OutboxCursor.objects.filter(sink=sink.name, lease_owner=owner).update(
+                failures=failures,
+                next_attempt_at=now + timedelta(seconds=backoff(failures)),
+                last_error=error,
+            )
+            break
+
+        # Only the lease holder moves the cursor, and only from where it read
+        moved = OutboxCursor.objects.filter(sink=sink.name, lease_owner=owner, position=cursor.position).update(
+            position=events[-1].pk,
+            failures=0,
+            next_attempt_at=None,
+            last_error='',
+            delivered=F('delivered') + len(events),
+            last_delivered_at=now,
+            last_lag_seconds=(now - events[-1].created_at).total_seconds(),
+        )
+        if not moved:
+            break # Lease lost to another dispatcher; it will carry on
+        delivered += len(events)
+        batches += 1
+        if len(events) < batch_size:
+            break
+    return delivered
+
+def _send_with_retries(sink: Sink, messages: List[dict], sleep) -> Optional[str]:
+    """Sends a batch, retrying with exponential backoff. Returns the last error, or None."""
+    for attempt in range(OUTBOX_RETRIES):
+        try:
+            sink.send(messages)
+            return None
+        except SinkError as e:
+            error = str(e)
+            if attempt + 1 < OUTBOX_RETRIES:
+                sleep(backoff(attempt + 1))
+    return error
+
+def lag_report(now=None) -> List[dict]:
+    """
+    Per-sink delivery metrics: cursor position, events still pending, age of the
+    oldest pending event (seconds), retry state and totals.
+    """
+    now = now or timezone.now()
+    cursors = {cursor.sink: cursor for cursor in OutboxCursor.objects.filter(sink__in=list(configured_sinks()))}
+    report = []
+    for name in configured_sinks():
+        cursor = cursors.get(name) or OutboxCursor(sink=name)
+        pending = OutboxEvent.objects.filter(pk__gt=cursor.position).aggregate(count=Count('pk'), oldest=Min('created_at'))
+        report.append({
+            'sink': name,
+            'position': cursor.position,
+            'pending': pending['count'],
+            'lag_seconds': (now - pending['oldest']).total_seconds() if pending['oldest'] else 0.0,
+            'delivered': cursor.delivered,
+            'last_delivered_at': cursor.last_delivered_at,
+            'last_lag_seconds': cursor.last_lag_seconds,
+            'failures': cursor.failures,
+            'next_attempt_at': cursor.next_attempt_at,
+            'last_error': cursor.last_error,
+        })
+    return report
+
+def purge_delivered(older_than: timedelta) -> int:
+    """
+    Deletes events older than older_than that every configured sink has
+    received. Returns the number of events deleted.
+    """
+    names = list(configured_sinks())
+    positions = list(OutboxCursor.objects.filter(sink__in=names).values_list('position', flat=True))
+    if len(positions) < len(names):
+        return 0 # A sink has not started yet and still needs every event
+    with transaction.atomic():
+        deleted, _ = OutboxEvent.objects.filter(
+            pk__lte=min(positions, default=0), created_at__lt=timezone.now() - older_than
+        ).delete()
+    return deleted
@@ -0,0 +1,76 @@
+import json
+from abc import ABC, abstractmethod
+import os
+import urllib.error
+import urllib.request
+from django.core.serializers.json import DjangoJSONEncoder
+from typing import List
+
+class SinkError(Exception):
+    """A batch could not be delivered; the dispatcher retries it later."""
+
+
+class Sink(ABC):
+    """
+    Destination for outbox events, configured in settings.LMS_OUTBOX_SINKS.
+
+    send() receives a batch of events in ID order ({'id', 'topic', 'created_at',
+    'payload'}) and must raise if any of them was not delivered. Delivery is at
+    least once: after a failure or a crash the same events are sent again, so
+    receivers should de-duplicate on the event ID.
+    """
+    def __init__(self, name: str, **options):
+        self.name = name
+
+    @abstractmethod
+    def send(self, events: List[dict]) -> None:
+        """Delivers a batch of events, raising SinkError if any of them was not delivered."""
+
+    def close(self) -> None:
+        pass
+
+
+class NDJSONFileSink(Sink):
+    """Appends one JSON object per event to a file (OPTIONS: 'path')."""
+    def __init__(self, name: str, path, **options):
+        super().__init__(name, **options)
+        self.path = str(path)
+
+    def send(self, events: List[dict]) -> None:
+        lines = ''.join(json.dumps(event, cls=DjangoJSONEncoder) + '\n' for event in events)
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as output:
+                output.write(lines)
+                output.flush()
+                os.fsync(output.fileno())
+        except OSError as e:
+            raise SinkError(f"Cannot write '{self.path}': {e}")
+
+
+class HTTPSink(Sink):
+    """
+    POSTs each batch as {"events": [...]} to a URL (OPTIONS: 'url', optional
+    'timeout' in seconds and 'headers'). Any non-2xx answer fails the batch.
+    """
+    def __init__(self, name: str, url: str, timeout: float = 10, headers=None, **options):
+        super().__init__(name, **options)
+        self.url = url
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+
+    def send(self, events: List[dict]) -> None:
+        body = json.dumps({'events': events}, cls=DjangoJSONEncoder).encode('utf-8')
+        request = urllib.request.Request(
+            self.url, data=body, method='POST',
+            headers={'Content-Type': 'application/json', **self.headers},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e: # Non-2xx status
+            raise SinkError(f"{self.url} answered {e.code}")
+        except (urllib.error.URLError, OSError) as e:
+            raise SinkError(f"{self.url} unreachable: {e}")
@@ -0,0 +1,118 @@
+import re
+from django.db import connection, transaction
+from django.contrib.auth.models import User
+from django.db.models import Q, QuerySet
+from django.db.models.functions import Lower
+from apps.core.models import Book, Student
+from typing import List
+
+# Name of the FTS5 table created by core migration 0003 (kept in sync by triggers)
+BOOK_SEARCH_TABLE = 'core_book_fts'
+
+# bm25() column weights for (title, isbn, author_name)
+SEARCH_WEIGHTS = (10.0, 5.0, 2.0)
+
+MAX_SEARCH_RESULTS = 100
+
+# User fields matched by student directory searches, besides Student.student_id
+STUDENT_USER_FIELDS = ('username', 'first_name', 'last_name')
+
+def _fts_enabled() -> bool:
+    """FTS5 is only available on SQLite."""
+    return connection.vendor == 'sqlite'
+
+def build_match_expression(query: str) -> str:
+    """
+    Turns free text into an FTS5 MATCH expression.
+    Every word becomes a quoted prefix term, so user input can never be parsed as
+    FTS5 syntax and 'tolk hobb' matches 'The Hobbit' by 'Tolkien'.
+    """
+    terms = re.findall(r'\w+', query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def search_books(query: str, limit: int = 20) -> List[Book]:
+    """
+    Returns books matching the query, ordered by relevance.
+
+    Args:
+        query (str): Free text matched against title, ISBN and author name.
+        limit (int): Maximum number of results (capped at MAX_SEARCH_RESULTS).
+
+    Returns:
+        List[Book]: Matching books (with authors) in rank order.
+    """
+    limit = max(1, min(limit, MAX_SEARCH_RESULTS))
+    expression = build_match_expression(query)
+    if not expression:
+        return []
+
+    if not _fts_enabled():
+        # Fallback for backends without FTS5: unranked LIKE scan.
+        condition = Q()
+        for term in re.findall(r'\w+', query):
+            condition &= Q(title__icontains=term) | Q(isbn__startswith=term) | Q(author__name__icontains=term)
+        return list(Book.objects.select_related('author').filter(condition).order_by('title')[:limit])
+
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {BOOK_SEARCH_TABLE} WHERE {BOOK_SEARCH_TABLE} MATCH %s "
+            f"ORDER BY bm25({BOOK_SEARCH_TABLE}, {weights}) LIMIT %s",
+            [expression, limit],
+        )
+        ranked_ids = [row[0] for row in cursor.fetchall()]
+
+    books = Book.objects.select_related('author').in_bulk(ranked_ids)
+    return [books[pk] for pk in ranked_ids if pk in books]
+
+def _prefix_condition(field: str, prefix: str) -> Q:
+    """
+    Case-insensitive prefix match on an alias of Lower(field), as a range
+    (LOWER(field) >= 'abc' AND < 'abd') that a LOWER() index can seek; the
+    startswith term keeps it exact under collations that sort otherwise.
+    """
+    prefix = prefix.lower()
+    condition = Q(**{f'{field}__gte': prefix, f'{field}__startswith': prefix})
+    if ord(prefix[-1]) < 0x10FFFF:
+        condition &= Q(**{f'{field}__lt': prefix[:-1] + chr(ord(prefix[-1]) + 1)})
+    return condition
+
+def search_students(queryset: QuerySet, query: str) -> QuerySet:
+    """
+    Narrows a Student queryset to students matching every word of the query
+    by prefix of student ID, username, first name or last name (case-insensitive).
+
+    Each word is looked up with index seeks (student_sid_lower_idx and the
+    auth_user LOWER() indexes of core migration 0014): the students and users
+    matching it are selected in subqueries, so no table is scanned.
+    """
+    for term in query.split():
+        students = Student.objects.alias(lowered=Lower('student_id')).filter(_prefix_condition('lowered', term))
+        users = Q()
+        for field in STUDENT_USER_FIELDS:
+            users |= _prefix_condition(f'lowered_{field}', term)
+        users = User.objects.alias(**{f'lowered_{field}': Lower(field) for field in STUDENT_USER_FIELDS}).filter(users)
+        queryset = queryset.filter(Q(pk__in=students.values('pk')) | Q(user_id__in=users.values('pk')))
+    return queryset
+
+@transaction.atomic
+def rebuild_search_index() -> int:
+    """
+    Rebuilds the full-text index from the catalog tables.
+    Only needed after restoring data with the triggers disabled.
+
+    Returns:
+        int: Number of indexed books.
+    """
+    if not _fts_enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {BOOK_SEARCH_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {BOOK_SEARCH_TABLE} (rowid, title, isbn, author_name) "
+            "SELECT b.id, b.title, b.isbn, a.name FROM core_book b "
+            "LEFT JOIN core_author a ON a.id = b.author_id"
+        )
+        cursor.execute(f"INSERT INTO {BOOK_SEARCH_TABLE} ({BOOK_SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT COUNT(*) FROM {BOOK_SEARCH_TABLE}")
+        return cursor.fetchone()[0]
@@ -0,0 +1,164 @@
+from django.db import transaction
+from django.db.models import Exists, F, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from apps.core.models import Book, StockMovement, StockSnapshot
+from apps.services import cache_service
+from rest_framework.exceptions import ValidationError
+from typing import Callable, Dict, List, Optional
+
+# Books recomputed per query by take_snapshots and rebuild_stock
+STOCK_BATCH_SIZE = 1000
+
+# Movements that staff record by hand (the others come from circulation)
+MANUAL_KINDS = (StockMovement.ACQUISITION, StockMovement.WRITE_OFF, StockMovement.ADJUSTMENT)
+
+def record(movements: List[StockMovement]) -> None:
+    """
+    Appends movements to the ledger with a single INSERT. Call it inside the
+    database transaction that changes Book.stock by the same amounts.
+    """
+    movements = [movement for movement in movements if movement.quantity]
+    if movements:
+        StockMovement.objects.bulk_create(movements)
+
+@transaction.atomic
+def adjust_stock(book_id: int, kind: str, quantity: int, note: str = '') -> StockMovement:
+    """
+    Records an acquisition (+), write-off (-) or manual adjustment (+/-).
+    Copies removed come off Book.stock with a conditional UPDATE that never
+    lets the stock go below zero; copies added go to the oldest waiting holds
+    first (hold_service.release_copies), and only the rest to the shelf.
+
+    Raises:
+        Book.DoesNotExist: If the book_id is invalid.
+        ValidationError: For an unknown kind, a quantity of the wrong sign or too few copies.
+    """
+    from apps.services import hold_service # hold_service imports this module
+
+    if kind not in MANUAL_KINDS:
+        raise ValidationError(f"Stock can only be changed by hand with: {', '.join(MANUAL_KINDS)}.")
+    if quantity == 0 or (kind == StockMovement.ACQUISITION and quantity < 0) or (kind == StockMovement.WRITE_OFF and quantity > 0):
+        raise ValidationError("Acquisitions add copies (quantity > 0), write-offs remove them (quantity < 0).")
+
+    now = timezone.now()
+    movement = StockMovement(book_id=book_id, kind=kind, quantity=quantity, note=note, created_at=now)
+    if quantity > 0:
+        Book.objects.select_for_update().values_list('pk', flat=True).get(pk=book_id) # Raises Book.DoesNotExist
+        hold_service.release_copies([movement], now)
+        return movement
+    if not Book.objects.filter(pk=book_id, stock__gte=-quantity).update(stock=F('stock') + quantity, updated_at=now):
+        stock = Book.objects.values_list('stock', flat=True).get(pk=book_id) # Raises Book.DoesNotExist
+        raise ValidationError(f"Only {stock} copies are on the shelf.")
+    movement.save()
+    cache_service.bump_version(cache_service.BOOK_SCOPE)
+    return movement
+
+def _latest_snapshot(book_ref, as_of=None):
+    snapshots = StockSnapshot.objects.filter(book=book_ref)
+    if as_of is not None:
+        snapshots = snapshots.filter(taken_at__lte=as_of)
+    return snapshots.order_by('-movement_id', '-pk')
+
+def stock_as_of(book_id: int, as_of=None) -> int:
+    """
+    A book's shelf stock at a moment (now by default), computed from the latest
+    snapshot taken by then plus the movements recorded after it: two indexed
+    queries, however long the ledger is. Moments before the opening snapshots
+    (the ledger's start) only see movements, i.e. count from zero.
+
+    Raises:
+        Book.DoesNotExist: If the book_id is invalid.
+    """
+    if not Book.objects.filter(pk=book_id).exists():
+        raise Book.DoesNotExist("Book matching query does not exist.")
+    snapshot = _latest_snapshot(book_id, as_of).values_list('stock', 'movement_id').first()
+    stock, movement_id = snapshot or (0, 0)
+    movements = StockMovement.objects.filter(book_id=book_id, pk__gt=movement_id)
+    if as_of is not None:
+        movements = movements.filter(created_at__lte=as_of)
+    return stock + (movements.aggregate(total=Sum('quantity'))['total'] or 0)
+
+def _ledger_stock(books, up_to: int):
+    """
+    Annotates books with 'ledger_stock': their latest snapshot plus the
+    movements after it, up to and including movement up_to ('has_movements'
+    tells whether there are any).
+    """
+    latest = _latest_snapshot(OuterRef('pk'))
+    movements = StockMovement.objects.filter(book=OuterRef('pk'), pk__gt=OuterRef('snapshot_movement'), pk__lte=up_to)
+    since = movements.order_by().values('book').annotate(total=Sum('quantity')).values('total')
+    return (
+        books.annotate(
+            snapshot_stock=Coalesce(Subquery(latest.values('stock')[:1]), Value(0)),
+            snapshot_movement=Coalesce(Subquery(latest.values('movement_id')[:1]), Value(0)),
+        )
+        .annotate(
+            has_movements=Exists(movements),
+            ledger_stock=F('snapshot_stock') + Coalesce(Subquery(since, output_field=IntegerField()), Value(0)),
+        )
+    )
+
+def _batches(batch_size: int):
+    """Yields (queryset, number of books) for primary key batches of books."""
+    last_pk = 0
+    while True:
+        pks = list(Book.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return
+        yield Book.objects.filter(pk__gte=pks[0], pk__lte=pks[-1]), len(pks)
+        last_pk = pks[-1]
+
+def take_snapshots(batch_size: int = STOCK_BATCH_SIZE, progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Takes a snapshot of every book with movements since its last snapshot, so
+    later reads only have to add up the movements after it. Books without new
+    movements are skipped. Each batch is one query and one INSERT.
+
+    Returns:
+        int: Number of snapshots taken.
+    """
+    up_to = StockMovement.objects.aggregate(last=Max('pk'))['last'] or 0
+    now = timezone.now()
+    taken = 0
+    for books, _ in _batches(batch_size):
+        with transaction.atomic():
+            rows = _ledger_stock(books, up_to).filter(has_movements=True).values_list('pk', 'ledger_stock')
+            snapshots = StockSnapshot.objects.bulk_create([
+                StockSnapshot(book_id=pk, stock=stock, movement_id=up_to, taken_at=now) for pk, stock in rows
+            ])
+        taken += len(snapshots)
+        if progress:
+            progress(taken)
+    return taken
+
+def rebuild_stock(
+    apply: bool = False, batch_size: int = STOCK_BATCH_SIZE, progress: Optional[Callable[[int], None]] = None
+) -> List[Dict[str, int]]:
+    """
+    Compares Book.stock with the ledger (latest snapshot + later movements) and,
+    with apply=True, resets drifted books to the ledger value. Each batch costs
+    one query plus, when applying, one UPDATE per drifted book.
+
+    Returns:
+        List[dict]: {'book_id', 'stock', 'ledger_stock'} for every drifted book.
+    """
+    drifted = []
+    checked = 0
+    for books, count in _batches(batch_size):
+        with transaction.atomic():
+            # Movements are read up to now inside the batch's transaction, together with the stock
+            up_to = StockMovement.objects.aggregate(last=Max('pk'))['last'] or 0
+            rows = list(
+                _ledger_stock(books, up_to).exclude(stock=F('ledger_stock')).values_list('pk', 'stock', 'ledger_stock')
+            )
+            for pk, stock, ledger_stock in rows:
+                drifted.append({'book_id': pk, 'stock': stock, 'ledger_stock': ledger_stock})
+                if apply:
+                    Book.objects.filter(pk=pk).update(stock=max(ledger_stock, 0), updated_at=timezone.now())
+            if apply and rows:
+                cache_service.bump_version(cache_service.BOOK_SCOPE)
+        checked += count
+        if progress:
+            progress(checked)
+    return drifted
@@ -0,0 +1,196 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction, DatabaseError, IntegrityError
+from apps.core.models import Student
+from apps.services.catalog_import_service import MAX_REPORTED_ERRORS, UNDECODABLE, UNDECODABLE_MESSAGE, iter_records
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Users (and students) written per bulk INSERT; each batch is its own DB transaction
+STUDENT_IMPORT_BATCH_SIZE = 500
+
+# Largest number of students accepted by one POST /api/register/bulk/
+MAX_BULK_REGISTRATIONS = 1000
+
+USERNAME_TAKEN = 'A user with that username already exists.'
+STUDENT_ID_TAKEN = 'A student with that ID already exists.'
+
+# Student fields, nested under 'student_profile' in the API and flat in a CSV file
+STUDENT_FIELDS = ('student_id', 'department', 'enrollment_date')
+
+def default_workers() -> int:
+    """Password hashing processes: one per CPU."""
+    return os.cpu_count() or 1
+
+def clean_record(record: Any) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    Validates one registration with BulkRegistrationEntrySerializer (the rules
+    of UserRegistrationSerializer, password validation included), except
+    uniqueness, which import_students checks for a whole batch at once.
+    Student fields may be nested under 'student_profile' (as in the API) or
+    given flat (as in a CSV file, where empty cells mean no value);
+    'password_confirm' is optional here but must match when given.
+
+    Returns:
+        Tuple[Optional[dict], Optional[dict]]: (cleaned values, None) for a valid record,
+        or (None, field errors) for an invalid one.
+    """
+    # The API layer imports this module, so the serializer is imported when first needed
+    from apps.api.serializers.auth_serializers import BulkRegistrationEntrySerializer
+
+    if record is UNDECODABLE:
+        return None, {'non_field_errors': [UNDECODABLE_MESSAGE]}
+    if not isinstance(record, dict):
+        return None, {'non_field_errors': ['Expected an object with registration fields.']}
+    if 'student_profile' not in record:
+        profile = {name: value for name, value in record.items() if name in STUDENT_FIELDS and value not in (None, '')}
+        record = dict({name: value for name, value in record.items() if name not in STUDENT_FIELDS}, student_profile=profile)
+    serializer = BulkRegistrationEntrySerializer(data=record)
+    if not serializer.is_valid():
+        return None, serializer.errors
+    cleaned = dict(serializer.validated_data)
+    cleaned['username'] = User.normalize_username(cleaned['username'])
+    cleaned['student_profile'] = dict(cleaned['student_profile'])
+    return cleaned, None
+
+def import_students(
+    records: Iterable[Tuple[int, Any]],
+    batch_size: int = STUDENT_IMPORT_BATCH_SIZE,
+    workers: Optional[int] = None,
+) -> dict:
+    """
+    Registers many students at once.
+
+    Rows are validated one at a time and written in batches: duplicate
+    usernames and student IDs (within the input or already registered) are
+    found with two queries per batch and reported per row, passwords are hashed
+    in a pool of `workers` processes (all CPUs by default; 0 hashes in this
+    process) outside of any database transaction, and users and students are
+    inserted with one bulk INSERT each.
+
+    Args:
+        records: (line number, record) pairs, e.g. from catalog_import_service.iter_records().
+        batch_size (int): Number of students written per database transaction.
+        workers (Optional[int]): Password hashing processes.
+
+    Returns:
+        dict: Report with row counts and per-row errors (line number, username, field errors).
+    """
+    report = {'rows': 0, 'created': 0, 'failed': 0, 'errors': []}
+    workers = default_workers() if workers is None else workers
+    seen_usernames: Dict[str, int] = {}
+    seen_student_ids: Dict[str, int] = {}
+    batch: List[Tuple[int, dict]] = []
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+    try:
+        for line_number, record in records:
+            report['rows'] += 1
+            cleaned, errors = clean_record(record)
+            if cleaned is not None:
+                errors = _duplicate_errors(cleaned, line_number, seen_usernames, seen_student_ids)
+            if errors:
+                username = record.get('username') if isinstance(record, dict) else None
+                _add_error(report, line_number, username, errors)
+                continue
+            batch.append((line_number, cleaned))
+            if len(batch) >= batch_size:
+                _write_batch(batch, report, executor, workers)
+        if batch:
+            _write_batch(batch, report, executor, workers)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return report
+
+def import_file(stream, file_format: str, **options) -> dict:
+    """import_students() for a CSV (with header row) or JSONL stream."""
+    return import_students(iter_records(stream, file_format), **options)
+
+def _duplicate_errors(cleaned: dict, line_number: int, usernames: Dict[str, int], student_ids: Dict[str, int]) -> Optional[dict]:
+    """Errors for a username or student ID already used by an earlier row of the input."""
+    errors = {}
+    username, student_id = cleaned['username'], cleaned['student_profile']['student_id']
+    if username in usernames:
+        errors['username'] = [f'Duplicate of line {usernames[username]}.']
+    if student_id in student_ids:
+        errors['student_profile'] = {'student_id': [f'Duplicate of line {student_ids[student_id]}.']}
+    if errors:
+        return errors
+    usernames[username] = line_number
+    student_ids[student_id] = line_number
+    return None
+
+def _add_error(report: dict, line_number: int, username: Optional[str], errors: dict) -> None:
+    report['failed'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({'line': line_number, 'username': username, 'errors': errors})
+
+def _without_registered(rows: List[Tuple[int, dict]], report: dict) -> List[Tuple[int, dict]]:
+    """Reports rows whose username or student ID is already registered; returns the others."""
+    taken_usernames = set(User.objects.filter(username__in=[row['username'] for _, row in rows]).values_list('username', flat=True))
+    taken_ids = set(Student.objects.filter(
+        student_id__in=[row['student_profile']['student_id'] for _, row in rows]
+    ).values_list('student_id', flat=True))
+    free = []
+    for line_number, row in rows:
+        errors = {}
+        if row['username'] in taken_usernames:
+            errors['username'] = [USERNAME_TAKEN]
+        if row['student_profile']['student_id'] in taken_ids:
+            errors['student_profile'] = {'student_id': [STUDENT_ID_TAKEN]}
+        if errors:
+            _add_error(report, line_number, row['username'], errors)
+        else:
+            free.append((line_number, row))
+    return free
+
+def _write_batch(batch: List[Tuple[int, dict]], report: dict, executor: Optional[ProcessPoolExecutor], workers: int) -> None:
+    rows = _without_registered(list(batch), report)
+    batch.clear()
+    if not rows:
+        return
+
+    # Hashing is the slow part (PBKDF2 by default), so it is spread over processes
+    passwords = [row['password'] for _, row in rows]
+    if executor is None:
+        hashes = [make_password(password) for password in passwords]
+    else:
+        hashes = list(executor.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+    for (_, row), password_hash in zip(rows, hashes):
+        row['password_hash'] = password_hash
+
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                _insert(rows)
+        except IntegrityError as e:
+            if attempt:
+                # Still conflicting after the recheck: reported like any other database error
+                for line_number, row in rows:
+                    _add_error(report, line_number, row['username'], {'non_field_errors': [f'Database error: {e}']})
+                return
+            # Registered concurrently since the check: report those rows and write the rest
+            rows = _without_registered(rows, report)
+        except DatabaseError as e:
+            for line_number, row in rows:
+                _add_error(report, line_number, row['username'], {'non_field_errors': [f'Database error: {e}']})
+            return
+        else:
+            report['created'] += len(rows)
+            return
+
+def _insert(rows: List[Tuple[int, dict]]) -> None:
+    users = User.objects.bulk_create([
+        User(
+            username=row['username'], email=User.objects.normalize_email(row['email']), password=row['password_hash'],
+            first_name=row.get('first_name', ''), last_name=row.get('last_name', ''),
+        )
+        for _, row in rows
+    ])
+    if any(user.pk is None for user in users): # Backends that cannot return IDs from a bulk INSERT
+        user_ids = dict(User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'pk'))
+        for user in users:
+            user.pk = user_ids[user.username]
+    Student.objects.bulk_create([Student(user=user, **row['student_profile']) for user, (_, row) in zip(users, rows)])
@@ -1,8 +1,15 @@
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import User
-from apps.core.models import Student
+from django.utils import timezone
+from apps.core.models import Student, Transaction
 from typing import List, Optional
 
+# Students whose loan counters are recomputed per UPDATE statement
+COUNTER_REPAIR_BATCH_SIZE = 1000
+
 def list_students() -> List[Student]:
     """Returns a list of all students with their related user info."""
     # Use select_related to optimize fetching the related user
@@ -44,7 +51,8 @@ def update_student_profile(student_pk: int, student_id: str, department: Optiona
     student.student_id = student_id
     student.department = department
     student.enrollment_date = enrollment_date
-    student.save()
+    # Loan counters are left alone: they are updated concurrently with F() expressions
+    student.save(update_fields=['student_id', 'department', 'enrollment_date', 'updated_at'])
     return student
 
 def delete_student(student_pk: int) -> None:
@@ -58,4 +66,42 @@ def delete_student(student_pk: int) -> None:
     # Deleting the Student object will cascade and delete the associated User.
     student.delete()
 
+def _loan_count(**filters) -> Coalesce:
+    """Correlated subquery counting a student's open loans matching filters."""
+    rows = (
+        Transaction.objects.filter(student=OuterRef('pk'), status='Borrowed', **filters)
+        .order_by()
+        .values('student')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+def repair_loan_counters(batch_size: int = COUNTER_REPAIR_BATCH_SIZE) -> int:
+    """
+    Recomputes active_loans and overdue_loans of every student from the loans.
+
+    Students are processed in primary key ranges, one UPDATE with correlated
+    subqueries per range and one short database transaction each, so the job
+    can run while the library is open. Run it nightly to bring overdue_loans up
+    to date with loans that passed their due date during the day.
+
+    Returns:
+        int: Number of students updated.
+    """
+    updated = 0
+    last_pk = 0
+    while True:
+        pks = list(Student.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return updated
+        now = timezone.now()
+        with transaction.atomic():
+            updated += Student.objects.filter(pk__gte=pks[0], pk__lte=pks[-1]).update(
+                active_loans=_loan_count(),
+                overdue_loans=_loan_count(due_date__lt=now),
+                overdue_checked_at=now,
+            )
+        last_pk = pks[-1]
+
 # Note: Student creation is handled in auth_service.register_user
\ No newline at end of file
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from apps.core.models import Student, TokenRevocation
+
+DEFAULT_TOKEN_VERSION_CACHE_SECONDS = 0
+
+# Claims embedded in access and refresh tokens (see claims_for)
+VERSION_CLAIM = 'token_version'
+STUDENT_CLAIM = 'student_pk'
+
+def _cache_key(user_id) -> str:
+    return f'lms:token-version:{user_id}'
+
+def _cache_timeout() -> int:
+    """
+    How long a token version is cached (settings.LMS_TOKEN_VERSION_CACHE_SECONDS;
+    0, the default, reads it from the database every time). Revoking clears the
+    cache entry, so caching is only safe when CACHES is shared by all processes.
+    """
+    return getattr(settings, 'LMS_TOKEN_VERSION_CACHE_SECONDS', DEFAULT_TOKEN_VERSION_CACHE_SECONDS)
+
+def current_version(user_id) -> int:
+    """
+    The token version of a user (0 if their tokens were never revoked): one
+    query by the unique user_id index, or a cache read when caching is enabled.
+    """
+    timeout = _cache_timeout()
+    key = _cache_key(user_id)
+    version = cache.get(key) if timeout else None
+    if version is None:
+        version = TokenRevocation.objects.filter(user_id=user_id).values_list('version', flat=True).first() or 0
+        if timeout:
+            cache.set(key, version, timeout)
+    return version
+
+def revoke_tokens(user_id) -> None:
+    """
+    Invalidates every access and refresh token issued to a user so far; tokens
+    obtained afterwards carry the new version. Two statements, no lookup.
+
+    Saving or deleting a User or Student revokes through apps.core.signals, but
+    QuerySet.update() sends no signal: code that changes roles, passwords or
+    is_active with update() must call this for each user.
+    """
+    TokenRevocation.objects.bulk_create([TokenRevocation(user_id=user_id)], ignore_conflicts=True)
+    TokenRevocation.objects.filter(user_id=user_id).update(version=F('version') + 1, revoked_at=timezone.now())
+    # Dropped now so no request trusts the old version, and again once committed
+    # in case a concurrent request cached it in between
+    key = _cache_key(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+def claims_for(user) -> dict:
+    """
+    Claims that let a request be authenticated without loading the user: the
+    roles, the student profile (None for users without one) and the token version.
+    """
+    return {
+        'is_staff': user.is_staff,
+        'is_superuser': user.is_superuser,
+        STUDENT_CLAIM: Student.objects.filter(user_id=user.pk).values_list('pk', flat=True).first(),
+        VERSION_CLAIM: current_version(user.pk),
+    }
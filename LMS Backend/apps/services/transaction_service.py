@@ -1,107 +1,521 @@
+from django.conf import settings
 from django.db import transaction, IntegrityError
+from django.db.models import Case, Count, F, Min, Q, QuerySet, Value, When
+from django.db.models.functions import Greatest
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from datetime import timedelta
-from django.contrib.auth.models import User
-from apps.core.models import Book, Student, Transaction
+from apps.core.models import ArchivedTransaction, Book, StockMovement, Student, Transaction
+from apps.services import cache_service, hold_service, outbox_service, stock_service
 from rest_framework.exceptions import ValidationError # Use DRF's validation error for API consistency
-from typing import List
+from collections import defaultdict
+from typing import Iterator, List, Sequence
 
 # Define borrowing period (e.g., 14 days)
 BORROWING_PERIOD_DAYS = 14
 
-@transaction.atomic # Ensure book stock and transaction are updated together
-def borrow_book(user: User, book_id: int) -> Transaction:
+# Bulk borrow/return ("cart") modes and the largest accepted cart
+ALL_OR_NOTHING = 'all_or_nothing'
+BEST_EFFORT = 'best_effort'
+BULK_MODES = (ALL_OR_NOTHING, BEST_EFFORT)
+MAX_BULK_ITEMS = 50
+
+# Overdue loans read per query by the nightly overdue walk
+OVERDUE_CHUNK_SIZE = 1000
+
+DEFAULT_MAX_ACTIVE_LOANS = 10
+
+def max_active_loans() -> int:
+    """Books a student may have borrowed at the same time (settings.LMS_MAX_ACTIVE_LOANS)."""
+    return getattr(settings, 'LMS_MAX_ACTIVE_LOANS', DEFAULT_MAX_ACTIVE_LOANS)
+
+def borrow_book(student_id: int, book_id: int) -> Transaction:
     """
     Handles the process of a student borrowing a book.
 
+    Stock is taken with a single conditional UPDATE ... SET stock = stock - 1
+    WHERE stock > 0, so concurrent borrows of the last copy cannot both succeed
+    and no Book row is read on the success path. A second open loan of the same
+    book is rejected by the txn_one_active_loan constraint instead of a prior
+    exists() check, which two concurrent requests could both pass. The loan
+    limit is enforced by the same conditional UPDATE that maintains the
+    student's active_loans counter, so it costs no extra query. A copy set
+    aside for the student's ready hold is borrowed before any shelf copy.
+
     Args:
-        user (User): The user (student) borrowing the book.
+        student_id (int): The primary key of the borrowing student's profile.
         book_id (int): The ID of the book to borrow.
 
     Returns:
         Transaction: The newly created transaction record.
 
     Raises:
-        Student.DoesNotExist: If the user does not have a student profile.
         Book.DoesNotExist: If the book_id is invalid.
-        ValidationError: If the book is out of stock or other business rule violations.
+        Student.DoesNotExist: If the student_id is invalid.
+        ValidationError: If the book is out of stock, the loan limit is reached or other business rule violations.
     """
-    student = get_object_or_404(Student, user=user)
-    book = get_object_or_404(Book, pk=book_id)
-
-    # Check if the book is in stock
-    if book.stock <= 0:
-        raise ValidationError(f"'{book.title}' is currently out of stock.")
+    try:
+        with transaction.atomic(): # Ensure book stock and transaction are updated together
+            return _borrow_book(student_id, book_id)
+    except IntegrityError:
+        if not _has_open_loan(student_id, book_id):
+            raise
+        raise ValidationError(f"You have already borrowed '{_book_title(book_id)}' and not returned it yet.")
 
-    # Optional: Check if the student already has this book borrowed and not returned
-    existing_borrow = Transaction.objects.filter(
-        student=student,
-        book=book,
-        status='Borrowed'
-    ).exists()
-    if existing_borrow:
-        raise ValidationError(f"You have already borrowed '{book.title}' and not returned it yet.")
-
-    # Decrement stock and create transaction
-    book.stock -= 1
-    book.save()
-
-    due_date = timezone.now() + timedelta(days=BORROWING_PERIOD_DAYS)
+def _borrow_book(student_id: int, book_id: int) -> Transaction:
+    now = timezone.now()
+    # The loan is inserted first so a duplicate fails before any stock is taken
     new_transaction = Transaction.objects.create(
-        book=book,
-        student=student,
-        due_date=due_date,
+        book_id=book_id,
+        student_id=student_id,
+        borrow_date=now,
+        due_date=now + timedelta(days=BORROWING_PERIOD_DAYS),
         status='Borrowed'
-        # borrow_date is set automatically by default=timezone.now
     )
+    if not _count_loans_out(student_id, 1, now):
+        if not Student.objects.filter(pk=student_id).exists():
+            raise Student.DoesNotExist("Student matching query does not exist.")
+        raise ValidationError(_limit_message())
+    # A copy set aside for the student's ready hold is theirs; taking a shelf copy
+    # instead would leave it idle until the hold expires
+    if hold_service.claim_ready_holds(student_id, [book_id], now):
+        pass
+    elif Book.objects.filter(pk=book_id, stock__gt=0).update(stock=F('stock') - 1, updated_at=now):
+        stock_service.record([_borrowed(new_transaction)])
+    else:
+        # Only the failure path reads the book, to tell a missing book from an empty shelf
+        raise ValidationError(f"'{_book_title(book_id)}' is currently out of stock.")
+    _on_borrowed([new_transaction])
     return new_transaction
 
+def _has_open_loan(student_id: int, book_id: int) -> bool:
+    return Transaction.objects.filter(student_id=student_id, book_id=book_id, status='Borrowed').exists()
+
+def _limit_message() -> str:
+    return f"You have reached the limit of {max_active_loans()} borrowed books."
+
+def _count_loans_out(student_id: int, count: int, now) -> bool:
+    """
+    Adds count loans to the student's active_loans counter with one conditional
+    UPDATE that only matches while the loan limit allows it. Returns False when
+    the limit would be exceeded (or the student does not exist).
+    """
+    return bool(
+        Student.objects.filter(pk=student_id, active_loans__lte=max_active_loans() - count)
+        .update(active_loans=F('active_loans') + count, updated_at=now)
+    )
+
+def _count_loans_in(student_id: int, loans: List[Transaction], now) -> None:
+    """
+    Removes returned loans from the student's counters in one UPDATE. A loan is
+    removed from overdue_loans only if it was counted there, i.e. it was already
+    past due when the counter was last recomputed (overdue_checked_at).
+    """
+    was_counted_overdue = sum(
+        (Case(When(overdue_checked_at__gt=loan.due_date, then=Value(1)), default=Value(0)) for loan in loans),
+        Value(0),
+    )
+    Student.objects.filter(pk=student_id).update(
+        active_loans=Greatest(F('active_loans') - len(loans), 0),
+        overdue_loans=Greatest(F('overdue_loans') - was_counted_overdue, 0),
+        updated_at=now,
+    )
+
 @transaction.atomic
-def return_book(user: User, transaction_id: int) -> Transaction:
+def return_book(student_id: int, transaction_id: int) -> Transaction:
     """
     Handles the process of a student returning a book.
 
+    The status change is a conditional UPDATE ... WHERE status = 'Borrowed', so a
+    transaction returned twice concurrently only gives its copy back once. The
+    copy goes to the oldest waiting hold on the book, if any (see
+    hold_service.release_copies), otherwise back in stock.
+
     Args:
-        user (User): The user (student) returning the book.
+        student_id (int): The primary key of the returning student's profile.
         transaction_id (int): The ID of the borrowing transaction.
 
     Returns:
         Transaction: The updated transaction record.
 
     Raises:
-        Student.DoesNotExist: If the user does not have a student profile.
         Transaction.DoesNotExist: If the transaction_id is invalid.
-        ValidationError: If the transaction doesn't belong to the user or is already returned.
+        ValidationError: If the transaction doesn't belong to the student or is already returned.
     """
-    student = get_object_or_404(Student, user=user)
-    transaction_obj = get_object_or_404(
-        Transaction.objects.select_related('book'), # Optimize book fetching
-        pk=transaction_id
-    )
+    transaction_obj = Transaction.objects.get(pk=transaction_id)
 
     # Verify the transaction belongs to the student and is currently borrowed
-    if transaction_obj.student != student:
+    if transaction_obj.student_id != student_id:
         raise ValidationError("This transaction does not belong to you.")
-    if transaction_obj.status != 'Borrowed':
-        raise ValidationError(f"This book ('{transaction_obj.book.title}') was already returned or the transaction status is invalid.")
 
-    # Increment stock and update transaction
-    book = transaction_obj.book
-    book.stock += 1
-    book.save()
+    now = timezone.now()
+    returned = Transaction.objects.filter(pk=transaction_id, status='Borrowed').update(status='Returned', return_date=now)
+    if not returned:
+        raise ValidationError(f"This book ('{_book_title(transaction_obj.book_id)}') was already returned or the transaction status is invalid.")
 
     transaction_obj.status = 'Returned'
-    transaction_obj.return_date = timezone.now()
-    transaction_obj.save()
-
+    transaction_obj.return_date = now
+    hold_service.release_copies([_returned(transaction_obj)], now)
+    _count_loans_in(student_id, [transaction_obj], now)
+    _on_returned([transaction_obj])
     return transaction_obj
 
-def list_transactions_for_student(user: User) -> List[Transaction]:
-    """Returns a list of all transactions for a given student (user)."""
-    student = get_object_or_404(Student, user=user)
-    return Transaction.objects.filter(student=student).select_related('book').order_by('-borrow_date')
+class _Abort(Exception):
+    """Rolls back an all-or-nothing bulk operation, carrying its per-item results."""
+    def __init__(self, results: List[dict]):
+        self.results = results
+
+class _Contended(Exception):
+    """Undoes a grouped conditional UPDATE that matched fewer rows than expected."""
+
+def _rejected(results: List[dict]) -> List[dict]:
+    """Marks the successful items of an aborted all-or-nothing operation as rolled back."""
+    for result in results:
+        if result['status'] != 'failed':
+            result['status'] = 'rolled_back'
+            result.pop('transaction', None)
+    return results
+
+def borrow_books(student_id: int, book_ids: Sequence[int], mode: str = ALL_OR_NOTHING) -> List[dict]:
+    """
+    Borrows several books for one student in a single database transaction.
+
+    Books, the student's open loans and loan counter are read with one query
+    each, stock is taken with one grouped conditional UPDATE, the loans are
+    written with a single bulk_create() and the counter is bumped with one
+    conditional UPDATE, whatever the number of books. Books beyond the loan
+    limit fail in request order.
+
+    Args:
+        student_id (int): The primary key of the borrowing student's profile.
+        book_ids (Sequence[int]): Books to borrow, in request order.
+        mode (str): ALL_OR_NOTHING (any failure borrows nothing) or BEST_EFFORT.
+
+    Returns:
+        List[dict]: One result per requested book, in request order:
+        {'book_id', 'status': 'borrowed'|'failed'|'rolled_back', 'transaction' or 'error'}.
+    """
+    book_ids = list(book_ids)
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                return _borrow_books(student_id, book_ids, mode)
+        except _Abort as abort:
+            return _rejected(abort.results)
+        except IntegrityError:
+            # A concurrent request opened one of these loans after our read (see
+            # txn_one_active_loan); the second attempt reports it per book.
+            if attempt:
+                raise
+        except _Contended:
+            # A concurrent borrow used up the loan limit after our read
+            if attempt:
+                raise ValidationError("Your loans changed while borrowing; please try again.")
+
+def _borrow_books(student_id: int, book_ids: List[int], mode: str) -> List[dict]:
+    results = [{'book_id': book_id, 'status': 'borrowed'} for book_id in book_ids]
+    books = {pk: (title, stock) for pk, title, stock in Book.objects.filter(pk__in=book_ids).values_list('id', 'title', 'stock')}
+    on_loan = set(
+        Transaction.objects.filter(student_id=student_id, book_id__in=book_ids, status='Borrowed')
+        .values_list('book_id', flat=True)
+    )
+    room = max_active_loans() - Student.objects.values_list('active_loans', flat=True).get(pk=student_id)
+    # Copies set aside for the student's ready holds are borrowed before any shelf copy
+    on_hold = hold_service.ready_hold_books(student_id, list(books)) if books else set()
+
+    seen = set()
+    for result in results:
+        book_id = result['book_id']
+        if book_id not in books:
+            result.update(status='failed', error="Book with this ID does not exist.")
+        elif book_id in seen:
+            result.update(status='failed', error="This book appears more than once in the request.")
+        elif book_id in on_loan:
+            result.update(status='failed', error=f"You have already borrowed '{books[book_id][0]}' and not returned it yet.")
+        elif books[book_id][1] <= 0 and book_id not in on_hold:
+            result.update(status='failed', error=f"'{books[book_id][0]}' is currently out of stock.")
+        elif room <= 0:
+            result.update(status='failed', error=_limit_message())
+        else:
+            room -= 1
+        seen.add(book_id)
+
+    candidates = [result['book_id'] for result in results if result['status'] == 'borrowed']
+    if mode == ALL_OR_NOTHING and len(candidates) < len(results):
+        raise _Abort(results)
+
+    now = timezone.now()
+    taken = _take_copies([book_id for book_id in candidates if book_id not in on_hold], now)
+    taken |= hold_service.claim_ready_holds(student_id, [book_id for book_id in candidates if book_id in on_hold], now)
+    for result in results:
+        if result['status'] == 'borrowed' and result['book_id'] not in taken:
+            # Another borrower took the last copy after our read
+            result.update(status='failed', error=f"'{books[result['book_id']][0]}' is currently out of stock.")
+    if mode == ALL_OR_NOTHING and len(taken) < len(candidates):
+        raise _Abort(results)
+
+    due_date = now + timedelta(days=BORROWING_PERIOD_DAYS)
+    created = Transaction.objects.bulk_create([
+        Transaction(book_id=book_id, student_id=student_id, borrow_date=now, due_date=due_date, status='Borrowed')
+        for book_id in candidates if book_id in taken
+    ])
+    if created and not _count_loans_out(student_id, len(created), now):
+        raise _Contended
+    stock_service.record([_borrowed(txn) for txn in created if txn.book_id not in on_hold])
+    by_book = {txn.book_id: txn for txn in created}
+    for result in results:
+        if result['status'] == 'borrowed':
+            result['transaction'] = by_book[result['book_id']]
+    if created:
+        _on_borrowed(created)
+    return results
+
+def _take_copies(book_ids: List[int], now) -> set:
+    """
+    Takes one copy of each book with a grouped conditional UPDATE and returns the
+    ids that were taken. If a concurrent borrow emptied a shelf in between, the
+    grouped update is undone and copies are taken one book at a time instead.
+    """
+    if not book_ids:
+        return set()
+    try:
+        with transaction.atomic():
+            taken = Book.objects.filter(pk__in=book_ids, stock__gt=0).update(stock=F('stock') - 1, updated_at=now)
+            if taken != len(book_ids):
+                raise _Contended
+        return set(book_ids)
+    except _Contended:
+        return {
+            book_id for book_id in book_ids
+            if Book.objects.filter(pk=book_id, stock__gt=0).update(stock=F('stock') - 1, updated_at=now)
+        }
+
+def return_books(student_id: int, transaction_ids: Sequence[int], mode: str = ALL_OR_NOTHING) -> List[dict]:
+    """
+    Returns several loans of one student in a single database transaction.
+
+    The loans are read with one query, closed with one grouped conditional UPDATE
+    and the copies are released with hold_service.release_copies(): one query for
+    the books with a hold queue, one UPDATE per queued book and one stock UPDATE
+    per distinct number of copies returned per book (normally a single query).
+
+    Args:
+        student_id (int): The primary key of the returning student's profile.
+        transaction_ids (Sequence[int]): Loans to close, in request order.
+        mode (str): ALL_OR_NOTHING (any failure returns nothing) or BEST_EFFORT.
+
+    Returns:
+        List[dict]: One result per requested loan, in request order:
+        {'transaction_id', 'status': 'returned'|'failed'|'rolled_back', 'transaction' or 'error'}.
+    """
+    try:
+        with transaction.atomic():
+            return _return_books(student_id, list(transaction_ids), mode)
+    except _Abort as abort:
+        return _rejected(abort.results)
+
+def _return_books(student_id: int, transaction_ids: List[int], mode: str) -> List[dict]:
+    results = [{'transaction_id': pk, 'status': 'returned'} for pk in transaction_ids]
+    loans = Transaction.objects.in_bulk(transaction_ids)
+
+    seen = set()
+    for result in results:
+        loan = loans.get(result['transaction_id'])
+        if loan is None:
+            result.update(status='failed', error="Transaction not found.")
+        elif result['transaction_id'] in seen:
+            result.update(status='failed', error="This transaction appears more than once in the request.")
+        elif loan.student_id != student_id:
+            result.update(status='failed', error="This transaction does not belong to you.")
+        elif loan.status != 'Borrowed':
+            result.update(status='failed', error="This book was already returned or the transaction status is invalid.")
+        seen.add(result['transaction_id'])
+
+    candidates = [result['transaction_id'] for result in results if result['status'] == 'returned']
+    if mode == ALL_OR_NOTHING and len(candidates) < len(results):
+        raise _Abort(results)
+
+    now = timezone.now()
+    closed = _close_loans(candidates, now)
+    for result in results:
+        if result['status'] == 'returned' and result['transaction_id'] not in closed:
+            result.update(status='failed', error="This book was already returned or the transaction status is invalid.")
+    if mode == ALL_OR_NOTHING and len(closed) < len(candidates):
+        raise _Abort(results)
+
+    returned = []
+    for result in results:
+        if result['status'] == 'returned':
+            loan = loans[result['transaction_id']]
+            loan.status = 'Returned'
+            loan.return_date = now
+            result['transaction'] = loan
+            returned.append(loan)
+    hold_service.release_copies([_returned(loan) for loan in returned], now)
+    if returned:
+        _count_loans_in(student_id, returned, now)
+        _on_returned(returned)
+    return results
+
+def _close_loans(transaction_ids: List[int], now) -> set:
+    """Grouped conditional status update; falls back to one UPDATE per loan after a concurrent return."""
+    if not transaction_ids:
+        return set()
+    try:
+        with transaction.atomic():
+            closed = Transaction.objects.filter(pk__in=transaction_ids, status='Borrowed').update(status='Returned', return_date=now)
+            if closed != len(transaction_ids):
+                raise _Contended
+        return set(transaction_ids)
+    except _Contended:
+        return {
+            pk for pk in transaction_ids
+            if Transaction.objects.filter(pk=pk, status='Borrowed').update(status='Returned', return_date=now)
+        }
+
+def _borrowed(txn: Transaction) -> StockMovement:
+    return StockMovement(book_id=txn.book_id, kind=StockMovement.BORROW, quantity=-1, loan_id=txn.pk, created_at=txn.borrow_date)
+
+def _returned(txn: Transaction) -> StockMovement:
+    return StockMovement(book_id=txn.book_id, kind=StockMovement.RETURN, quantity=1, loan_id=txn.pk, created_at=txn.return_date)
+
+def _book_title(book_id: int) -> str:
+    """Title for error messages; raises Book.DoesNotExist for an unknown book."""
+    return Book.objects.values_list('title', flat=True).get(pk=book_id)
+
+def _on_borrowed(transactions: List[Transaction]) -> None:
+    """
+    Side effects of successful borrows, run inside their database transaction.
+    Notifications go through the outbox (delivered later by run_outbox), never
+    directly from here.
+    """
+    cache_service.bump_version(cache_service.BOOK_SCOPE) # Stock is part of the book representation
+    outbox_service.record(outbox_service.LOAN_BORROWED, [_event_payload(txn) for txn in transactions])
+
+def _on_returned(transactions: List[Transaction]) -> None:
+    """Side effects of successful returns, run inside their database transaction."""
+    cache_service.bump_version(cache_service.BOOK_SCOPE)
+    outbox_service.record(outbox_service.LOAN_RETURNED, [_event_payload(txn) for txn in transactions])
+
+def _event_payload(txn: Transaction) -> dict:
+    return {
+        'transaction_id': txn.pk, 'student_id': txn.student_id, 'book_id': txn.book_id,
+        'borrow_date': txn.borrow_date, 'due_date': txn.due_date, 'return_date': txn.return_date,
+    }
+
+# Columns of a transaction history row (hot and archived rows alike)
+HISTORY_FIELDS = ['id', 'book_id', 'student_id', 'borrow_date', 'due_date', 'return_date', 'status']
+
+def list_transactions_for_student(student_id: int, full_history: bool = False) -> QuerySet:
+    """
+    Returns a student's transactions, newest first.
+
+    By default only the hot Transaction table is read (open loans and recent
+    returns). With full_history=True, rows moved to ArchivedTransaction by
+    `manage.py archive_transactions` are included through a UNION ALL; the
+    result is then a values() queryset of HISTORY_FIELDS plus 'overdue' and
+    'archived' flags.
+    """
+    if not full_history:
+        return Transaction.objects.filter(student_id=student_id).select_related('book').order_by('-borrow_date', '-pk')
+    hot = (
+        Transaction.objects.with_overdue().filter(student_id=student_id)
+        .annotate(archived=Value(False))
+        .order_by()
+        .values(*HISTORY_FIELDS, 'overdue', 'archived')
+    )
+    archived = (
+        ArchivedTransaction.objects.filter(student_id=student_id)
+        .annotate(overdue=Value(False), archived=Value(True))
+        .order_by()
+        .values(*HISTORY_FIELDS, 'overdue', 'archived')
+    )
+    return hot.union(archived, all=True).order_by('-borrow_date', '-id')
 
 def get_transaction_by_id(transaction_id: int) -> Transaction:
     """Retrieves a single transaction by its ID."""
-    return get_object_or_404(Transaction.objects.select_related('book', 'student__user'), pk=transaction_id)
\ No newline at end of file
+    return get_object_or_404(Transaction.objects.select_related('book', 'student__user'), pk=transaction_id)
+
+def overdue_students(now=None) -> QuerySet:
+    """
+    One row per student with overdue loans (student_id, overdue_count,
+    oldest_due_date), aggregated in SQL over the (status, due_date) index.
+    """
+    return (
+        Transaction.objects.overdue(now)
+        .order_by()
+        .values('student_id')
+        .annotate(overdue_count=Count('pk'), oldest_due_date=Min('due_date'))
+    )
+
+def build_overdue_report(student_rows: List[dict], now=None) -> List[dict]:
+    """
+    Expands rows of overdue_students() with the student's details and overdue
+    loans, using one query for the students and one for their loans.
+    """
+    now = now or timezone.now()
+    student_ids = [row['student_id'] for row in student_rows]
+    students = {
+        row['id']: row
+        for row in Student.objects.filter(pk__in=student_ids).values('id', 'student_id', 'user__username', 'user__email')
+    }
+    loans = defaultdict(list)
+    for loan in (
+        Transaction.objects.overdue(now).filter(student_id__in=student_ids)
+        .order_by('due_date', 'pk')
+        .values('id', 'student_id', 'book_id', 'book__title', 'borrow_date', 'due_date')
+    ):
+        loans[loan['student_id']].append({
+            'transaction_id': loan['id'],
+            'book_id': loan['book_id'],
+            'book_title': loan['book__title'],
+            'borrow_date': loan['borrow_date'],
+            'due_date': loan['due_date'],
+            'days_overdue': (now - loan['due_date']).days,
+        })
+
+    report = []
+    for row in student_rows:
+        student = students.get(row['student_id'], {})
+        report.append({
+            'student': {
+                'id': row['student_id'],
+                'student_id': student.get('student_id'),
+                'username': student.get('user__username'),
+                'email': student.get('user__email'),
+            },
+            'overdue_count': row['overdue_count'],
+            'oldest_due_date': row['oldest_due_date'],
+            'loans': loans[row['student_id']],
+        })
+    return report
+
+def iter_overdue_loans(chunk_size: int = OVERDUE_CHUNK_SIZE, now=None) -> Iterator[List[dict]]:
+    """
+    Walks all overdue loans in (due_date, id) order, chunk_size rows per query.
+
+    Each chunk is a separate keyset query on the (status, due_date) index, so no
+    cursor or transaction is held open between chunks and memory stays bounded.
+    Yields lists of dicts with the loan, book and student details.
+    """
+    now = now or timezone.now()
+    loans = (
+        Transaction.objects.overdue(now)
+        .order_by('due_date', 'pk')
+        .values(
+            'id', 'due_date', 'borrow_date', 'book_id', 'book__title',
+            'student_id', 'student__student_id', 'student__user__username', 'student__user__email',
+        )
+    )
+    last = None
+    while True:
+        chunk = loans
+        if last is not None:
+            chunk = chunk.filter(Q(due_date__gt=last[0]) | Q(due_date=last[0], pk__gt=last[1]))
+        rows = list(chunk[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        if len(rows) < chunk_size:
+            return
+        last = (rows[-1]['due_date'], rows[-1]['id'])
@@ -88,6 +88,56 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Holds the response cache and its version counters. LocMemCache is per process;
+# with several worker processes use a shared backend, e.g.
+# 'django.core.cache.backends.filebased.FileBasedCache' with a LOCATION directory.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'lms-default',
+    }
+}
+
+# Versioned response cache for book/author reads (see apps/services/cache_service.py)
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300 # Seconds; invalidation is by version, this only bounds memory use
+
+# Circulation
+LMS_MAX_ACTIVE_LOANS = 10 # Books a student may have borrowed at the same time
+LMS_HOLD_PICKUP_DAYS = 3 # Days a copy set aside for a hold waits to be borrowed
+
+# Outbox sinks for circulation events, delivered by `manage.py run_outbox`
+# (BACKEND: a Sink class from apps.services.outbox_sinks, OPTIONS: its arguments)
+LMS_OUTBOX_SINKS = {
+    'ndjson': {
+        'BACKEND': 'apps.services.outbox_sinks.NDJSONFileSink',
+        'OPTIONS': {'path': BASE_DIR / 'outbox' / 'circulation.ndjson'},
+    },
+    # Daily circulation rollups behind /api/analytics/ (backfill: `manage.py rebuild_analytics`)
+    'analytics': {
+        'BACKEND': 'apps.services.analytics_service.RollupSink',
+    },
+    # 'sis': {
+    #     'BACKEND': 'apps.services.outbox_sinks.HTTPSink',
+    #     'OPTIONS': {'url': 'https://sis.example.edu/library/events', 'timeout': 10},
+    # },
+}
+LMS_OUTBOX_SETTLE_SECONDS = 2 # Events younger than this wait for the next poll
+
+# Responses to POSTs with an Idempotency-Key header are replayed for this long
+LMS_IDEMPOTENCY_TTL_HOURS = 24
+
+# Token versions (JWT revocation) are read from the database on every authenticated
+# request (one indexed query). A value above 0 caches them this long instead; only
+# set it when CACHES is shared by all processes (e.g. Redis), since revoking clears
+# the entry in that cache and a per-process LocMemCache would keep the old version.
+LMS_TOKEN_VERSION_CACHE_SECONDS = 0
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -132,11 +182,21 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Stateless: roles and student profile come from token claims, no per-request user query
+        'apps.api.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly', # Default to read-only for unauthenticated users
-    )
+    ),
+    # Keyset pagination for every list endpoint (clients may pass ?page_size=, capped server-side)
+    'DEFAULT_PAGINATION_CLASS': 'apps.api.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': 50,
+    # Sliding-window limits of the endpoints using apps.api.throttling (counted in the default cache)
+    'DEFAULT_THROTTLE_RATES': {
+        'token': '20/min', # Login attempts per client IP
+        'register': '10/hour', # Self-registrations per client IP
+        'borrow': '60/min', # Borrow requests per student
+    },
 }
 
 # Simple JWT settings (can be customized further later)
@@ -169,6 +229,10 @@ SIMPLE_JWT = {
 
     'JTI_CLAIM': 'jti',
 
+    # Tokens carry is_staff, student_pk and token_version claims (see apps/services/token_service.py)
+    'TOKEN_OBTAIN_SERIALIZER': 'apps.api.serializers.auth_serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'apps.api.serializers.auth_serializers.ClaimsTokenRefreshSerializer',
+
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),